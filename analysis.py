@@ -0,0 +1,81 @@
+"""Full per-period analysis table for one OHLC history.
+
+Runs the resample, the level engine, both relationship classifiers, GPZ
+and the DPZ scan and returns them as one DataFrame with a row per period.
+Row ``i`` holds the levels and signals derived from period ``i``, i.e. the
+ones that apply to ``NextDate``; the last row is what the app shows. No
+Streamlit imports, so batch jobs, the CLI and services can share it.
+"""
+import pandas as pd
+
+from ingest import REQUIRED_COLS, MissingColumnsError, normalize_ohlc, resample_ohlc
+from dpz import DPZ_TOLERANCE_PCT, dpz_hits, dpz_pair_labels, dpz_types
+from gpz import gpz_frame
+from level_engine import CAMARILLA_MULTIPLIER, DEFAULT_FAMILIES, compute_levels, family_columns
+from relationships import camarilla_relationships, cpr_relationships
+from trading_calendar import market_calendar
+from width_stats import WIDTH_MIN_PERIODS, width_stats
+
+
+def prepare_ohlc(df):
+    """Validate and normalize a raw Date/[Open]/High/Low/Close frame."""
+    if not REQUIRED_COLS.issubset(df.columns):
+        raise MissingColumnsError(f"Data must contain columns: {REQUIRED_COLS}")
+    cols = ["Date", "Open", "High", "Low", "Close"] if "Open" in df.columns else ["Date", "High", "Low", "Close"]
+    return normalize_ohlc(df[cols])
+
+
+def analyze_ohlc(df, data_freq="Daily", market_type="Stock Market",
+                 tolerance_pct=DPZ_TOLERANCE_PCT, multiplier=CAMARILLA_MULTIPLIER, families=DEFAULT_FAMILIES,
+                 width_window=None):
+    """Per-period CPR, classic, Camarilla, relationship, GPZ and DPZ table.
+
+    ``df`` must already be normalized (see prepare_ohlc). ``families`` adds
+    level families from level_engine.LEVEL_FAMILIES (e.g. "fibonacci");
+    the CPR, classic and Camarilla ones are always included. A
+    ``width_window`` adds rolling CPR/Camarilla width statistics over that
+    many periods (see width_stats).
+    """
+    return analyze_periods(resample_ohlc(df, data_freq), data_freq, market_type, tolerance_pct, multiplier, families,
+                           width_window)
+
+
+def analyze_periods(frame, data_freq="Daily", market_type="Stock Market",
+                    tolerance_pct=DPZ_TOLERANCE_PCT, multiplier=CAMARILLA_MULTIPLIER, families=DEFAULT_FAMILIES,
+                    width_window=None):
+    """analyze_ohlc for a frame already aggregated to ``data_freq`` periods
+    (Date, [Open], High, Low, Close). NextDate is the session opening the
+    next period on the market's trading calendar."""
+    close = frame["Close"].to_numpy()
+    open_ = frame["Open"].to_numpy() if "Open" in frame.columns else None
+    # The signals below need the default families; extra ones are added after them
+    families = DEFAULT_FAMILIES + tuple(name for name in families if name not in DEFAULT_FAMILIES)
+    levels = compute_levels(frame["High"].to_numpy(), frame["Low"].to_numpy(), close, multiplier=multiplier,
+                            families=families, open_=open_)
+
+    # Columns are collected first and the frame is built once: inserting
+    # ~30 columns one by one costs more than the analysis on short histories
+    cols = {"Date": frame["Date"].to_numpy(),
+            "NextDate": market_calendar(market_type).next_sessions(frame["Date"].to_numpy(), data_freq)}
+    cols.update({c: frame[c].to_numpy() for c in ("Open", "High", "Low", "Close") if c in frame.columns})
+    for name in family_columns(families):
+        cols[name] = levels[name]
+    cols["Swapped"] = levels["Swapped"]
+
+    cpr = cpr_relationships(levels["TC"], levels["BC"])
+    ce = camarilla_relationships(levels["Cam_R3"], levels["Cam_S3"], data_freq)
+    cols["CPR_Relationship"], cols["CPR_Sentiment"] = cpr["Relationship"].array, cpr["Sentiment"].array
+    cols["CE_Relationship"], cols["CE_Sentiment"] = ce["Relationship"].array, ce["Sentiment"].array
+
+    gpz = gpz_frame(levels, open_, close)
+    for col in gpz.columns:
+        cols[col] = gpz[col].array
+
+    hits = dpz_hits(levels, close, tolerance_pct)
+    cols["DPZ"] = dpz_types(hits).array
+    cols["DPZ_Pairs"] = dpz_pair_labels(hits)
+
+    if width_window:
+        widths = width_stats(levels, close, width_window, min(WIDTH_MIN_PERIODS, width_window))
+        cols.update({col: widths[col].to_numpy() for col in widths.columns})
+    return pd.DataFrame(cols, index=frame.index)
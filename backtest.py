@@ -0,0 +1,276 @@
+"""Vectorized backtest of the GPZ and CPR relationship signals.
+
+Every period ``i`` yields the signals the app would show for the session
+after it -- GPZ Bullish/Bearish (``BC <= S3 <= TC`` / ``TC >= R3 >= BC`` on
+the levels derived from ``i``), the same with both open-vs-prior-CPR facts
+confirmed, and the directional CPR relationship sentiments -- as boolean
+arrays. Each signal is then traded over period ``i + 1``: long for bullish,
+short for bearish, entering at that period's Open (the prior Close when the
+data has no Open) and exiting at its Close. Alongside the return, the
+period's High/Low is checked against the levels derived from ``i``:
+
+- Target: bullish reaches Cam_R3, bearish reaches Cam_S3
+- Stop: bullish trades down to Cam_S4, bearish up to Cam_R4
+- CPR held: bullish Low stays at/above BC, bearish High at/below TC
+
+A universe is backtested as one set of concatenated arrays, with symbol
+boundaries masked so nothing leaks from one symbol's last period into the
+next symbol's first.
+"""
+import numpy as np
+import pandas as pd
+
+from analysis import prepare_ohlc
+from gpz import BEARISH, BULLISH, gpz_frame
+from ingest import resample_ohlc
+from level_engine import CAMARILLA_MULTIPLIER, compute_levels
+from relationships import RELATIONSHIP_KINDS, UNCHANGED_THRESHOLD, relationship_codes
+
+SYMBOL_COL = "Symbol"
+
+# signal name -> direction (+1 long, -1 short)
+SIGNALS = {
+    "GPZ Bullish": 1,
+    "GPZ Bearish": -1,
+    "GPZ Bullish (confirmed)": 1,
+    "GPZ Bearish (confirmed)": -1,
+}
+# Directional CPR sentiments only; Sideways/Breakout have no side to trade
+CPR_SIGNAL_CODES = {}
+for _code, (_kind, _sentiment) in enumerate(RELATIONSHIP_KINDS):
+    if _sentiment.endswith("Bullish") or _sentiment.endswith("Bearish"):
+        CPR_SIGNAL_CODES[f"CPR {_sentiment}"] = _code
+        SIGNALS[f"CPR {_sentiment}"] = 1 if _sentiment.endswith("Bullish") else -1
+
+STAT_COLUMNS = ("Trades", "HitRate", "MeanReturn", "MedianReturn", "StdReturn", "TotalReturn",
+                "ProfitFactor", "TargetRate", "StopRate", "CPRHeldRate")
+
+
+def symbol_boundaries(lengths):
+    """(first, last) row masks for symbols of ``lengths`` periods stacked end to end."""
+    lengths = np.asarray(lengths, dtype=np.intp)
+    ends = np.cumsum(lengths)
+    n = int(ends[-1]) if len(ends) else 0
+    first = np.zeros(n, dtype=bool)
+    last = np.zeros(n, dtype=bool)
+    nonempty = lengths > 0
+    first[(ends - lengths)[nonempty]] = True
+    last[ends[nonempty] - 1] = True
+    return first, last
+
+
+def _prior(values, first):
+    prior = np.empty_like(values)
+    prior[:1] = np.nan
+    prior[1:] = values[:-1]
+    prior[first] = np.nan
+    return prior
+
+
+def _following(values, last):
+    following = np.empty_like(values)
+    following[-1:] = np.nan
+    following[:-1] = values[1:]
+    following[last] = np.nan
+    return following
+
+
+def signal_masks(levels, open_, close, first=None, unchanged_threshold=UNCHANGED_THRESHOLD):
+    """signal name -> boolean array over periods (see SIGNALS).
+
+    ``first`` marks rows with no prior period of the same symbol; signals
+    that need the prior period are False there.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    if first is None:
+        first, _ = symbol_boundaries([len(close)])
+    if open_ is not None:
+        # As in the app, Close stands in for a missing Open
+        open_ = np.where(np.isnan(open_), close, open_)
+    gpz = gpz_frame(levels, open_, close)
+    codes = gpz["GPZ"].cat.codes.to_numpy()
+    confirmed = gpz["GPZ_FirstFact"].to_numpy() & gpz["GPZ_SecondFact"].to_numpy() & ~first
+
+    masks = {
+        "GPZ Bullish": codes == BULLISH,
+        "GPZ Bearish": codes == BEARISH,
+        "GPZ Bullish (confirmed)": (codes == BULLISH) & confirmed,
+        "GPZ Bearish (confirmed)": (codes == BEARISH) & confirmed,
+    }
+    cpr = relationship_codes(_prior(levels["TC"], first), _prior(levels["BC"], first),
+                             levels["TC"], levels["BC"], unchanged_threshold)
+    for name, code in CPR_SIGNAL_CODES.items():
+        masks[name] = cpr == code
+    return masks
+
+
+def next_period_outcomes(levels, open_, high, low, close, last=None):
+    """Long return and level checks for the period after each row.
+
+    Entry is the next Open, or this row's Close where there is no Open.
+    Rows without a following period of the same symbol are NaN / False.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    if last is None:
+        _, last = symbol_boundaries([len(close)])
+    next_high = _following(np.asarray(high, dtype=np.float64), last)
+    next_low = _following(np.asarray(low, dtype=np.float64), last)
+    next_close = _following(close, last)
+    entry = close
+    if open_ is not None:
+        next_open = _following(np.asarray(open_, dtype=np.float64), last)
+        entry = np.where(np.isnan(next_open), close, next_open)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        long_return = next_close / entry - 1
+    return {
+        "Return": long_return,
+        "LongTarget": next_high >= levels["Cam_R3"],
+        "ShortTarget": next_low <= levels["Cam_S3"],
+        "LongStop": next_low <= levels["Cam_S4"],
+        "ShortStop": next_high >= levels["Cam_R4"],
+        "LongHeld": next_low >= levels["BC"],
+        "ShortHeld": next_high <= levels["TC"],
+    }
+
+
+def _compounded(r):
+    """Every trade compounded in sequence (pooled across symbols, so a
+    figure for comparing signals rather than an account curve). A trade
+    loses at most 100%: a short whose period gaps past twice the entry
+    would otherwise turn log1p, and the whole figure, into NaN."""
+    with np.errstate(divide="ignore"):
+        return float(np.expm1(np.log1p(np.maximum(r, -1.0)).sum()))
+
+
+def _signal_stats(rows, direction, outcomes):
+    r = direction * outcomes["Return"][rows]
+    if not len(r):
+        return dict.fromkeys(STAT_COLUMNS, np.nan) | {"Trades": 0}
+    side = "Long" if direction > 0 else "Short"
+    gains, losses = r[r > 0].sum(), -r[r < 0].sum()
+    return {
+        "Trades": len(r),
+        "HitRate": float((r > 0).mean()),
+        "MeanReturn": float(r.mean()),
+        "MedianReturn": float(np.median(r)),
+        "StdReturn": float(r.std(ddof=1)) if len(r) > 1 else np.nan,
+        "TotalReturn": _compounded(r),
+        "ProfitFactor": float(gains / losses) if losses > 0 else np.inf,
+        "TargetRate": float(outcomes[f"{side}Target"][rows].mean()),
+        "StopRate": float(outcomes[f"{side}Stop"][rows].mean()),
+        "CPRHeldRate": float(outcomes[f"{side}Held"][rows].mean()),
+    }
+
+
+def signal_stats(masks, outcomes, signals=SIGNALS):
+    """Stats table indexed by signal name; ``signals`` maps name -> direction."""
+    tradable = np.isfinite(outcomes["Return"])
+    rows = {name: _signal_stats(np.flatnonzero(masks[name] & tradable), direction, outcomes)
+            for name, direction in signals.items()}
+    stats = pd.DataFrame.from_dict(rows, orient="index", columns=list(STAT_COLUMNS)).rename_axis("Signal")
+    return stats.astype({"Trades": "int64"})
+
+
+def signal_stats_by_symbol(masks, outcomes, symbol_codes, symbols):
+    """Per-symbol Trades / HitRate / MeanReturn / StdReturn / TargetRate /
+    StopRate via bincount, as a long table with Symbol and Signal columns."""
+    n_symbols = len(symbols)
+    parts = []
+    for name, direction in SIGNALS.items():
+        returns = direction * outcomes["Return"]
+        traded = masks[name] & np.isfinite(returns)
+        codes, r = symbol_codes[traded], returns[traded]
+        side = "Long" if direction > 0 else "Short"
+        trades = np.bincount(codes, minlength=n_symbols)
+        total = np.bincount(codes, weights=r, minlength=n_symbols)
+        squares = np.bincount(codes, weights=r * r, minlength=n_symbols)
+        wins = np.bincount(codes, weights=r > 0, minlength=n_symbols)
+        targets = np.bincount(codes, weights=outcomes[f"{side}Target"][traded], minlength=n_symbols)
+        stops = np.bincount(codes, weights=outcomes[f"{side}Stop"][traded], minlength=n_symbols)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / trades
+            var = (squares - trades * mean * mean) / (trades - 1)
+            parts.append(pd.DataFrame({
+                SYMBOL_COL: symbols, "Signal": name, "Trades": trades,
+                "HitRate": wins / trades, "MeanReturn": mean,
+                "StdReturn": np.sqrt(np.where(trades > 1, np.maximum(var, 0), np.nan)),
+                "TargetRate": targets / trades, "StopRate": stops / trades,
+            }))
+    return pd.concat(parts, ignore_index=True)
+
+
+# ==========================================================
+# --- Entry points ---
+def backtest_periods(frame, multiplier=CAMARILLA_MULTIPLIER, unchanged_threshold=UNCHANGED_THRESHOLD):
+    """Per-period signals and next-period outcomes for one aggregated frame
+    (Date, [Open], High, Low, Close), one row per period."""
+    open_ = frame["Open"].to_numpy(dtype=np.float64) if "Open" in frame.columns else None
+    high, low, close = (frame[c].to_numpy(dtype=np.float64) for c in ("High", "Low", "Close"))
+    levels = compute_levels(high, low, close, multiplier=multiplier)
+    out = pd.DataFrame(signal_masks(levels, open_, close, unchanged_threshold=unchanged_threshold),
+                       index=frame.index)
+    out.insert(0, "Date", frame["Date"])
+    for name, values in next_period_outcomes(levels, open_, high, low, close).items():
+        out[name] = values
+    return out
+
+
+def backtest(df, data_freq="Daily", multiplier=CAMARILLA_MULTIPLIER, unchanged_threshold=UNCHANGED_THRESHOLD):
+    """Signal stats for one raw OHLC history at ``data_freq``."""
+    stats, errors = backtest_universe({"": df}, data_freq, multiplier, unchanged_threshold)
+    if errors:
+        raise ValueError(errors[""])
+    return stats
+
+
+def backtest_universe(frames, data_freq="Daily", multiplier=CAMARILLA_MULTIPLIER,
+                      unchanged_threshold=UNCHANGED_THRESHOLD, by_symbol=False):
+    """Backtest every symbol in ``frames`` (symbol -> raw OHLC frame) at once.
+
+    Returns ``(stats, errors)``: signal stats pooled over all symbols (or
+    per symbol and signal when ``by_symbol`` is true) and a dict of symbol ->
+    reason for skipped symbols.
+    """
+    symbols, lengths, arrays, errors = stack_universe(frames, data_freq)
+    first, last = symbol_boundaries(lengths)
+    open_, high, low, close = (arrays[name] for name in ("open", "high", "low", "close"))
+
+    levels = compute_levels(high, low, close, multiplier=multiplier)
+    masks = signal_masks(levels, open_, close, first, unchanged_threshold)
+    outcomes = next_period_outcomes(levels, open_, high, low, close, last)
+    if by_symbol:
+        symbol_codes = np.repeat(np.arange(len(symbols)), lengths)
+        return signal_stats_by_symbol(masks, outcomes, symbol_codes, symbols), errors
+    return signal_stats(masks, outcomes), errors
+
+
+def stack_universe(frames, data_freq="Daily"):
+    """Aggregate every symbol to ``data_freq`` and concatenate the prices.
+
+    Returns ``(symbols, lengths, arrays, errors)``: ``arrays`` maps open /
+    high / low / close to float64 arrays over all symbols' periods (NaN opens
+    for symbols without an Open column) and ``lengths`` is the number of
+    periods per symbol, in ``symbols`` order.
+    """
+    symbols, parts, errors = [], [], {}
+    for symbol, df in frames.items():
+        try:
+            frame = resample_ohlc(prepare_ohlc(df), data_freq)
+        except Exception as e:
+            errors[symbol] = str(e)
+            continue
+        if len(frame) < 2:
+            errors[symbol] = "Need at least 2 periods."
+            continue
+        symbols.append(symbol)
+        parts.append(frame)
+
+    def column(name):
+        if not parts:
+            return np.empty(0)
+        return np.concatenate([p[name].to_numpy(dtype=np.float64) if name in p.columns
+                               else np.full(len(p), np.nan) for p in parts])
+
+    lengths = np.array([len(p) for p in parts], dtype=np.intp)
+    arrays = {name.lower(): column(name) for name in ("Open", "High", "Low", "Close")}
+    return symbols, lengths, arrays, errors
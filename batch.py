@@ -0,0 +1,120 @@
+"""Multi-symbol batch computation.
+
+Reads a universe either as a workbook with one sheet per symbol or as a
+long-format file with a ``Symbol`` column, then runs analyze_ohlc for every
+symbol across a process pool. Workers receive plain NumPy arrays (dates as
+datetime64[ns], prices as float64) instead of pickled DataFrames, and send
+back column arrays, which are stitched into one combined results table.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analysis import analyze_ohlc, prepare_ohlc
+from dpz import DPZ_TOLERANCE_PCT
+from ingest import csv_engine, excel_engine, file_format
+
+SYMBOL_COL = "Symbol"
+CATEGORY_COLUMNS = ("CPR_Relationship", "CPR_Sentiment", "CE_Relationship", "CE_Sentiment", "GPZ", "DPZ")
+
+
+def split_long(df):
+    return {str(symbol): group.drop(columns=SYMBOL_COL)
+            for symbol, group in df.groupby(SYMBOL_COL, sort=False)}
+
+
+def read_universe(path, name=None):
+    """symbol -> raw OHLC frame for a sheet-per-symbol workbook or a long file.
+
+    ``path`` may also be a file object, with ``name`` giving the extension.
+    """
+    fmt = file_format(name or path)
+    if fmt == "excel":
+        frames = {}
+        for sheet_name, sheet in pd.read_excel(path, sheet_name=None, engine=excel_engine()).items():
+            if SYMBOL_COL in sheet.columns:
+                frames.update(split_long(sheet))
+            else:
+                frames[str(sheet_name)] = sheet
+        return frames
+    if fmt == "csv":
+        return split_long(pd.read_csv(path, engine=csv_engine()))
+    if fmt == "parquet":
+        return split_long(pd.read_parquet(path))
+    return split_long(pd.read_feather(path))
+
+
+def to_arrays(df):
+    """Compact NumPy payload for one symbol's normalized daily history."""
+    df = prepare_ohlc(df)
+    return {
+        "dates": df["Date"].to_numpy(dtype="datetime64[ns]"),
+        "open": df["Open"].to_numpy(dtype=np.float64) if "Open" in df.columns else None,
+        "high": df["High"].to_numpy(dtype=np.float64),
+        "low": df["Low"].to_numpy(dtype=np.float64),
+        "close": df["Close"].to_numpy(dtype=np.float64),
+    }
+
+
+def _analyze_task(task):
+    symbol, arrays, data_freq, market_type, tolerance_pct, history = task
+    df = pd.DataFrame({"Date": arrays["dates"], "High": arrays["high"],
+                       "Low": arrays["low"], "Close": arrays["close"]})
+    if arrays["open"] is not None:
+        df.insert(1, "Open", arrays["open"])
+    try:
+        out = analyze_ohlc(df, data_freq, market_type, tolerance_pct)
+        # Counted after resampling: 10 daily rows can still be a single week
+        if len(out) < 2:
+            raise ValueError(f"Need at least 2 {data_freq.lower()} periods.")
+    except Exception as e:
+        return symbol, None, str(e)
+    if not history:
+        out = out.iloc[-1:]
+    return symbol, {col: out[col].to_numpy() for col in out.columns}, None
+
+
+def run_batch(frames, data_freq="Daily", market_type="Stock Market", tolerance_pct=DPZ_TOLERANCE_PCT,
+              history=False, max_workers=None):
+    """Analyze every symbol in ``frames`` (symbol -> raw OHLC frame).
+
+    Returns ``(results, errors)``: one combined table with a leading Symbol
+    column -- the next-period row per symbol, or every period when
+    ``history`` is true -- and a dict of symbol -> reason for skipped symbols.
+    """
+    tasks, errors = [], {}
+    for symbol, df in frames.items():
+        try:
+            arrays = to_arrays(df)
+        except Exception as e:
+            errors[symbol] = str(e)
+            continue
+        tasks.append((symbol, arrays, data_freq, market_type, tolerance_pct, history))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(tasks) <= 1:
+        outputs = [_analyze_task(task) for task in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            outputs = list(pool.map(_analyze_task, tasks, chunksize=chunksize))
+
+    errors.update((symbol, error) for symbol, _, error in outputs if error is not None)
+    return combine_outputs([(symbol, columns) for symbol, columns, _ in outputs if columns is not None]), errors
+
+
+def combine_outputs(outputs):
+    """One table with a leading Symbol column from ``(symbol, columns)`` worker outputs."""
+    parts = []
+    for symbol, columns in outputs:
+        part = pd.DataFrame(columns)
+        part.insert(0, SYMBOL_COL, symbol)
+        parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=[SYMBOL_COL])
+    results = pd.concat(parts, ignore_index=True)
+    for col in CATEGORY_COLUMNS:
+        results[col] = results[col].astype("category")
+    return results
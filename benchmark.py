@@ -0,0 +1,277 @@
+"""Benchmark suite for the level pipeline.
+
+Generates deterministic synthetic OHLC histories (business days with
+weekends skipped and random holiday gaps, a geometric random walk per
+symbol) and times every pipeline stage separately:
+
+    ingest      read_ohlc + normalize_ohlc from in-memory CSV/Parquet bytes
+    resample_*  Weekly, Monthly and Yearly aggregation of the daily frame
+    levels      compute_levels (CPR, classic R/S and Camarilla in one pass)
+    relations   CPR and Camarilla relationship classification
+    gpz         Golden Pivot Zone classification and facts
+    dpz         DPZ broadcast scan, types and pair labels
+    widths      rolling CPR/Camarilla width mean, z-score and percentile rank
+    confluence  multi-timeframe confluence for all symbols in one sweep
+    plotly      CPR level_chart figure for one symbol (skipped without plotly)
+
+A scenario is ``ROWSxSYMBOLS`` total daily rows spread over that many
+symbols; per-symbol stages are summed over symbols. One symbol can hold at
+most ~85k business days before its dates leave the datetime64[ns] range,
+so the 10M-row scenario is spread over symbols (e.g. 10000000x1000). Every stage is repeated
+and the best and median wall times are written as JSON together with the
+commit and library versions, so two runs can be compared:
+
+    python benchmark.py --scenario 1000x1 80000x1 1000000x100 --output bench.json
+    python benchmark.py --scenario 10000000x1000 --repeat 1 --output big.json
+    python benchmark.py --compare before.json after.json
+
+``--memory ROWS`` instead measures peak and retained traced memory of
+loading one ROWS-long minute-bar upload through the app's cache, in full
+precision and in compact mode (float32 prices and levels):
+
+    python benchmark.py --memory 500000 2000000
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from confluence import universe_confluence
+from data_cache import OhlcCache
+from dpz import DPZ_TOLERANCE_PCT, dpz_hits, dpz_pair_labels, dpz_types
+from gpz import gpz_frame
+from ingest import normalize_ohlc, read_ohlc, resample_ohlc
+from level_engine import compute_levels, shift_levels
+from relationships import camarilla_relationships, cpr_relationships
+from width_stats import width_stats
+
+DEFAULT_SCENARIOS = ("1000x1", "10000x1", "80000x1", "1000000x100")
+HOLIDAY_RATE = 0.02          # share of business days dropped as holidays
+LAST_DATE = pd.Timestamp("2024-12-31")
+EARLIEST_DATE = pd.Timestamp("1678-01-01")   # datetime64[ns] lower bound
+REGRESSION_RATIO = 1.2       # --compare flags stages this much slower
+
+
+# ==========================================================
+# --- Synthetic data ---
+def synthetic_ohlc(n_rows, seed=0, holiday_rate=HOLIDAY_RATE, last_date=LAST_DATE):
+    """Deterministic daily OHLC frame of ``n_rows`` business days ending near ``last_date``."""
+    rng = np.random.default_rng(seed)
+    n_days = int(n_rows / (1 - holiday_rate) * 1.01) + 50
+    if (last_date - EARLIEST_DATE).days < n_days * 7 // 5 + 7:
+        raise ValueError(f"{n_rows} daily rows do not fit in the datetime64[ns] range; "
+                         "spread them over more symbols")
+    end = np.datetime64(last_date.date(), "D")
+    calendar_days = np.arange(end - (n_days * 7 // 5 + 7), end + 1)
+    days = calendar_days[np.is_busday(calendar_days)][-n_days:].astype("datetime64[ns]")
+    keep = rng.random(n_days) >= holiday_rate
+    return _random_walk(days[keep][-n_rows:], rng)
+
+
+def synthetic_intraday(n_rows, seed=0, start="2015-01-01"):
+    """Deterministic OHLC frame of ``n_rows`` consecutive minute bars (a tick-derived history)."""
+    dates = pd.date_range(start, periods=n_rows, freq="min").to_numpy()
+    return _random_walk(dates, np.random.default_rng(seed))
+
+
+def _random_walk(dates, rng):
+    n = len(dates)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.012, n)))
+    open_ = np.r_[close[0], close[:-1]] * np.exp(rng.normal(0, 0.004, n))
+    body_high = np.maximum(open_, close)
+    body_low = np.minimum(open_, close)
+    high = body_high * (1 + np.abs(rng.normal(0, 0.006, n)))
+    low = body_low * (1 - np.abs(rng.normal(0, 0.006, n)))
+    return pd.DataFrame({"Date": dates, "Open": open_.round(2), "High": high.round(2),
+                         "Low": low.round(2), "Close": close.round(2)})
+
+
+def synthetic_universe(total_rows, n_symbols, seed=0):
+    """symbol -> synthetic frame, ``total_rows`` split evenly over ``n_symbols``."""
+    per_symbol = max(2, total_rows // n_symbols)
+    return {f"SYM{i:04d}": synthetic_ohlc(per_symbol, seed=seed + i) for i in range(n_symbols)}
+
+
+def encode(df, fmt):
+    buf = io.BytesIO()
+    if fmt == "csv":
+        df.to_csv(buf, index=False, date_format="%Y-%m-%d")
+    else:
+        df.to_parquet(buf, index=False)
+    return buf.getvalue()
+
+
+# ==========================================================
+# --- Stages ---
+def _timed(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def _plot_stage():
+    try:
+        from charts import level_chart
+    except ImportError:
+        return None
+
+    def run(daily, levels):
+        applied = shift_levels(levels)
+        df = pd.DataFrame({"Date": daily["Date"], "Pivot": applied["Pivot"], "BC": applied["BC"], "TC": applied["TC"]})
+        return level_chart(df, [("TC", {}), ("Pivot", {}), ("BC", {})])
+    return run
+
+
+def run_scenario(total_rows, n_symbols, repeat=3, ingest_format="csv", seed=0):
+    """Stage name -> list of wall times (seconds) for one scenario."""
+    universe = synthetic_universe(total_rows, n_symbols, seed)
+    payloads = [encode(df, ingest_format) for df in universe.values()]
+    name = f"bench.{ingest_format}"
+    timings = {}
+
+    def per_symbol(stage, fn, inputs):
+        times = [0.0] * repeat
+        outputs = []
+        for item in inputs:
+            item_times, out = _timed(lambda: fn(item), repeat)
+            times = [t + dt for t, dt in zip(times, item_times)]
+            outputs.append(out)
+        timings[stage] = times
+        return outputs
+
+    dailies = per_symbol("ingest", lambda data: normalize_ohlc(read_ohlc(data, name)), payloads)
+    for freq in ("Weekly", "Monthly", "Yearly"):
+        per_symbol(f"resample_{freq.lower()}", lambda df: resample_ohlc(df, freq), dailies)
+
+    arrays = [(df["High"].to_numpy(), df["Low"].to_numpy(), df["Close"].to_numpy(), df["Open"].to_numpy())
+              for df in dailies]
+    levels = per_symbol("levels", lambda a: compute_levels(a[0], a[1], a[2]), arrays)
+    pairs = list(zip(levels, arrays))
+    per_symbol("relations", lambda p: (cpr_relationships(p[0]["TC"], p[0]["BC"]),
+                                       camarilla_relationships(p[0]["Cam_R3"], p[0]["Cam_S3"])), pairs)
+    per_symbol("gpz", lambda p: gpz_frame(p[0], p[1][3], p[1][2]), pairs)
+
+    def dpz(p):
+        hits = dpz_hits(p[0], p[1][2], DPZ_TOLERANCE_PCT)
+        return dpz_types(hits), dpz_pair_labels(hits)
+    per_symbol("dpz", dpz, pairs)
+    per_symbol("widths", lambda p: width_stats(p[0], p[1][2]), pairs)
+    timings["confluence"], _ = _timed(lambda: universe_confluence(dict(zip(universe, dailies))), repeat)
+
+    plot = _plot_stage()
+    if plot is not None:
+        timings["plotly"], _ = _timed(lambda: plot(dailies[0], levels[0]), repeat)
+    return timings
+
+
+def memory_scenario(n_rows, compact, ingest_format="parquet", seed=0):
+    """Peak and retained traced bytes of one cold upload load through OhlcCache."""
+    payload = encode(synthetic_intraday(n_rows, seed), ingest_format)
+    cache = OhlcCache(compact=compact)
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        entry = cache.load(payload, "Daily", name=f"bench.{ingest_format}")
+        seconds = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del entry
+    return {"rows": n_rows, "compact": compact, "seconds": seconds,
+            "peak_mb": peak / 2**20, "retained_mb": current / 2**20}
+
+
+# ==========================================================
+# --- Reporting ---
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scenarios=DEFAULT_SCENARIOS, repeat=3, ingest_format="csv", seed=0, log=None):
+    results = []
+    for scenario in scenarios:
+        total_rows, n_symbols = (int(part) for part in scenario.lower().split("x"))
+        timings = run_scenario(total_rows, n_symbols, repeat, ingest_format, seed)
+        for stage, times in timings.items():
+            row = {"scenario": scenario, "rows": total_rows, "symbols": n_symbols, "stage": stage,
+                   "best_s": min(times), "median_s": statistics.median(times), "repeat": len(times)}
+            results.append(row)
+            if log:
+                log(f"{scenario:>14} {stage:<18} best {row['best_s'] * 1000:10.2f} ms")
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": pd.Timestamp.now(tz="UTC").isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "ingest_format": ingest_format,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(before, after, ratio=REGRESSION_RATIO):
+    """Stage-by-stage best-time ratios (after / before) for matching scenarios."""
+    old = {(r["scenario"], r["stage"]): r["best_s"] for r in before["results"]}
+    rows = [{"scenario": r["scenario"], "stage": r["stage"], "before_s": old[(r["scenario"], r["stage"])],
+             "after_s": r["best_s"]} for r in after["results"] if (r["scenario"], r["stage"]) in old]
+    table = pd.DataFrame(rows, columns=["scenario", "stage", "before_s", "after_s"])
+    table["ratio"] = table["after_s"] / table["before_s"]
+    table["regression"] = table["ratio"] > ratio
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each stage of the CPR / Camarilla pipeline on synthetic data.")
+    parser.add_argument("--scenario", nargs="+", default=list(DEFAULT_SCENARIOS),
+                        help="ROWSxSYMBOLS, e.g. 1000000x10 (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ingest-format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files and exit")
+    parser.add_argument("--memory", nargs="+", type=int, metavar="ROWS",
+                        help="measure upload memory, full vs compact, and exit")
+    args = parser.parse_args(argv)
+
+    if args.memory:
+        rows = [memory_scenario(n, compact, args.ingest_format, args.seed)
+                for n in args.memory for compact in (False, True)]
+        print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+        return 0
+
+    if args.compare:
+        with open(args.compare[0]) as f_before, open(args.compare[1]) as f_after:
+            table = compare(json.load(f_before), json.load(f_after))
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        return 1 if table["regression"].any() else 0
+
+    report = run_benchmarks(args.scenario, args.repeat, args.ingest_format, args.seed,
+                            log=lambda line: print(line, file=sys.stderr, flush=True))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"Wrote {len(report['results'])} timings to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
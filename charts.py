@@ -0,0 +1,74 @@
+"""Plotly builders for the per-period level charts.
+
+Each level is drawn as ONE trace of short horizontal segments separated by
+NaN gaps, so a chart has one trace (and one legend entry) per level no
+matter how many periods it shows. A chart draws at most one segment per
+PX_PER_SEGMENT pixels of its width; wider windows are downsampled into
+buckets that each draw the bucket's most recent value across the bucket's
+span, and large charts switch to WebGL (Scattergl).
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+SEGMENT_HALF_WIDTH = pd.Timedelta(hours=8)
+PX_PER_SEGMENT = 2
+# Streamlit does not report a container's width to the script, so charts
+# stretched to their container assume a full-width plot in the wide layout
+DEFAULT_CHART_WIDTH = 1200
+MAX_SEGMENTS = DEFAULT_CHART_WIDTH // PX_PER_SEGMENT
+WEBGL_THRESHOLD = 1000    # points per trace above which Scattergl is used
+
+
+def level_segments(df, columns, max_segments=MAX_SEGMENTS, half_width=SEGMENT_HALF_WIDTH):
+    """NaN-separated segment arrays for ``columns`` of a Date-indexed frame.
+
+    Returns ``(x, {column: y})``. Buckets are counted back from the newest
+    row so the last period (the next session) is always drawn on its own
+    when no downsampling is needed, and always ends the last bucket.
+    """
+    dates = pd.DatetimeIndex(df["Date"]).as_unit("ns").to_numpy()
+    n = len(dates)
+    bucket = max(1, -(-n // max_segments))
+    ends = np.arange(n - 1, -1, -bucket)[::-1]
+    starts = np.maximum(ends - bucket + 1, 0)
+
+    x = np.empty(3 * len(ends), dtype="datetime64[ns]")
+    x[0::3] = dates[starts] - half_width.to_timedelta64()
+    x[1::3] = dates[ends] + half_width.to_timedelta64()
+    x[2::3] = np.datetime64("NaT")
+
+    ys = {}
+    for col in columns:
+        values = df[col].to_numpy(dtype=np.float64)[ends]
+        y = np.empty(3 * len(ends), dtype=np.float64)
+        y[0::3] = values
+        y[1::3] = values
+        y[2::3] = np.nan
+        ys[col] = y
+    return pd.DatetimeIndex(x), ys
+
+
+def segment_cap(width, px_per_segment=PX_PER_SEGMENT):
+    """Most segments worth drawing across ``width`` pixels."""
+    return max(1, int(width) // px_per_segment)
+
+
+def level_chart(df, lines, width=None, max_segments=None):
+    """Figure with one segment trace per level.
+
+    ``lines`` is a list of ``(column, line_style)`` pairs; the column name
+    is used as the trace name. ``width`` (pixels) fixes the figure width and
+    caps the segments drawn; without it the chart is sized by its container
+    and DEFAULT_CHART_WIDTH is assumed. ``max_segments`` overrides the cap.
+    """
+    if max_segments is None:
+        max_segments = segment_cap(width or DEFAULT_CHART_WIDTH)
+    x, ys = level_segments(df, [col for col, _ in lines], max_segments=max_segments)
+    scatter = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+    fig = go.Figure()
+    for col, line in lines:
+        fig.add_trace(scatter(x=x, y=ys[col], mode="lines", line=line, name=col, connectgaps=False))
+    if width:
+        fig.update_layout(width=width)
+    return fig
@@ -0,0 +1,244 @@
+"""Multi-timeframe level confluence.
+
+Pools the next-period levels of every frequency -- Daily, Weekly, Monthly
+and Yearly CPR, classic and Camarilla -- into one array and finds the
+prices where several timeframes agree. After one sort, a sweep cuts the
+levels into clusters no wider than the tolerance (a cluster takes every
+level within one tolerance of its lowest member), so n levels cost
+O(n log n) rather than the pairwise comparisons the DPZ scan makes within
+one frequency.
+
+Only the last period of each frequency matters, so its High/Low/Close are
+read straight off the daily arrays (a binary search for the period start)
+instead of resampling the whole history. A universe is clustered in the
+same single pass: levels are sorted by symbol and price together, and a
+cluster never spans two symbols.
+
+    python confluence.py universe.xlsx --tolerance 0.002 --output confluence.csv
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from ingest import FREQUENCIES, period_labels
+from level_engine import compute_levels
+
+CONFLUENCE_TOLERANCE_PCT = 0.002   # 0.2% of price
+MIN_TIMEFRAMES = 2
+
+CONFLUENCE_LEVELS = ("R3", "R2", "R1", "TC", "Pivot", "BC", "S1", "S2", "S3",
+                     "Cam_R4", "Cam_R3", "Cam_S3", "Cam_S4")
+
+# Higher timeframes weigh more in a cluster's score
+FREQUENCY_WEIGHTS = {"Daily": 1, "Weekly": 2, "Monthly": 3, "Yearly": 4}
+FREQUENCY_TAGS = {"Daily": "D", "Weekly": "W", "Monthly": "M", "Yearly": "Y"}
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(1 << len(FREQUENCIES))], dtype=np.int8)
+
+
+# ==========================================================
+# --- Last period per frequency ---
+def _period_start(day, data_freq):
+    """First calendar day of the period containing ``day`` (datetime64[D])."""
+    if data_freq == "Weekly":
+        return period_labels(np.array([day]), "Weekly")[0] - 6     # Saturday after the previous W-FRI label
+    if data_freq == "Monthly":
+        return day.astype("datetime64[M]").astype("datetime64[D]")
+    if data_freq == "Yearly":
+        return day.astype("datetime64[Y]").astype("datetime64[D]")
+    return day
+
+
+def last_periods(df):
+    """{frequency: (high, low, close, open)} of the last period of a date-sorted daily frame.
+
+    Same aggregation as resample_ohlc (Daily rows pass through), over the
+    rows from the period start only. Open is NaN when the frame has none.
+    """
+    dates = df["Date"].to_numpy().astype("datetime64[ns]")
+    high, low, close = (df[col].to_numpy() for col in ("High", "Low", "Close"))
+    open_ = df["Open"].to_numpy() if "Open" in df.columns else None
+    last_day = dates[-1].astype("datetime64[D]")
+    out = {}
+    for freq in FREQUENCIES:
+        if freq == "Daily":
+            start = len(dates) - 1
+        else:
+            start = int(np.searchsorted(dates, _period_start(last_day, freq).astype("datetime64[ns]"), "left"))
+        out[freq] = (np.fmax.reduce(high[start:]), np.fmin.reduce(low[start:]), close[-1],
+                     open_[start] if open_ is not None else np.nan)
+    return out
+
+
+def next_levels(periods, level_names=CONFLUENCE_LEVELS):
+    """{frequency: {level: array}} for stacked last periods.
+
+    ``periods`` is a list of last_periods() results, one per symbol; every
+    frequency is run through the level engine once for all symbols.
+    """
+    out = {}
+    for freq in FREQUENCIES:
+        high, low, close, open_ = (np.array(values, dtype=np.float64)
+                                   for values in zip(*(p[freq] for p in periods)))
+        levels = compute_levels(high, low, close, open_=open_)
+        out[freq] = {name: levels[name] for name in level_names}
+    return out
+
+
+# ==========================================================
+# --- Sort and sweep ---
+def sweep_clusters(prices, tolerance, groups=None):
+    """Sort ``prices`` and cut them into clusters at most ``tolerance`` wide.
+
+    Sweeping up from the lowest level, a cluster takes every level within
+    one tolerance of its first one, and the next level starts a new
+    cluster. ``tolerance`` is a scalar or one value per price; ``groups``
+    (e.g. symbol codes) keeps clusters from spanning groups. Returns
+    ``(order, starts)``: the sorting permutation and the positions in sorted
+    order where each cluster begins.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    groups = np.zeros(len(prices), dtype=np.int64) if groups is None else np.asarray(groups)
+    order = np.lexsort((prices, groups))
+    sorted_prices, sorted_groups = prices[order], groups[order]
+    tolerance = np.broadcast_to(np.asarray(tolerance, dtype=np.float64), prices.shape)[order]
+
+    # Complex keys compare by (group, price), so one searchsorted finds where
+    # each level's window ends without crossing into the next group
+    keys = sorted_groups + 1j * sorted_prices
+    jump = np.searchsorted(keys, sorted_groups + 1j * (sorted_prices + tolerance), "right")
+
+    # Cluster starts are the chain 0 -> jump[0] -> ...; pointer doubling
+    # walks it in log2(n) vectorized passes instead of one step per cluster
+    n = len(prices)
+    jump = np.r_[jump, n]
+    is_start = np.zeros(n + 1, dtype=bool)
+    is_start[0] = True
+    for _ in range(max(1, int(n).bit_length())):
+        is_start[jump[is_start]] = True
+        jump = jump[jump]
+    return order, np.flatnonzero(is_start[:n])
+
+
+def pool_levels(levels_by_freq, level_names=CONFLUENCE_LEVELS):
+    """Flatten next_levels() output into price, symbol, frequency and level code arrays."""
+    prices, symbols, freqs, names = [], [], [], []
+    for f, freq in enumerate(FREQUENCIES):
+        for k, name in enumerate(level_names):
+            values = levels_by_freq[freq][name]
+            prices.append(values)
+            symbols.append(np.arange(len(values)))
+            freqs.append(np.full(len(values), f, dtype=np.int8))
+            names.append(np.full(len(values), k, dtype=np.int16))
+    prices, symbols, freqs, names = (np.concatenate(a) for a in (prices, symbols, freqs, names))
+    valid = ~np.isnan(prices)
+    return prices[valid], symbols[valid], freqs[valid], names[valid]
+
+
+def find_confluence(levels_by_freq, closes, tolerance_pct=CONFLUENCE_TOLERANCE_PCT,
+                    min_timeframes=MIN_TIMEFRAMES, level_names=CONFLUENCE_LEVELS):
+    """Ranked clusters of levels from at least ``min_timeframes`` frequencies.
+
+    ``closes`` holds each symbol's last close, which sets its tolerance
+    (``tolerance_pct`` of price) and the cluster's distance from price.
+    Returns one row per cluster: Symbol (position in ``closes``), Rank,
+    Low/High/Center price, DistancePct from the close, Timeframes, Levels,
+    Score (summed FREQUENCY_WEIGHTS) and Members; rank 1 is the cluster with the most timeframes,
+    then the highest score, then the most levels.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    prices, symbols, freqs, names = pool_levels(levels_by_freq, level_names)
+    order, starts = sweep_clusters(prices, closes[symbols] * tolerance_pct, symbols)
+    prices, symbols, freqs, names = prices[order], symbols[order], freqs[order], names[order]
+
+    weights = np.array([FREQUENCY_WEIGHTS[freq] for freq in FREQUENCIES], dtype=np.int64)
+    ends = np.r_[starts[1:], len(prices)].astype(np.int64)
+    if len(prices):
+        timeframes = _POPCOUNT[np.bitwise_or.reduceat(np.left_shift(1, freqs.astype(np.int64)), starts)]
+        center = np.add.reduceat(prices, starts) / (ends - starts)
+        score = np.add.reduceat(weights[freqs], starts)
+    else:
+        timeframes, center, score = np.zeros(0, dtype=np.int8), np.zeros(0), np.zeros(0, dtype=np.int64)
+    keep = timeframes >= min_timeframes
+    starts, ends, timeframes, center, score = starts[keep], ends[keep], timeframes[keep], center[keep], score[keep]
+    counts = ends - starts
+
+    cluster_symbols = symbols[starts]
+    low, high = prices[starts], prices[ends - 1]
+    rank_order = np.lexsort((high - low, -counts, -score, -timeframes, cluster_symbols))
+    ranked = cluster_symbols[rank_order]
+    first = np.r_[0, np.flatnonzero(ranked[1:] != ranked[:-1]) + 1] if len(ranked) else np.zeros(0, dtype=np.int64)
+    rank = np.arange(len(ranked)) - np.repeat(first, np.diff(np.r_[first, len(ranked)])) + 1
+
+    tags = [FREQUENCY_TAGS[freq] for freq in FREQUENCIES]
+    members = [", ".join(f"{tags[f]}:{level_names[k]}" for f, k in zip(freqs[s:e].tolist(), names[s:e].tolist()))
+               for s, e in zip(starts[rank_order].tolist(), ends[rank_order].tolist())]
+    center = center[rank_order]
+    return pd.DataFrame({
+        "Symbol": ranked,
+        "Rank": rank,
+        "Low": low[rank_order],
+        "High": high[rank_order],
+        "Center": center,
+        "DistancePct": (center / closes[ranked] - 1) * 100,
+        "Timeframes": timeframes[rank_order],
+        "Levels": counts[rank_order],
+        "Score": score[rank_order],
+        "Members": members,
+    })
+
+
+def confluence_table(df, tolerance_pct=CONFLUENCE_TOLERANCE_PCT, min_timeframes=MIN_TIMEFRAMES,
+                     level_names=CONFLUENCE_LEVELS):
+    """Ranked confluence clusters for one date-sorted daily frame."""
+    periods = [last_periods(df)]
+    closes = [periods[0]["Daily"][2]]
+    table = find_confluence(next_levels(periods, level_names), closes, tolerance_pct, min_timeframes, level_names)
+    return table.drop(columns="Symbol")
+
+
+def universe_confluence(universe, tolerance_pct=CONFLUENCE_TOLERANCE_PCT, min_timeframes=MIN_TIMEFRAMES,
+                        level_names=CONFLUENCE_LEVELS):
+    """Ranked confluence clusters for ``symbol -> daily frame``, in one sort."""
+    symbols = list(universe)
+    periods = [last_periods(universe[symbol]) for symbol in symbols]
+    closes = [p["Daily"][2] for p in periods]
+    table = find_confluence(next_levels(periods, level_names), closes, tolerance_pct, min_timeframes, level_names)
+    table["Symbol"] = np.array(symbols, dtype=object)[table["Symbol"].to_numpy()]
+    return table
+
+
+# ==========================================================
+# --- CLI ---
+def main(argv=None):
+    from analysis import prepare_ohlc
+    from batch import read_universe
+
+    parser = argparse.ArgumentParser(description="Rank multi-timeframe level confluence zones for a universe.")
+    parser.add_argument("universe", help="sheet-per-symbol workbook or long file with a Symbol column")
+    parser.add_argument("--tolerance", type=float, default=CONFLUENCE_TOLERANCE_PCT,
+                        help="cluster tolerance as a fraction of price (default: %(default)s)")
+    parser.add_argument("--min-timeframes", type=int, default=MIN_TIMEFRAMES, choices=range(1, len(FREQUENCIES) + 1))
+    parser.add_argument("--top", type=int, help="keep the best N clusters per symbol")
+    parser.add_argument("--output", default="confluence.csv")
+    args = parser.parse_args(argv)
+
+    universe = {}
+    for symbol, raw in read_universe(args.universe).items():
+        try:
+            universe[symbol] = prepare_ohlc(raw)
+        except Exception as e:
+            print(f"Skipping {symbol}: {e}", file=sys.stderr)
+    universe = {symbol: df for symbol, df in universe.items() if len(df)}
+    table = universe_confluence(universe, args.tolerance, args.min_timeframes)
+    if args.top:
+        table = table[table["Rank"] <= args.top]
+    table.to_csv(args.output, index=False)
+    print(f"Wrote {len(table)} confluence zones for {len(universe)} symbols to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
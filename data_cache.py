@@ -0,0 +1,157 @@
+"""Upload cache for the CPR / Camarilla app.
+
+Streamlit reruns the whole script on every widget change, so each upload
+is parsed once into a resample pyramid -- the Daily, Weekly, Monthly and
+Yearly frames plus their engine levels -- keyed on the file's content hash.
+Switching frequency is then a lookup. Entries live in a bounded in-memory
+LRU and, when pyarrow is available, in a Parquet sidecar directory (one
+file per upload) that survives restarts; levels are recomputed from the
+sidecar frames on load.
+
+A compact cache (``compact=True``) keeps very long histories small: prices
+are parsed straight to float32, the levels are computed in float32, and the
+derived NextDate column is not stored (dates stay datetime64, i.e. int64
+epoch counts). That roughly halves what a cached upload holds -- the levels
+dominate -- at the cost of ~7 significant digits; ``python benchmark.py
+--memory ROWS`` measures both modes.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from ingest import (COMPACT_PRICE_DTYPE, PRICE_COLUMNS, file_format, normalize_ohlc, read_ohlc, resample_ohlc,
+                    stream_resample_csv)
+from profiling import stage
+from pyramid import build_pyramid, pyramid_levels, split_pyramid, stack_pyramid
+
+# CSV uploads above this size are aggregated chunk by chunk instead of
+# being parsed into one daily frame first
+STREAM_CSV_BYTES = 64 * 1024 * 1024
+
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# ==========================================================
+# --- Cache ---
+class OhlcCache:
+    """Bounded LRU of resample pyramids with an optional Parquet sidecar."""
+
+    def __init__(self, max_entries=16, sidecar_dir=None, max_sidecar_files=64, compact=False):
+        self.max_entries = max_entries
+        self.sidecar_dir = sidecar_dir
+        self.max_sidecar_files = max_sidecar_files
+        self.compact = compact
+        self.price_dtype = COMPACT_PRICE_DTYPE if compact else "float64"
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if sidecar_dir:
+            os.makedirs(sidecar_dir, exist_ok=True)
+
+    def _sidecar_path(self, digest):
+        return os.path.join(self.sidecar_dir, f"{digest}.parquet")
+
+    def get(self, digest):
+        """``(frames, levels)`` dicts keyed by frequency, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                return entry
+        frames = self._read_sidecar(digest)
+        if frames is None:
+            return None
+        entry = (frames, pyramid_levels(frames))
+        self._remember(digest, entry)
+        return entry
+
+    def put(self, digest, frames):
+        with stage("pyramid levels"):
+            entry = (frames, pyramid_levels(frames))
+        self._remember(digest, entry)
+        with stage("sidecar write"):
+            self._write_sidecar(digest, frames)
+        return entry
+
+    def _remember(self, digest, entry):
+        with self._lock:
+            self._entries[digest] = entry
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_sidecar(self, digest):
+        if not self.sidecar_dir:
+            return None
+        path = self._sidecar_path(digest)
+        if not os.path.exists(path):
+            return None
+        try:
+            frames = split_pyramid(pd.read_parquet(path))
+        except Exception:
+            # Missing pyarrow, a half-written or an old-layout file: treat as a miss
+            return None
+        os.utime(path)
+        return frames
+
+    def _write_sidecar(self, digest, frames):
+        if not self.sidecar_dir:
+            return
+        path = self._sidecar_path(digest)
+        tmp_path = path + ".tmp"
+        try:
+            stack_pyramid(frames).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict_sidecars()
+
+    def _evict_sidecars(self):
+        files = [os.path.join(self.sidecar_dir, f) for f in os.listdir(self.sidecar_dir)
+                 if f.endswith(".parquet")]
+        if len(files) <= self.max_sidecar_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_sidecar_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def load(self, data, data_freq, name="upload.xlsx"):
+        """Return ``(frame, levels)`` for ``data`` at ``data_freq``.
+
+        The frame is a shallow copy of the cached one: under pandas'
+        copy-on-write, columns the caller adds or overwrites never reach the
+        cache. ``levels`` is the cached compute_levels output for it, with
+        read-only arrays. ``name`` is the uploaded file name; its extension
+        picks the reader. Compact frames have float32 prices and no NextDate.
+        """
+        with stage("hash + cache lookup"):
+            # Compact and full-precision pyramids of one file are kept apart
+            digest = file_digest(data) + ("-compact" if self.compact else "")
+            entry = self.get(digest)
+        if entry is None:
+            if file_format(name) == "csv" and len(data) > STREAM_CSV_BYTES:
+                with stage("stream csv"):
+                    daily = stream_resample_csv(data, "Daily", name=name)
+                    if self.compact:
+                        daily = daily.astype({c: self.price_dtype for c in daily.columns if c in PRICE_COLUMNS})
+            else:
+                with stage("read"):
+                    raw = read_ohlc(data, name, price_dtype=self.price_dtype)
+                with stage("normalize"):
+                    daily = resample_ohlc(normalize_ohlc(raw), "Daily")
+            with stage("resample pyramid"):
+                frames = build_pyramid(daily)
+                if self.compact:
+                    frames = {freq: df.drop(columns="NextDate") for freq, df in frames.items()}
+            entry = self.put(digest, frames)
+        frames, levels = entry
+        return frames[data_freq].copy(deep=False), levels[data_freq]
@@ -0,0 +1,135 @@
+"""Double Pivot Hot Zone (DPZ) scanner.
+
+Compares the classic pivot levels against the Camarilla levels for every
+row of a level-engine output at once, as a (rows x classic x camarilla)
+broadcast. A pair overlaps when the two levels are within
+``tolerance_pct`` of that row's Close. Only the classic/Camarilla pairs the
+app reports carry a strength label; the rest of the grid is masked out.
+"""
+import numpy as np
+import pandas as pd
+
+DPZ_TOLERANCE_PCT = 0.001   # 0.1% of price
+
+CLASSIC_LEVELS = ("R1", "R2", "Pivot", "S1", "S2")
+CAMARILLA_LEVELS = ("R3", "R4", "S3", "S4")
+
+# (classic, camarilla) -> strength label, in the order the app lists them
+DPZ_PAIRS = {
+    ("R1", "R3"): "Resistance DPZ",
+    ("R1", "R4"): "Strong Resistance DPZ",
+    ("R2", "R3"): "Resistance DPZ",
+    ("R2", "R4"): "Very Strong Resistance DPZ",
+    ("Pivot", "R3"): "Resistance DPZ",
+    ("Pivot", "R4"): "Very Strong Resistance DPZ",
+    ("S1", "S3"): "Support DPZ",
+    ("S1", "S4"): "Strong Support DPZ",
+    ("S2", "S3"): "Support DPZ",
+    ("S2", "S4"): "Very Strong Support DPZ",
+    ("Pivot", "S3"): "Support DPZ",
+    ("Pivot", "S4"): "Strong Support DPZ",
+}
+
+DPZ_TYPES = ("None", "Resistance Double Pivot Hot Zone", "Support Double Pivot Hot Zone",
+             "Mixed (Support & Resistance DPZ)")
+
+# Pair grid lookups: mask of labelled pairs, display rank, resistance side
+_PAIR_MASK = np.zeros((len(CLASSIC_LEVELS), len(CAMARILLA_LEVELS)), dtype=bool)
+_PAIR_RANK = np.zeros(_PAIR_MASK.shape, dtype=np.int16)
+_PAIR_STRENGTH = np.full(_PAIR_MASK.shape, "", dtype=object)
+for _rank, ((_classic, _cam), _strength) in enumerate(DPZ_PAIRS.items()):
+    _i, _j = CLASSIC_LEVELS.index(_classic), CAMARILLA_LEVELS.index(_cam)
+    _PAIR_MASK[_i, _j] = True
+    _PAIR_RANK[_i, _j] = _rank
+    _PAIR_STRENGTH[_i, _j] = _strength
+_RESISTANCE_MASK = _PAIR_MASK & np.array([[cam.startswith("R") for cam in CAMARILLA_LEVELS]])
+
+
+def _stack_levels(levels):
+    classic = np.column_stack([levels[name] for name in CLASSIC_LEVELS])
+    camarilla = np.column_stack([levels[f"Cam_{name}"] for name in CAMARILLA_LEVELS])
+    return classic, camarilla
+
+
+def _hits(classic, camarilla, close, tolerance_pct):
+    close = np.asarray(close, dtype=np.float64)
+    tolerance = close * tolerance_pct
+    hits = np.abs(classic[:, :, None] - camarilla[:, None, :]) <= tolerance[:, None, None]
+    hits &= _PAIR_MASK
+    hits &= (close != 0)[:, None, None]
+    return hits
+
+
+def dpz_hits(levels, close, tolerance_pct=DPZ_TOLERANCE_PCT):
+    """Boolean (rows, classic, camarilla) array of overlapping labelled pairs."""
+    return _hits(*_stack_levels(levels), close, tolerance_pct)
+
+
+def dpz_types(hits, index=None):
+    """Per-row DPZ type: none, resistance, support or mixed."""
+    has_res = (hits & _RESISTANCE_MASK).any(axis=(1, 2))
+    has_sup = (hits & ~_RESISTANCE_MASK).any(axis=(1, 2))
+    codes = has_res.astype(np.int8) + 2 * has_sup.astype(np.int8)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=DPZ_TYPES), index=index, name="DPZ")
+
+
+def dpz_side_gaps(levels):
+    """Smallest |classic - Camarilla| gap per row over the labelled
+    resistance pairs and over the support pairs.
+
+    A row has a resistance (support) DPZ at a tolerance exactly when its
+    resistance (support) gap is <= Close * tolerance_pct, so a sweep over
+    tolerances needs the (rows x classic x camarilla) broadcast only once.
+    """
+    classic, camarilla = _stack_levels(levels)
+    gaps = np.abs(classic[:, :, None] - camarilla[:, None, :])
+    res_gap = np.where(_RESISTANCE_MASK, gaps, np.inf).min(axis=(1, 2))
+    sup_gap = np.where(_PAIR_MASK & ~_RESISTANCE_MASK, gaps, np.inf).min(axis=(1, 2))
+    return res_gap, sup_gap
+
+
+def dpz_pair_labels(hits):
+    """Per-row "R1~R3, Pivot~S4" style summary of the overlapping pairs.
+
+    Each row's hits are packed into a bitmask in reporting order, so only
+    the distinct combinations (a handful) are formatted as strings.
+    """
+    weights = np.zeros(_PAIR_MASK.shape, dtype=np.int64)
+    weights[_PAIR_MASK] = 1 << _PAIR_RANK[_PAIR_MASK].astype(np.int64)
+    masks = hits.reshape(len(hits), -1).astype(np.int64) @ weights.ravel()
+    unique_masks, inverse = np.unique(masks, return_inverse=True)
+    names = [f"{classic}~{cam}" for classic, cam in DPZ_PAIRS]
+    labels = np.array([", ".join(name for rank, name in enumerate(names) if mask >> rank & 1)
+                       for mask in unique_masks.tolist()], dtype=object)
+    return labels[inverse.ravel()]
+
+
+def dpz_table(levels, hits, index=None):
+    """Long table of the overlapping pairs flagged in ``hits``.
+
+    One row per hit with the period (``Period``, a label from ``index`` or a
+    position), the two level names and values, the strength label and side,
+    ordered by period and then in the app's reporting order.
+    """
+    classic, camarilla = _stack_levels(levels)
+    rows, ci, ki = np.nonzero(hits)
+    order = np.lexsort((_PAIR_RANK[ci, ki], rows))
+    rows, ci, ki = rows[order], ci[order], ki[order]
+
+    classic_names = np.array(CLASSIC_LEVELS, dtype=object)[ci]
+    cam_names = np.array(CAMARILLA_LEVELS, dtype=object)[ki]
+    period = rows if index is None else np.asarray(index)[rows]
+    return pd.DataFrame({
+        "Period": period,
+        "Classic": classic_names,
+        "ClassicValue": classic[rows, ci],
+        "Camarilla": cam_names,
+        "CamarillaValue": camarilla[rows, ki],
+        "Strength": _PAIR_STRENGTH[ci, ki],
+        "Side": np.where(_RESISTANCE_MASK[ci, ki], "Resistance", "Support"),
+    })
+
+
+def scan_dpz(levels, close, tolerance_pct=DPZ_TOLERANCE_PCT, index=None):
+    """Every overlapping pair in the history, as a dpz_table."""
+    return dpz_table(levels, dpz_hits(levels, close, tolerance_pct), index=index)
@@ -0,0 +1,396 @@
+"""Bulk export of full-history analysis tables to CSV, Parquet and Excel.
+
+Tables -- one analyze_ohlc history per symbol (and frequency) -- are
+written one at a time in batches of BATCH_ROWS rows, so memory holds one
+table plus one batch however many symbols are exported:
+
+    csv      one file with leading Symbol [and Frequency] columns, written
+             by pyarrow's CSV writer (pandas without pyarrow, much slower)
+    parquet  the same layout through one pyarrow ParquetWriter, a row
+             group per batch
+    excel    one sheet per table, streamed straight into the .xlsx zip as
+             sheet XML; no styled DataFrames and no per-cell objects, so a
+             million-row, 39-column sheet takes under a minute
+
+The first table fixes the columns: later tables are conformed to it
+(missing columns left empty, extra ones dropped). Excel sheets hold at most
+EXCEL_MAX_ROWS rows; longer tables continue on "NAME (2)", ...
+
+    python export.py data/*.xlsx --freq Daily Weekly --output levels.xlsx
+    python export.py data/ --output levels.parquet --workers 4
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from dpz import DPZ_TOLERANCE_PCT
+from ingest import FREQUENCIES, _has_module
+from level_engine import ALL_FAMILIES, DEFAULT_FAMILIES
+
+EXPORT_FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet", ".xlsx": "excel"}
+EXPORT_MIME = {"csv": "text/csv", "parquet": "application/octet-stream",
+               "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+EXPORT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "excel": ".xlsx"}
+BATCH_ROWS = 65_536
+EXCEL_BATCH_ROWS = 8_192           # cell XML strings are ~100x the array bytes
+EXCEL_MAX_ROWS = 1_048_576
+EXCEL_SHEET_NAME_CHARS = 31
+
+_EXCEL_EPOCH_DAYS = 25569          # 1899-12-30 to 1970-01-01
+_NS_PER_DAY = 86_400 * 10**9
+
+
+def export_format(path):
+    return EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def _batches(df, batch_rows):
+    for start in range(0, len(df), batch_rows):
+        yield df.iloc[start:start + batch_rows]
+
+
+# ==========================================================
+# --- CSV / Parquet (Arrow) ---
+def _arrow_batch(batch, key, dates_as_text):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = pa.Table.from_pandas(batch, preserve_index=False)
+    columns, names = [], []
+    for name, value in key.items():
+        columns.append(pa.array([value] * len(batch), type=pa.string()))
+        names.append(name)
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(pa.string())
+        elif dates_as_text and pa.types.is_timestamp(column.type):
+            # Plain dates for daily-or-coarser batches, like pandas' CSV output
+            ns = batch[name].to_numpy().astype("datetime64[ns]").view("int64")
+            fmt = "%Y-%m-%d" if not (ns[~batch[name].isna().to_numpy()] % _NS_PER_DAY).any() else "%Y-%m-%d %H:%M:%S"
+            column = pc.strftime(column.cast(pa.timestamp("s", column.type.tz), safe=False), format=fmt)
+        columns.append(column)
+        names.append(name)
+    return pa.Table.from_arrays(columns, names=names)
+
+
+def _conform(table, schema):
+    """``table`` with ``schema``'s columns in order: cast, or null where missing."""
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(table.column(field.name).cast(field.type))
+        else:
+            columns.append(pa.nulls(len(table), type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class ArrowExporter:
+    """CSV or Parquet file written batch by batch through pyarrow."""
+
+    def __init__(self, dest, fmt, batch_rows=BATCH_ROWS):
+        self.dest = dest
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+
+    def _open(self, schema):
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(self.dest, schema, compression="snappy")
+        import pyarrow.csv as pcsv
+        return pcsv.CSVWriter(self.dest, schema)
+
+    def write(self, df, key=None):
+        for batch in _batches(df, self.batch_rows):
+            table = _arrow_batch(batch, key or {}, dates_as_text=self.fmt == "csv")
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = self._open(self._schema)
+            else:
+                table = _conform(table, self._schema)
+            self._writer.write_table(table)
+            self.rows += len(batch)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class PandasCsvExporter:
+    """CSV through pandas, for environments without pyarrow."""
+
+    def __init__(self, dest, batch_rows=BATCH_ROWS):
+        self._owns_file = isinstance(dest, str)
+        self._file = open(dest, "wb") if self._owns_file else dest
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self._columns = None
+
+    def write(self, df, key=None):
+        key = key or {}
+        for batch in _batches(df, self.batch_rows):
+            batch = pd.concat([pd.DataFrame(key, index=batch.index), batch], axis=1) if key else batch
+            if self._columns is None:
+                self._columns = list(batch.columns)
+            text = batch.reindex(columns=self._columns).to_csv(index=False, header=self.rows == 0)
+            self._file.write(text.encode("utf-8"))
+            self.rows += len(batch)
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+
+
+# ==========================================================
+# --- Excel (streamed sheet XML) ---
+_SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+               '<sheetViews><sheetView workbookViewId="0">'
+               '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+               '</sheetView></sheetViews><sheetData>')
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+# Cell styles: 0 general, 1 date, 2 date and time
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="yyyy-mm-dd"/>'
+    '<numFmt numFmtId="165" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>')
+
+
+def _column_letter(index):
+    name = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        name = chr(65 + rem) + name
+    return name
+
+
+def _text_cells(texts, col, rows):
+    return [f'<c r="{col}{r}" t="inlineStr"><is><t>{t}</t></is></c>' if t is not None else ""
+            for r, t in zip(rows, texts)]
+
+
+def _xml_cells(series, col, rows):
+    """Cell XML for one column of a batch; missing values get no cell."""
+    dtype = series.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        ns = series.to_numpy().astype("datetime64[ns]").view("int64")
+        missing = series.isna().to_numpy()
+        style = 1 if not (ns[~missing] % _NS_PER_DAY).any() else 2
+        serial = (ns / _NS_PER_DAY + _EXCEL_EPOCH_DAYS).tolist()
+        return [f'<c r="{col}{r}" s="{style}"><v>{v!r}</v></c>' if not m else ""
+                for r, v, m in zip(rows, serial, missing.tolist())]
+    if pd.api.types.is_bool_dtype(dtype):
+        return [f'<c r="{col}{r}" t="b"><v>{int(v)}</v></c>' for r, v in zip(rows, series.to_numpy().tolist())]
+    if pd.api.types.is_numeric_dtype(dtype):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        finite = np.isfinite(values).tolist()
+        return [f'<c r="{col}{r}"><v>{v!r}</v></c>' if ok else ""
+                for r, v, ok in zip(rows, series.to_numpy().tolist(), finite)]
+    # Labels repeat, so each distinct one is escaped once
+    codes, uniques = pd.factorize(series)
+    escaped = [escape(str(u)) for u in uniques] + [None]
+    return _text_cells([escaped[k] for k in codes.tolist()], col, rows)
+
+
+def _sheet_name(name, taken):
+    base = re.sub(r"[\[\]:*?/\\]", "_", str(name)).strip("'")[:EXCEL_SHEET_NAME_CHARS] or "Sheet"
+    candidate, n = base, 1
+    while candidate.lower() in taken:
+        n += 1
+        suffix = f" ({n})"
+        candidate = base[:EXCEL_SHEET_NAME_CHARS - len(suffix)] + suffix
+    taken.add(candidate.lower())
+    return candidate
+
+
+class ExcelExporter:
+    """Multi-sheet .xlsx written sheet by sheet into the zip, row batches at a time."""
+
+    def __init__(self, dest, batch_rows=EXCEL_BATCH_ROWS, max_rows=EXCEL_MAX_ROWS):
+        self.batch_rows = batch_rows
+        self.max_rows = max_rows
+        self.rows = 0
+        self._zip = zipfile.ZipFile(dest, "w", zipfile.ZIP_DEFLATED, compresslevel=1)
+        self._sheets = []
+        self._taken = set()
+        self._stream = None
+        self._sheet_rows = 0
+
+    def _start_sheet(self, name, columns):
+        self._end_sheet()
+        self._sheets.append(_sheet_name(name, self._taken))
+        path = f"xl/worksheets/sheet{len(self._sheets)}.xml"
+        self._stream = self._zip.open(path, "w", force_zip64=True)
+        header = "".join(_text_cells([escape(str(c)) for c in columns],
+                                     "", [f"{_column_letter(i)}1" for i in range(len(columns))]))
+        self._stream.write((_SHEET_HEAD + f'<row r="1">{header}</row>').encode("utf-8"))
+        self._sheet_rows = 1
+
+    def _end_sheet(self):
+        if self._stream is not None:
+            self._stream.write(_SHEET_TAIL.encode("utf-8"))
+            self._stream.close()
+            self._stream = None
+
+    def write(self, df, key=None):
+        # "SYMBOL Frequency", shortening the symbol rather than the frequency
+        parts = [str(v) for v in (key or {}).values()] or ["Sheet"]
+        tail = "".join(" " + part for part in parts[1:])
+        name = parts[0][:max(1, EXCEL_SHEET_NAME_CHARS - len(tail))] + tail
+        letters = [_column_letter(i) for i in range(len(df.columns))]
+        self._start_sheet(name, df.columns)
+        part, start = 1, 0
+        while start < len(df):
+            if self._sheet_rows >= self.max_rows:
+                part += 1
+                self._start_sheet(f"{name} ({part})", df.columns)
+            n = min(self.batch_rows, self.max_rows - self._sheet_rows, len(df) - start)
+            batch = df.iloc[start:start + n]
+            rows = [str(r) for r in range(self._sheet_rows + 1, self._sheet_rows + 1 + n)]
+            columns = [_xml_cells(batch[c], letter, rows) for c, letter in zip(df.columns, letters)]
+            xml = "".join(f'<row r="{r}">{"".join(cells)}</row>' for r, cells in zip(rows, zip(*columns)))
+            self._stream.write(xml.encode("utf-8"))
+            self._sheet_rows += n
+            self.rows += n
+            start += n
+
+    def close(self):
+        self._end_sheet()
+        if not self._sheets:
+            self._start_sheet("Sheet1", [])
+            self._end_sheet()
+        ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+        rel_ns = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+        sheets = "".join(f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+                         for i, name in enumerate(self._sheets, 1))
+        self._zip.writestr("xl/workbook.xml", f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                                              f'<workbook {ns} xmlns:r="{rel_ns}"><sheets>{sheets}</sheets></workbook>')
+        rels = "".join(f'<Relationship Id="rId{i}" Type="{rel_ns}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                       for i in range(1, len(self._sheets) + 1))
+        rels += f'<Relationship Id="rId{len(self._sheets) + 1}" Type="{rel_ns}/styles" Target="styles.xml"/>'
+        self._zip.writestr("xl/_rels/workbook.xml.rels",
+                           '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns='
+                           f'"http://schemas.openxmlformats.org/package/2006/relationships">{rels}</Relationships>')
+        self._zip.writestr("xl/styles.xml", _STYLES_XML)
+        self._zip.writestr("_rels/.rels",
+                           '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns='
+                           '"http://schemas.openxmlformats.org/package/2006/relationships">'
+                           f'<Relationship Id="rId1" Type="{rel_ns}/officeDocument" Target="xl/workbook.xml"/>'
+                           '</Relationships>')
+        ct = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+        overrides = "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{ct}.worksheet+xml"/>'
+                            for i in range(1, len(self._sheets) + 1))
+        self._zip.writestr("[Content_Types].xml",
+                           '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Types xmlns='
+                           '"http://schemas.openxmlformats.org/package/2006/content-types">'
+                           '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                           '<Default Extension="xml" ContentType="application/xml"/>'
+                           f'<Override PartName="/xl/workbook.xml" ContentType="{ct}.sheet.main+xml"/>'
+                           f'<Override PartName="/xl/styles.xml" ContentType="{ct}.styles+xml"/>'
+                           f'{overrides}</Types>')
+        self._zip.close()
+
+
+# ==========================================================
+# --- Entry points ---
+def open_exporter(dest, fmt, batch_rows=None):
+    """Exporter for ``fmt`` writing to a path or binary file object."""
+    if fmt == "excel":
+        return ExcelExporter(dest, batch_rows or EXCEL_BATCH_ROWS)
+    if fmt == "csv" and not _has_module("pyarrow"):
+        return PandasCsvExporter(dest, batch_rows or BATCH_ROWS)
+    return ArrowExporter(dest, fmt, batch_rows or BATCH_ROWS)
+
+
+def export_tables(tables, dest, fmt, batch_rows=None):
+    """Write ``(key, frame)`` pairs -- key a dict such as {"Symbol": "NIFTY"}
+    -- to ``dest``; returns the number of data rows written."""
+    exporter = open_exporter(dest, fmt, batch_rows)
+    try:
+        for key, frame in tables:
+            exporter.write(frame, key)
+    finally:
+        exporter.close()
+    return exporter.rows
+
+
+def export_bytes(tables, fmt, batch_rows=None):
+    """export_tables into memory (for downloads)."""
+    buf = io.BytesIO()
+    export_tables(tables, buf, fmt, batch_rows)
+    return buf.getvalue()
+
+
+def main(argv=None):
+    from report import expand_inputs, iter_reports
+
+    parser = argparse.ArgumentParser(description="Export full-history CPR / Camarilla / GPZ / DPZ tables.")
+    parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns")
+    parser.add_argument("--freq", nargs="+", default=["Daily"], choices=FREQUENCIES)
+    parser.add_argument("--market", default="Stock Market", choices=["Stock Market", "Bitcoin"])
+    parser.add_argument("--format", choices=sorted(set(EXPORT_FORMATS.values())),
+                        help="output format (default: from the --output extension)")
+    parser.add_argument("--output", default="levels_export.xlsx")
+    parser.add_argument("--tolerance", type=float, default=DPZ_TOLERANCE_PCT, help="DPZ tolerance as a fraction of price")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--families", nargs="+", choices=ALL_FAMILIES, default=list(DEFAULT_FAMILIES))
+    parser.add_argument("--width-window", type=int, help="add rolling width statistics over N periods")
+    parser.add_argument("--batch-rows", type=int, help="rows per write (default: %d, %d for Excel)"
+                        % (BATCH_ROWS, EXCEL_BATCH_ROWS))
+    args = parser.parse_args(argv)
+
+    fmt = args.format or export_format(args.output)
+    if fmt is None:
+        parser.error("cannot tell the output format from --output; pass --format")
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("no supported input files found")
+
+    start = time.perf_counter()
+    errors = {}
+
+    def tables():
+        for freq in args.freq:
+            for symbol, path, columns, error in iter_reports(paths, freq, args.market, args.tolerance, True,
+                                                             args.workers, args.families, args.width_window):
+                if error is not None:
+                    errors[f"{path} ({freq})"] = error
+                    continue
+                key = {"Symbol": symbol, "Frequency": freq} if len(args.freq) > 1 else {"Symbol": symbol}
+                yield key, pd.DataFrame(columns)
+
+    rows = export_tables(tables(), args.output, fmt, args.batch_rows)
+    for source, error in errors.items():
+        print(f"Skipping {source}: {error}", file=sys.stderr)
+    print(f"Wrote {rows} rows to {args.output} in {time.perf_counter() - start:.1f}s "
+          f"({len(errors)} skipped)", file=sys.stderr)
+    return 0 if rows else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Golden Pivot Hot Zone (GPZ) classification for every period.
+
+Row ``i`` compares the CPR and Camarilla levels derived from period ``i``
+(the "next" session's levels) and checks the open-vs-prior-CPR facts
+against period ``i - 1``, exactly as the app does for the last row.
+"""
+import numpy as np
+import pandas as pd
+
+GPZ_SENTIMENTS = ("Neutral", "Bearish (GPZ)", "Bullish (GPZ)")
+NEUTRAL, BEARISH, BULLISH = range(3)
+
+
+def _prior(values):
+    values = np.asarray(values, dtype=np.float64)
+    return np.concatenate(([np.nan], values[:-1]))
+
+
+def gpz_codes(tc, bc, r3, s3):
+    """GPZ code per row: BEARISH when TC >= R3 >= BC, else BULLISH when
+    BC <= S3 <= TC, else NEUTRAL."""
+    tc, bc, r3, s3 = (np.asarray(a, dtype=np.float64) for a in (tc, bc, r3, s3))
+    bearish = (tc >= r3) & (r3 >= bc)
+    bullish = ~bearish & (bc <= s3) & (s3 <= tc)
+    return np.where(bearish, BEARISH, np.where(bullish, BULLISH, NEUTRAL)).astype(np.int8)
+
+
+def gpz_frame(levels, open_, close, index=None):
+    """GPZ sentiment and its supporting facts for every period.
+
+    ``open_`` may be None, in which case Close stands in for the open (the
+    app's fallback when the upload has no Open column). The facts follow the
+    side of the signal and are False on Neutral rows.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    curr_open = close if open_ is None else np.asarray(open_, dtype=np.float64)
+    tc, bc = levels["TC"], levels["BC"]
+    codes = gpz_codes(tc, bc, levels["Cam_R3"], levels["Cam_S3"])
+    bearish, bullish = codes == BEARISH, codes == BULLISH
+
+    prev_tc, prev_bc, prev_close = _prior(tc), _prior(bc), _prior(close)
+    first_fact = np.where(bearish, (curr_open < prev_bc) | (curr_open < prev_tc),
+                          bullish & ((curr_open > prev_bc) | (curr_open > prev_tc)))
+    # Bullish side checks the open, not the prior close, against the prior CPR
+    second_fact = np.where(bearish, (curr_open < prev_bc) & (close < prev_tc),
+                           bullish & (curr_open > prev_bc) & (curr_open > prev_tc))
+    third_fact = np.where(bearish, bc > prev_close, bullish & (tc < prev_close))
+
+    return pd.DataFrame({
+        "GPZ": pd.Categorical.from_codes(codes, categories=GPZ_SENTIMENTS),
+        "GPZ_FirstFact": first_fact,
+        "GPZ_SecondFact": second_fact,
+        "GPZ_ThirdFact": third_fact,
+    }, index=index)
@@ -0,0 +1,222 @@
+"""Memory-mapped columnar OHLC history store.
+
+One directory per symbol holds a raw little-endian array file per column
+(Date as int64 nanoseconds since the epoch, Open/High/Low/Close as float64
+or float32) and a small meta.json with the committed row count. Reads map
+the column files with np.memmap, so a date-range slice is two binary
+searches on the sorted Date column plus a view of each column: nothing is
+read from disk until it is touched, and the level engine runs on the views
+directly.
+
+Appends write the new rows at the end of each column file and then
+atomically replace meta.json. Existing rows are never rewritten, and
+readers only see rows that meta.json has committed. Bytes left beyond the
+committed rows by an interrupted append are truncated before the next one.
+
+    python history_store.py append .cpr_history NIFTY nifty_2024.csv nifty_2025.xlsx
+    python history_store.py info .cpr_history
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from ingest import PRICE_COLUMNS, normalize_ohlc, read_ohlc
+
+DATE_DTYPE = np.dtype("<i8")
+META_FILE = "meta.json"
+
+
+def _ns(value):
+    return pd.Timestamp(value).as_unit("ns").value
+
+
+def _end_bound(end):
+    """Search value and side for an inclusive ``end``; a plain date covers its whole day."""
+    if isinstance(end, date) and not isinstance(end, datetime):
+        return _ns(pd.Timestamp(end) + pd.Timedelta(days=1)), "left"
+    return _ns(end), "right"
+
+
+class HistoryStore:
+    """Per-symbol column files under ``root``, read through memory maps."""
+
+    def __init__(self, root, price_dtype="float64"):
+        self.root = root
+        self.price_dtype = np.dtype(price_dtype).newbyteorder("<")
+        self._maps = {}        # symbol -> (rows, {column: memmap})
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, symbol):
+        if not symbol or symbol != os.path.basename(symbol) or symbol.startswith("."):
+            raise ValueError(f"Invalid symbol name: {symbol!r}")
+        return os.path.join(self.root, symbol)
+
+    def _column_path(self, symbol, col):
+        return os.path.join(self._dir(symbol), f"{col}.bin")
+
+    def _dtypes(self, meta):
+        price = np.dtype(meta["price_dtype"]).newbyteorder("<")
+        return {"Date": DATE_DTYPE, **{col: price for col in PRICE_COLUMNS}}
+
+    # --- Metadata ---
+    def symbols(self):
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isfile(os.path.join(self.root, name, META_FILE)))
+
+    def meta(self, symbol):
+        path = os.path.join(self._dir(symbol), META_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_meta(self, symbol, meta):
+        path = os.path.join(self._dir(symbol), META_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def info(self, symbol):
+        """Row count, first/last date and whether Open is stored, or None."""
+        meta = self.meta(symbol)
+        if meta is None:
+            return None
+        return {"symbol": symbol, "rows": meta["rows"], "has_open": meta["has_open"],
+                "first": pd.Timestamp(meta["first"]) if meta["rows"] else None,
+                "last": pd.Timestamp(meta["last"]) if meta["rows"] else None}
+
+    # --- Reads ---
+    def _map(self, symbol, meta):
+        rows = meta["rows"]
+        with self._lock:
+            cached = self._maps.get(symbol)
+        if cached is not None and cached[0] == rows:
+            return cached[1]
+        maps = {}
+        for col, dtype in self._dtypes(meta).items():
+            if rows:
+                maps[col] = np.memmap(self._column_path(symbol, col), dtype=dtype, mode="r", shape=(rows,))
+            else:
+                maps[col] = np.empty(0, dtype=dtype)
+        with self._lock:
+            self._maps[symbol] = (rows, maps)
+        return maps
+
+    def columns(self, symbol, start=None, end=None):
+        """Read-only views of the rows with ``start <= Date <= end``, as {column: array}.
+
+        Open is left out when some stored rows had none (like an upload
+        without an Open column).
+        """
+        meta = self.meta(symbol)
+        if meta is None:
+            raise KeyError(f"No stored history for {symbol!r}")
+        maps = self._map(symbol, meta)
+        dates = maps["Date"]
+        lo = 0 if start is None else int(np.searchsorted(dates, _ns(start), "left"))
+        hi = len(dates)
+        if end is not None:
+            value, side = _end_bound(end)
+            hi = int(np.searchsorted(dates, value, side))
+        out = {"Date": np.asarray(dates[lo:hi]).view("datetime64[ns]")}
+        for col in PRICE_COLUMNS:
+            if col != "Open" or meta["has_open"]:
+                out[col] = np.asarray(maps[col][lo:hi])
+        return out
+
+    def frame(self, symbol, start=None, end=None):
+        """columns() as a DataFrame over the mapped arrays (no copy)."""
+        return pd.DataFrame(self.columns(symbol, start, end), copy=False)
+
+    # --- Appends ---
+    def append(self, symbol, df, skip_existing=False):
+        """Append the rows of a Date/[Open]/High/Low/Close frame to ``symbol``.
+
+        Rows must be later than the last stored date; with ``skip_existing``
+        earlier rows are dropped instead (re-adding an overlapping file).
+        Returns the number of rows written.
+        """
+        df = normalize_ohlc(df)
+        dates = df["Date"].to_numpy().astype("datetime64[ns]").view("int64")
+        with self._lock:
+            meta = self.meta(symbol)
+            if meta is None:
+                os.makedirs(self._dir(symbol), exist_ok=True)
+                meta = {"rows": 0, "price_dtype": self.price_dtype.name, "has_open": "Open" in df.columns,
+                        "first": None, "last": None}
+            if meta["rows"] and len(dates):
+                newer = dates > meta["last"]
+                if not newer.all():
+                    if not skip_existing:
+                        raise ValueError(f"{symbol}: rows must be after the last stored date "
+                                         f"({pd.Timestamp(meta['last'])}); pass skip_existing=True to drop older rows")
+                    df, dates = df[newer], dates[newer]
+            if not len(dates):
+                return 0
+
+            dtypes = self._dtypes(meta)
+            for col, dtype in dtypes.items():
+                if col == "Date":
+                    values = dates
+                elif col in df.columns:
+                    values = df[col].to_numpy()
+                else:
+                    values = np.full(len(dates), np.nan)
+                path = self._column_path(symbol, col)
+                committed = meta["rows"] * dtype.itemsize
+                if os.path.exists(path) and os.path.getsize(path) > committed:
+                    os.truncate(path, committed)
+                with open(path, "ab") as f:
+                    np.ascontiguousarray(values, dtype=dtype).tofile(f)
+
+            meta["has_open"] = meta["has_open"] and "Open" in df.columns
+            meta["first"] = meta["first"] if meta["rows"] else int(dates[0])
+            meta["last"] = int(dates[-1])
+            meta["rows"] += len(dates)
+            self._write_meta(symbol, meta)
+        return len(dates)
+
+
+# ==========================================================
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append OHLC files to, or list, a memory-mapped history store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("append", help="append files to a symbol, in order")
+    add.add_argument("root")
+    add.add_argument("symbol")
+    add.add_argument("files", nargs="+")
+    add.add_argument("--skip-existing", action="store_true", help="drop rows not after the last stored date")
+    add.add_argument("--price-dtype", choices=["float64", "float32"], default="float64",
+                     help="price precision for a new symbol")
+    show = commands.add_parser("info", help="list stored symbols")
+    show.add_argument("root")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        store = HistoryStore(args.root)
+        rows = [store.info(symbol) for symbol in store.symbols()]
+        print(pd.DataFrame(rows, columns=["symbol", "rows", "first", "last", "has_open"]).to_string(index=False))
+        return 0
+
+    store = HistoryStore(args.root, args.price_dtype)
+    for path in args.files:
+        try:
+            written = store.append(args.symbol, read_ohlc(path, path), skip_existing=args.skip_existing)
+        except Exception as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+            continue
+        print(f"{path}: {written} rows appended to {args.symbol}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Incremental append mode.
+
+A small JSON state file per symbol keeps, for every frequency, the last two
+aggregated periods -- the newest of which is the running partial day, week,
+month or year. Appending a bar folds it into those periods in constant
+time, and the next-period CPR / Camarilla / relationship / GPZ / DPZ row is
+rebuilt from just those two periods with the same vectorized functions the
+full-history path uses, so the cost does not grow with history length.
+Each frequency also keeps a width_stats.WidthTracker -- the CPR and
+Camarilla widths of the last closed periods -- which takes every period as
+it closes, so the rolling width statistics stay current the same way.
+
+Periods without any bars are skipped, so the "previous" period is always
+the last one that traded.
+"""
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from analysis import analyze_periods, prepare_ohlc
+from dpz import DPZ_TOLERANCE_PCT
+from ingest import FREQUENCIES, aggregate_periods, next_period_start
+from width_stats import WidthTracker
+
+
+def period_key(date, data_freq):
+    """Scalar counterpart of ingest.period_labels."""
+    day = pd.Timestamp(date).normalize()
+    if data_freq == "Weekly":
+        return day + pd.Timedelta(days=(4 - day.weekday()) % 7)   # week ending Friday
+    if data_freq == "Monthly":
+        return day + pd.offsets.MonthEnd(0)
+    if data_freq == "Yearly":
+        return day + pd.offsets.YearEnd(0)
+    return day
+
+
+def _float_or_none(value):
+    return None if value is None or pd.isna(value) else float(value)
+
+
+class SymbolState:
+    """Last two aggregated periods per frequency for one symbol."""
+
+    def __init__(self, symbol, last_date=None, periods=None, widths=None):
+        self.symbol = symbol
+        self.last_date = last_date
+        # freq -> up to two period dicts (Date, Open, High, Low, Close), oldest first
+        self.periods = periods or {freq: [] for freq in FREQUENCIES}
+        # freq -> width statistics window over the closed periods
+        self.widths = widths or {freq: WidthTracker() for freq in FREQUENCIES}
+
+    @classmethod
+    def from_history(cls, symbol, df):
+        df = prepare_ohlc(df)
+        if df.empty:
+            raise ValueError(f"{symbol}: no rows to build state from")
+        state = cls(symbol, last_date=df["Date"].iloc[-1])
+        for freq in FREQUENCIES:
+            agg = aggregate_periods(df, freq).sort_index()
+            closed = agg.iloc[:-1]
+            state.widths[freq] = WidthTracker.from_periods(closed["High"].to_numpy(), closed["Low"].to_numpy(),
+                                                           closed["Close"].to_numpy())
+            agg = agg.tail(2)
+            state.periods[freq] = [
+                {"Date": key,
+                 "Open": _float_or_none(row.get("Open")),
+                 "High": float(row["High"]), "Low": float(row["Low"]), "Close": float(row["Close"])}
+                for key, row in agg.iterrows()
+            ]
+        return state
+
+    def append_bar(self, date, high, low, close, open_=None):
+        date = pd.Timestamp(date)
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(f"{self.symbol}: bar {date:%Y-%m-%d} is not after the last stored bar "
+                             f"({self.last_date:%Y-%m-%d}); rebuild the state from the full history")
+        for freq in FREQUENCIES:
+            key = period_key(date, freq)
+            periods = self.periods[freq]
+            if periods and periods[-1]["Date"] == key:
+                current = periods[-1]
+                current["High"] = max(current["High"], high)
+                current["Low"] = min(current["Low"], low)
+                current["Close"] = close
+                if current["Open"] is None:
+                    current["Open"] = _float_or_none(open_)
+            else:
+                if periods:
+                    closed = periods[-1]
+                    self.widths[freq].push(closed["High"], closed["Low"], closed["Close"])
+                periods.append({"Date": key, "Open": _float_or_none(open_),
+                                "High": float(high), "Low": float(low), "Close": float(close)})
+                del periods[:-2]
+        self.last_date = date
+
+    def frame(self, data_freq):
+        """The stored periods for ``data_freq`` as an aggregated OHLC frame."""
+        df = pd.DataFrame(self.periods[data_freq], columns=["Date", "Open", "High", "Low", "Close"])
+        df["Date"] = pd.to_datetime(df["Date"])
+        if df["Open"].isna().any():
+            df = df.drop(columns="Open")
+        df["NextDate"] = next_period_start(df["Date"], data_freq)
+        return df
+
+    def width_stats(self, data_freq):
+        """Rolling width statistics of the latest (possibly still running) period."""
+        current = self.periods[data_freq][-1]
+        return self.widths[data_freq].stats(current["High"], current["Low"], current["Close"])
+
+    def snapshot(self, market_type="Stock Market", tolerance_pct=DPZ_TOLERANCE_PCT):
+        """Next-period row for every frequency, with a leading Frequency column
+        and the width statistics of the period the row derives from."""
+        rows = []
+        for freq in FREQUENCIES:
+            if not self.periods[freq]:
+                continue
+            row = analyze_periods(self.frame(freq), freq, market_type, tolerance_pct).iloc[-1:]
+            row = row.assign(**{col: [value] for col, value in self.width_stats(freq).items()})
+            rows.append(row.astype({c: object for c in row.columns if isinstance(row[c].dtype, pd.CategoricalDtype)}))
+        out = pd.concat(rows, ignore_index=True)
+        out.insert(0, "Frequency", [freq for freq in FREQUENCIES if self.periods[freq]])
+        return out
+
+    def to_dict(self):
+        return {
+            "symbol": self.symbol,
+            "last_date": None if self.last_date is None else self.last_date.isoformat(),
+            "periods": {freq: [dict(p, Date=p["Date"].isoformat()) for p in periods]
+                        for freq, periods in self.periods.items()},
+            "widths": {freq: tracker.to_dict() for freq, tracker in self.widths.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        last_date = data.get("last_date")
+        periods = {freq: [dict(p, Date=pd.Timestamp(p["Date"])) for p in data["periods"].get(freq, [])]
+                   for freq in FREQUENCIES}
+        # State files written before width tracking start with empty windows
+        widths = {freq: WidthTracker(history=data.get("widths", {}).get(freq)) for freq in FREQUENCIES}
+        return cls(data["symbol"], None if last_date is None else pd.Timestamp(last_date), periods, widths)
+
+
+class StateStore:
+    """Directory of per-symbol JSON state files."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, symbol):
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9._-]", "_", str(symbol)) + ".json")
+
+    def load(self, symbol):
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return SymbolState.from_dict(json.load(f))
+
+    def save(self, state):
+        path = self._path(state.symbol)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    def rebuild(self, symbol, df):
+        """Replace a symbol's state from its full history (O(n), done once)."""
+        state = SymbolState.from_history(symbol, df)
+        self.save(state)
+        return state
+
+    def update(self, symbol, bars):
+        """Fold the new bars of ``bars`` into a symbol's state and save it.
+
+        ``bars`` may be the symbol's whole history file again: bars on or
+        before the last stored date are dropped (as with HistoryStore's
+        ``skip_existing``), so re-uploading a file with a row appended only
+        folds in that row. A symbol without stored state is bootstrapped
+        from ``bars``. Returns the SymbolState.
+        """
+        state = self.load(symbol)
+        if state is None:
+            state = SymbolState.from_history(symbol, bars)
+        else:
+            bars = prepare_ohlc(bars)
+            bars = bars[bars["Date"] > state.last_date]
+            opens = bars["Open"].to_numpy() if "Open" in bars.columns else np.full(len(bars), np.nan)
+            for date, open_, high, low, close in zip(bars["Date"], opens, bars["High"].to_numpy(),
+                                                     bars["Low"].to_numpy(), bars["Close"].to_numpy()):
+                state.append_bar(date, float(high), float(low), float(close), open_)
+        self.save(state)
+        return state
+
+    def append(self, symbol, bars, market_type="Stock Market", tolerance_pct=DPZ_TOLERANCE_PCT):
+        """update(), returning the symbol's next-period rows (SymbolState.snapshot)."""
+        return self.update(symbol, bars).snapshot(market_type, tolerance_pct)
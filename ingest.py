@@ -0,0 +1,261 @@
+"""OHLC ingestion: Excel, CSV, Parquet and Arrow IPC.
+
+Only the Date/Open/High/Low/Close columns are read, prices as float64 (or
+float32 in compact mode, see COMPACT_PRICE_DTYPE).
+Excel goes through the calamine engine when python-calamine is installed,
+CSV through pyarrow's reader when pyarrow is installed. Very large CSVs can
+be streamed in chunks and aggregated to the target frequency on the fly,
+so memory is bounded by the number of output periods, not input rows.
+"""
+import importlib.util
+import io
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+OHLC_COLUMNS = ("Date", "Open", "High", "Low", "Close")
+REQUIRED_COLS = {"Date", "High", "Low", "Close"}
+PRICE_COLUMNS = ("Open", "High", "Low", "Close")
+COMPACT_PRICE_DTYPE = "float32"
+
+FILE_FORMATS = {
+    ".xlsx": "excel", ".xls": "excel",
+    ".csv": "csv", ".txt": "csv",
+    ".parquet": "parquet", ".pq": "parquet",
+    ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow", ".arrows": "arrow",
+}
+UPLOAD_TYPES = [ext[1:] for ext in FILE_FORMATS]
+
+CSV_CHUNK_ROWS = 1_000_000
+
+FREQUENCIES = ("Daily", "Weekly", "Monthly", "Yearly")
+
+# "First day of the next period" offsets from each period-end label
+NEXT_PERIOD_OFFSETS = {
+    "Weekly": pd.offsets.Week(weekday=0),   # week ending Friday -> next Monday
+    "Monthly": pd.offsets.MonthBegin(1),    # month end -> first day next month
+    "Yearly": pd.offsets.YearBegin(1),      # year end -> first day of next year
+}
+
+
+class MissingColumnsError(ValueError):
+    pass
+
+
+def _has_module(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def excel_engine():
+    return "calamine" if _has_module("python_calamine") else None
+
+
+def csv_engine():
+    return "pyarrow" if _has_module("pyarrow") else "c"
+
+
+def file_format(name):
+    ext = os.path.splitext(str(name))[1].lower()
+    if ext not in FILE_FORMATS:
+        raise ValueError(f"Unsupported file type: {ext or name}")
+    return FILE_FORMATS[ext]
+
+
+def _check_columns(columns):
+    if not REQUIRED_COLS.issubset(columns):
+        raise MissingColumnsError(f"File must contain columns: {REQUIRED_COLS}")
+    return [c for c in OHLC_COLUMNS if c in columns]
+
+
+def _as_source(source):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _price_dtypes(cols, price_dtype):
+    return {c: price_dtype for c in cols if c in PRICE_COLUMNS}
+
+
+def _price_array(df, col):
+    """Column values as a float array, keeping float32 prices float32."""
+    values = df[col].to_numpy()
+    return values if values.dtype.kind == "f" else values.astype(np.float64)
+
+
+def _csv_columns(source):
+    columns = pd.read_csv(source, nrows=0).columns
+    _rewind(source)
+    return _check_columns(columns)
+
+
+# ==========================================================
+# --- Readers ---
+def read_ohlc(source, name, price_dtype="float64"):
+    """Read the OHLC columns of a file (path, bytes or file-like) as a raw frame.
+
+    ``name`` (a file name or path) selects the format by extension. Prices
+    are parsed straight to ``price_dtype``.
+    """
+    fmt = file_format(name)
+    source = _as_source(source)
+
+    if fmt == "excel":
+        df = pd.read_excel(source, usecols=lambda c: c in OHLC_COLUMNS, engine=excel_engine())
+        cols = _check_columns(df.columns)
+        return df[cols].astype(_price_dtypes(cols, price_dtype))
+
+    if fmt == "csv":
+        cols = _csv_columns(source)
+        return pd.read_csv(source, usecols=cols, dtype=_price_dtypes(cols, price_dtype), engine=csv_engine())
+
+    import pyarrow as pa
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(source)
+        table = parquet_file.read(columns=_check_columns(parquet_file.schema_arrow.names))
+    else:
+        try:
+            reader = pa.ipc.open_file(source)
+        except pa.ArrowInvalid:
+            _rewind(source)
+            reader = pa.ipc.open_stream(source)
+        table = reader.read_all()
+        table = table.select(_check_columns(table.column_names))
+    df = table.to_pandas()
+    return df.astype(_price_dtypes(df.columns, price_dtype))
+
+
+def normalize_ohlc(df):
+    if pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        # Already parsed (Parquet/Arrow, batch arrays): skip to_datetime's per-value scan
+        if not df["Date"].is_monotonic_increasing:
+            df = df.sort_values("Date", kind="stable")
+        if df["Date"].hasnans:
+            df = df.dropna(subset=["Date"])
+        return df.reset_index(drop=True)
+    # Parse before sorting: raw MM/DD/YYYY or DD-MM-YYYY strings do not sort chronologically
+    df = df.assign(Date=pd.to_datetime(df["Date"], errors="coerce")).dropna(subset=["Date"])
+    return df.sort_values("Date", kind="stable").reset_index(drop=True)
+
+
+def next_period_start(period_dates, data_freq):
+    if data_freq in NEXT_PERIOD_OFFSETS:
+        return period_dates + NEXT_PERIOD_OFFSETS[data_freq]
+    return period_dates + timedelta(days=1)
+
+
+def period_labels(dates, data_freq):
+    """Period label per date as datetime64[D]: the Friday ending the week,
+    the month end or the year end (same labels as pandas' W-FRI/ME/YE
+    resample), or the day itself for Daily."""
+    days = np.asarray(dates).astype("datetime64[D]")
+    if data_freq == "Weekly":
+        weekday = (days.view("int64") + 3) % 7      # 1970-01-01 was a Thursday
+        return days + (4 - weekday) % 7
+    if data_freq == "Monthly":
+        return (days.astype("datetime64[M]") + 1).astype("datetime64[D]") - 1
+    if data_freq == "Yearly":
+        return (days.astype("datetime64[Y]") + 1).astype("datetime64[D]") - 1
+    return days
+
+
+def next_period_days(dates, data_freq):
+    """First calendar day of the period after each date, as datetime64[D]:
+    the next day, the next Monday, the 1st of the next month or 1 January of
+    the next year (next_period_start's dates, for whole arrays)."""
+    days = np.asarray(dates).astype("datetime64[D]")
+    if data_freq == "Weekly":
+        weekday = (days.view("int64") + 3) % 7      # Monday = 0
+        return days + (7 - weekday)
+    if data_freq == "Monthly":
+        return (days.astype("datetime64[M]") + 1).astype("datetime64[D]")
+    if data_freq == "Yearly":
+        return (days.astype("datetime64[Y]") + 1).astype("datetime64[D]")
+    return days + 1
+
+
+def resample_ohlc(df, data_freq):
+    """Aggregate a date-sorted daily frame to ``data_freq`` periods.
+
+    Periods are contiguous runs of equal labels, reduced in one reduceat
+    pass: Open first, High max, Low min, Close last. Open is kept when
+    present, float32 prices stay float32 and periods without rows are
+    omitted. Daily rows pass through without copying the input's columns.
+    """
+    if data_freq not in NEXT_PERIOD_OFFSETS:
+        df = df.copy(deep=False)
+        df["NextDate"] = next_period_start(df["Date"], data_freq)
+        return df
+
+    cols = [c for c in ("Date", "Open", "High", "Low", "Close") if c in df.columns]
+    if df.empty:
+        frame = df[cols].copy()
+        frame["NextDate"] = frame["Date"]
+        return frame
+
+    labels = period_labels(df["Date"].to_numpy(), data_freq)
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(labels)] - 1
+    out = {"Date": labels[starts].astype("datetime64[ns]")}
+    if "Open" in cols:
+        out["Open"] = _price_array(df, "Open")[starts]
+    out["High"] = np.fmax.reduceat(_price_array(df, "High"), starts)
+    out["Low"] = np.fmin.reduceat(_price_array(df, "Low"), starts)
+    out["Close"] = _price_array(df, "Close")[ends]
+    frame = pd.DataFrame(out)
+    frame["NextDate"] = next_period_start(frame["Date"], data_freq)
+    return frame
+
+
+def period_keys(dates, data_freq):
+    """period_labels for a datetime Series, as a datetime64[ns] Series."""
+    return pd.Series(period_labels(dates.to_numpy(), data_freq).astype("datetime64[ns]"), index=dates.index)
+
+
+# ==========================================================
+# --- Chunked CSV aggregation ---
+def aggregate_periods(chunk, data_freq):
+    """Per-period High/Low/Close (+Open) and first/last dates, indexed by
+    period label. Periods without rows are omitted."""
+    chunk = chunk.assign(Date=pd.to_datetime(chunk["Date"], errors="coerce")).dropna(subset=["Date"])
+    chunk = chunk.sort_values("Date", kind="stable")
+    grouped = chunk.groupby(period_keys(chunk["Date"], data_freq), sort=False)
+    agg = {"High": ("High", "max"), "Low": ("Low", "min"), "Close": ("Close", "last"),
+           "FirstDate": ("Date", "first"), "LastDate": ("Date", "last")}
+    if "Open" in chunk.columns:
+        agg["Open"] = ("Open", "first")
+    return grouped.agg(**agg)
+
+
+def stream_resample_csv(source, data_freq, name="data.csv", chunksize=CSV_CHUNK_ROWS):
+    """Aggregate a (possibly huge) CSV to ``data_freq`` periods chunk by chunk.
+
+    Rows may straddle chunk boundaries and need not be sorted: each chunk is
+    reduced to per-period partials (max/min plus first/last by date), and
+    the partials are merged at the end. Periods without rows are omitted.
+    """
+    file_format(name)
+    source = _as_source(source)
+    cols = _csv_columns(source)
+    partials = [
+        aggregate_periods(chunk, data_freq)
+        for chunk in pd.read_csv(source, usecols=cols, chunksize=chunksize,
+                                 dtype=_price_dtypes(cols, "float64"))
+    ]
+    if not partials:
+        return pd.DataFrame(columns=["Date"] + cols[1:] + ["NextDate"])
+    merged = pd.concat(partials)
+    by_last = merged.sort_values("LastDate", kind="stable").groupby(level=0)
+    df = pd.DataFrame({"High": by_last["High"].max(), "Low": by_last["Low"].min(),
+                       "Close": by_last["Close"].last()})
+    if "Open" in merged.columns:
+        df.insert(0, "Open", merged.sort_values("FirstDate", kind="stable").groupby(level=0)["Open"].first())
+    df = df.sort_index().rename_axis("Date").reset_index()
+    df["NextDate"] = next_period_start(df["Date"], data_freq)
+    return df
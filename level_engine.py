@@ -0,0 +1,210 @@
+"""Headless pivot level engine: CPR, classic, Camarilla, Fibonacci, Woodie, DeMark.
+
+No Streamlit (or any UI) imports: this module is shared by both apps and by
+batch jobs. Level families are registered in LEVEL_FAMILIES; compute_levels
+runs the selected ones for every row in one NumPy pass over contiguous
+High/Low/Close (and Open) arrays. Range and the classic Pivot are computed
+once and shared, and every family writes into rows of one preallocated
+buffer, so a family costs a few array operations. Row ``i`` of the output
+holds the levels *derived from* period ``i``, i.e. the levels that apply to
+period ``i + 1`` -- so the "next period" values are simply the last output
+row and the levels that applied to each period are the output shifted down
+by one.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+CAMARILLA_MULTIPLIER = 1.1
+
+BASE_COLUMNS = ("Range", "Pivot")
+CPR_COLUMNS = ("Pivot", "BC", "TC")
+CLASSIC_COLUMNS = ("R1", "R2", "R3", "R4", "R5", "S1", "S2", "S3", "S4", "S5")
+CAMARILLA_COLUMNS = ("Cam_R1", "Cam_R2", "Cam_R3", "Cam_R4",
+                     "Cam_S1", "Cam_S2", "Cam_S3", "Cam_S4")
+FIBONACCI_COLUMNS = ("Fib_R1", "Fib_R2", "Fib_R3", "Fib_S1", "Fib_S2", "Fib_S3")
+WOODIE_COLUMNS = ("Woodie_Pivot", "Woodie_R1", "Woodie_R2", "Woodie_R3", "Woodie_S1", "Woodie_S2", "Woodie_S3")
+DEMARK_COLUMNS = ("DeMark_Pivot", "DeMark_R1", "DeMark_S1")
+LEVEL_COLUMNS = ("Range",) + CPR_COLUMNS + CLASSIC_COLUMNS + CAMARILLA_COLUMNS
+
+# Camarilla divisors: level = Close +/- Range * multiplier / divisor
+CAMARILLA_DIVISORS = {"R4": 2, "R3": 4, "R2": 6, "R1": 12}
+# Fibonacci retracements: level = Pivot +/- Range * ratio
+FIBONACCI_RATIOS = {"1": 0.382, "2": 0.618, "3": 1.0}
+
+
+# ==========================================================
+# --- Family registry ---
+LevelFamily = namedtuple("LevelFamily", ["columns", "compute"])
+LEVEL_FAMILIES = {}
+
+
+def level_family(name, columns):
+    """Register ``compute(lv, high, low, close, open_, multiplier)`` as a family.
+
+    ``lv`` maps column name -> output row; the shared Range and Pivot rows
+    are already filled in, and the family fills its own ``columns``.
+    """
+    def register(compute):
+        LEVEL_FAMILIES[name] = LevelFamily(tuple(columns), compute)
+        return compute
+    return register
+
+
+@level_family("cpr", ("BC", "TC"))
+def _cpr(lv, high, low, close, open_, multiplier):
+    pivot = lv["Pivot"]
+    bc = (high + low) / 2
+    tc = pivot + (pivot - bc)
+    lv["Swapped"] = bc > tc
+    np.minimum(bc, tc, out=lv["BC"])
+    np.maximum(bc, tc, out=lv["TC"])
+
+
+@level_family("classic", CLASSIC_COLUMNS)
+def _classic(lv, high, low, close, open_, multiplier):
+    pivot, rng = lv["Pivot"], lv["Range"]
+    r1 = np.subtract(2 * pivot, low, out=lv["R1"])
+    s1 = np.subtract(2 * pivot, high, out=lv["S1"])
+    r2 = np.add(pivot, rng, out=lv["R2"])
+    s2 = np.subtract(pivot, rng, out=lv["S2"])
+    r3 = np.add(r1, rng, out=lv["R3"])
+    s3 = np.subtract(s1, rng, out=lv["S3"])
+    r_step = r2 - r1
+    s_step = s1 - s2
+    r4 = np.add(r3, r_step, out=lv["R4"])
+    s4 = np.subtract(s3, s_step, out=lv["S4"])
+    np.add(r4, r_step, out=lv["R5"])
+    np.subtract(s4, s_step, out=lv["S5"])
+
+
+@level_family("camarilla", CAMARILLA_COLUMNS)
+def _camarilla(lv, high, low, close, open_, multiplier):
+    scaled = lv["Range"] * multiplier
+    for name, divisor in CAMARILLA_DIVISORS.items():
+        step = scaled / divisor
+        np.add(close, step, out=lv[f"Cam_{name}"])
+        np.subtract(close, step, out=lv[f"Cam_S{name[1:]}"])
+
+
+@level_family("fibonacci", FIBONACCI_COLUMNS)
+def _fibonacci(lv, high, low, close, open_, multiplier):
+    pivot, rng = lv["Pivot"], lv["Range"]
+    for n, ratio in FIBONACCI_RATIOS.items():
+        step = rng * ratio
+        np.add(pivot, step, out=lv[f"Fib_R{n}"])
+        np.subtract(pivot, step, out=lv[f"Fib_S{n}"])
+
+
+@level_family("woodie", WOODIE_COLUMNS)
+def _woodie(lv, high, low, close, open_, multiplier):
+    # Woodie weights the close twice: (H + L + 2C) / 4
+    pivot = lv["Woodie_Pivot"]
+    np.add(high, low, out=pivot)
+    pivot += 2 * close
+    pivot /= 4
+    rng = lv["Range"]
+    np.subtract(2 * pivot, low, out=lv["Woodie_R1"])
+    np.subtract(2 * pivot, high, out=lv["Woodie_S1"])
+    np.add(pivot, rng, out=lv["Woodie_R2"])
+    np.subtract(pivot, rng, out=lv["Woodie_S2"])
+    np.add(high, 2 * (pivot - low), out=lv["Woodie_R3"])
+    np.subtract(low, 2 * (high - pivot), out=lv["Woodie_S3"])
+
+
+@level_family("demark", DEMARK_COLUMNS)
+def _demark(lv, high, low, close, open_, multiplier):
+    # X = H + L + C plus L on a down period, H on an up period, C otherwise
+    x = high + low + close
+    x += np.where(close < open_, low, np.where(close > open_, high, close))
+    np.divide(x, 4, out=lv["DeMark_Pivot"])
+    x /= 2
+    np.subtract(x, low, out=lv["DeMark_R1"])
+    np.subtract(x, high, out=lv["DeMark_S1"])
+
+
+DEFAULT_FAMILIES = ("cpr", "classic", "camarilla")
+ALL_FAMILIES = tuple(LEVEL_FAMILIES)
+
+
+def family_columns(families=DEFAULT_FAMILIES):
+    """Output float columns for ``families``; DEFAULT_FAMILIES gives LEVEL_COLUMNS."""
+    unknown = [name for name in families if name not in LEVEL_FAMILIES]
+    if unknown:
+        raise ValueError(f"Unknown level families: {unknown}; choose from {list(LEVEL_FAMILIES)}")
+    return BASE_COLUMNS + tuple(col for name in families for col in LEVEL_FAMILIES[name].columns)
+
+
+# ==========================================================
+# --- Engine ---
+def compute_levels(high, low, close, multiplier=CAMARILLA_MULTIPLIER, dtype=np.float64,
+                   families=DEFAULT_FAMILIES, open_=None):
+    """Compute the level families in ``families`` for every row.
+
+    Returns a dict of column name -> 1-D array. All float columns are rows of
+    a single (len(family_columns(families)), n) buffer, so each is
+    contiguous. With the CPR family, the extra ``Swapped`` entry flags rows
+    where BC > TC and the two were swapped. ``open_`` is only used by
+    DeMark; without it (or where it is NaN) Close stands in for the open.
+    ``dtype=np.float32`` computes and stores the levels in single precision
+    (half the memory; ~7 significant digits).
+    """
+    high = np.ascontiguousarray(high, dtype=dtype)
+    low = np.ascontiguousarray(low, dtype=dtype)
+    close = np.ascontiguousarray(close, dtype=dtype)
+    open_ = close if open_ is None else np.ascontiguousarray(open_, dtype=dtype)
+
+    columns = family_columns(families)
+    buf = np.empty((len(columns), len(close)), dtype=dtype)
+    lv = dict(zip(columns, buf))
+
+    # --- Shared intermediates ---
+    np.subtract(high, low, out=lv["Range"])
+    pivot = lv["Pivot"]
+    np.add(high, low, out=pivot)
+    pivot += close
+    pivot /= 3
+
+    for name in families:
+        LEVEL_FAMILIES[name].compute(lv, high, low, close, open_, multiplier)
+    return lv
+
+
+def shift_levels(levels):
+    """Levels that applied *to* each period: the engine output shifted down one row."""
+    shifted = {}
+    for name, values in levels.items():
+        if name == "Swapped":
+            out = np.zeros_like(values)
+        else:
+            out = np.empty_like(values)
+            out[:1] = np.nan
+        out[1:] = values[:-1]
+        shifted[name] = out
+    return shifted
+
+
+def tail_levels(levels, n):
+    """Views of the last ``n`` rows of every level column (no copies).
+
+    The app only reports on the latest periods, so it classifies these
+    instead of the whole history.
+    """
+    return {name: values[-n:] for name, values in levels.items()}
+
+
+def next_period_levels(levels):
+    """Scalar levels for the period after the last row."""
+    nxt = {name: float(values[-1]) for name, values in levels.items() if name != "Swapped"}
+    if "Swapped" in levels:
+        nxt["Swapped"] = bool(levels["Swapped"][-1])
+    return nxt
+
+
+def levels_frame(df, multiplier=CAMARILLA_MULTIPLIER, families=DEFAULT_FAMILIES):
+    """DataFrame of engine output for an OHLC frame, aligned to its index."""
+    lv = compute_levels(df["High"].to_numpy(), df["Low"].to_numpy(), df["Close"].to_numpy(),
+                        multiplier=multiplier, families=families,
+                        open_=df["Open"].to_numpy() if "Open" in df.columns else None)
+    return pd.DataFrame(lv, index=df.index)
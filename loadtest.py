@@ -0,0 +1,179 @@
+"""Load test for the local levels API (server.py).
+
+Sends ``--requests`` requests from ``--concurrency`` client threads, each
+with its own keep-alive connection, and reports throughput and latency
+percentiles (p50/p90/p99/max). Without ``--url`` a server is started on a
+free local port for the run and stopped afterwards.
+
+Request i carries one of ``--distinct`` parameter variants (tolerance is
+nudged by i % distinct * 1e-6), so ``--distinct 1`` measures the cache-hit
+path after the first request and ``--distinct`` equal to ``--requests``
+makes every request a miss:
+
+    python loadtest.py --file sample_input_file_for_CPR.xlsx --requests 2000 --concurrency 16
+    python loadtest.py --file data.csv --distinct 200 --requests 200 --freq Weekly
+    python loadtest.py --url http://127.0.0.1:8765 --endpoint store --symbol NIFTY
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote, urlencode, urlsplit
+
+import numpy as np
+
+from dpz import DPZ_TOLERANCE_PCT
+from ingest import FREQUENCIES
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, server_args=()):
+    """server.py as a child process, returned once /health answers."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+    proc = subprocess.Popen([sys.executable, script, "--port", str(port), *server_args])
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("server did not start within 30s")
+
+
+def build_requests(args):
+    """(method, path, body) per request."""
+    body = None
+    if args.endpoint in ("levels", "batch"):
+        with open(args.file, "rb") as f:
+            body = f.read()
+    requests = []
+    for i in range(args.requests):
+        query = {"freq": args.freq, "tolerance": f"{DPZ_TOLERANCE_PCT + (i % args.distinct) * 1e-6:.9f}"}
+        if args.endpoint == "store":
+            requests.append(("GET", f"/levels/{quote(args.symbol)}?{urlencode(query)}", None))
+        else:
+            query["name"] = os.path.basename(args.file)
+            requests.append(("POST", f"/{args.endpoint}?{urlencode(query)}", body))
+    return requests
+
+
+def run_load(host, port, requests, concurrency):
+    """Latencies in seconds (NaN for failed requests) and the wall time."""
+    latencies = np.full(len(requests), np.nan)
+    errors = []
+    next_index = iter(range(len(requests)))
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=120)
+        while True:
+            with lock:
+                i = next(next_index, None)
+            if i is None:
+                break
+            method, path, body = requests[i]
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body)
+                response = conn.getresponse()
+                payload = response.read()
+                if response.status == 200:
+                    latencies[i] = time.perf_counter() - start
+                else:
+                    errors.append(f"{response.status}: {payload[:200].decode('utf-8', 'replace')}")
+            except OSError as e:
+                errors.append(str(e))
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=120)
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(latencies, errors, wall):
+    ok = latencies[~np.isnan(latencies)] * 1000
+    summary = {"requests": len(latencies), "ok": len(ok), "errors": len(errors), "wall_s": round(wall, 3),
+               "throughput_rps": round(len(ok) / wall, 1) if wall else None}
+    if len(ok):
+        for name, q in (("p50_ms", 50), ("p90_ms", 90), ("p99_ms", 99)):
+            summary[name] = round(float(np.percentile(ok, q)), 2)
+        summary["max_ms"] = round(float(ok.max()), 2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure throughput and latency of the local levels API.")
+    parser.add_argument("--url", help="running server (default: start one on a free port)")
+    parser.add_argument("--endpoint", choices=["levels", "batch", "store"], default="levels")
+    parser.add_argument("--file", help="OHLC file (levels) or universe file (batch) to send")
+    parser.add_argument("--symbol", help="history-store symbol (store endpoint)")
+    parser.add_argument("--freq", default="Daily", choices=FREQUENCIES)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distinct", type=int, default=1, help="distinct parameter variants (cache keys)")
+    parser.add_argument("--warmup", type=int, default=0, help="requests sent before timing starts")
+    parser.add_argument("--server-args", default="", help="extra arguments for the started server, e.g. '--workers 4'")
+    parser.add_argument("--output", help="also write the summary as JSON")
+    args = parser.parse_args(argv)
+    if args.endpoint in ("levels", "batch") and not args.file:
+        parser.error(f"--file is required for the {args.endpoint} endpoint")
+    if args.endpoint == "store" and not args.symbol:
+        parser.error("--symbol is required for the store endpoint")
+    args.distinct = max(1, args.distinct)
+
+    proc = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = "127.0.0.1", _free_port()
+        proc = start_server(port, args.server_args.split())
+    try:
+        requests = build_requests(args)
+        if args.warmup:
+            run_load(host, port, requests[:args.warmup], args.concurrency)
+        latencies, errors, wall = run_load(host, port, requests, args.concurrency)
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        conn.request("GET", "/health")
+        health = json.loads(conn.getresponse().read())
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    summary = summarize(latencies, errors, wall)
+    summary.update(endpoint=args.endpoint, concurrency=args.concurrency, distinct=args.distinct,
+                   server_workers=health.get("workers"), cache=health.get("cache"))
+    for error in sorted(set(errors))[:5]:
+        print(f"error: {error}", file=sys.stderr)
+    print(json.dumps(summary, indent=1))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=1)
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
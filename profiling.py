@@ -0,0 +1,145 @@
+"""Per-stage wall time and peak memory instrumentation.
+
+Library code marks its stages with ``with stage("name"):`` (or, in
+straight-line scripts such as the app, begin_stage/end_stage). That is a no-op
+unless a StageRecorder has been activated for the current context (the app
+does so when its debug toggle is on), so the markers cost nothing in normal
+runs. While recording, peak memory is measured with tracemalloc, which
+sees NumPy and pandas buffers as well as Python objects; it slows the
+run down, which is why it is opt-in.
+
+Stages may nest: each record's peak is the highest traced memory above the
+level at which the stage started, including its children. tracemalloc is
+process-wide, so a recording made while other Streamlit sessions are busy
+includes their allocations too.
+"""
+import contextvars
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+_RECORDER = contextvars.ContextVar("stage_recorder", default=None)
+_TRACING = {"owner": None}   # recorder that started tracemalloc, if any
+
+
+class StageRecorder:
+    """Collects one record per finished stage: name, seconds, peak and net bytes."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []          # [name, start time, start bytes, peak seen before the last reset]
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _TRACING["owner"] = self
+        return self
+
+    def stop(self):
+        if _TRACING["owner"] is self:
+            tracemalloc.stop()
+            _TRACING["owner"] = None
+
+    def _memory(self):
+        return tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+
+    def enter(self, name):
+        current, peak = self._memory()
+        if self._stack:
+            # Resetting the peak below would lose the enclosing stage's peak so far
+            self._stack[-1][3] = max(self._stack[-1][3], peak)
+        self._stack.append([name, time.perf_counter(), current, current])
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def exit(self, **info):
+        name, start, start_bytes, seen_peak = self._stack.pop()
+        current, peak = self._memory()
+        self.records.append({
+            "stage": name,
+            "depth": len(self._stack),
+            "seconds": time.perf_counter() - start,
+            "peak_bytes": max(seen_peak, peak) - start_bytes,
+            "net_bytes": current - start_bytes,
+            **info,
+        })
+        if self._stack:
+            self._stack[-1][3] = max(self._stack[-1][3], peak)
+
+    def frame(self):
+        """Records as a DataFrame (Stage, ms, Peak MB, Net MB), in completion order."""
+        df = pd.DataFrame(self.records, columns=["stage", "depth", "seconds", "peak_bytes", "net_bytes"])
+        return pd.DataFrame({
+            "Stage": ["  " * d + s for d, s in zip(df["depth"], df["stage"])],
+            "ms": df["seconds"] * 1000,
+            "Peak MB": df["peak_bytes"] / 2**20,
+            "Net MB": df["net_bytes"] / 2**20,
+        })
+
+    def write_jsonl(self, path, **context):
+        """Append one JSON line per record, tagged with a run timestamp and ``context``."""
+        run = pd.Timestamp.now(tz="UTC").isoformat()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(json.dumps({"run": run, **context, **record}, default=str) + "\n")
+
+
+def activate(recorder):
+    """Make ``recorder`` (or None) the current context's recorder.
+
+    Also stops tracing left running by an earlier recorder that was never
+    stopped (e.g. a Streamlit run that ended in st.stop()).
+    """
+    owner = _TRACING["owner"]
+    if owner is not None and owner is not recorder:
+        owner.stop()
+    _RECORDER.set(recorder.start() if recorder is not None else None)
+    return recorder
+
+
+def current_recorder():
+    return _RECORDER.get()
+
+
+@contextmanager
+def stage(name, **info):
+    recorder = _RECORDER.get()
+    if recorder is None:
+        yield
+        return
+    recorder.enter(name)
+    try:
+        yield
+    finally:
+        recorder.exit(**info)
+
+
+def begin_stage(name):
+    """Statement form of ``stage`` for straight-line scripts; pair with end_stage."""
+    recorder = _RECORDER.get()
+    if recorder is not None:
+        recorder.enter(name)
+
+
+def end_stage(**info):
+    recorder = _RECORDER.get()
+    if recorder is not None:
+        recorder.exit(**info)
+
+
+@contextmanager
+def recording(trace_memory=True):
+    """Record the stages of a block: ``with recording() as rec: ...``."""
+    recorder = StageRecorder(trace_memory).start()
+    token = _RECORDER.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _RECORDER.reset(token)
+        recorder.stop()
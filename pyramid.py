@@ -0,0 +1,50 @@
+"""Resample pyramid: one daily frame aggregated to every frequency at once.
+
+The app lets the user flip between Daily, Weekly, Monthly and Yearly on
+every rerun, so an upload is aggregated to all four frequencies up front
+and the level engine is run over each. Switching frequency is then a dict
+lookup. Every coarser frequency is reduced from the daily frame (Open
+first, High max, Low min, Close last), so Open survives into the weekly,
+monthly and yearly frames.
+"""
+import numpy as np
+import pandas as pd
+
+from ingest import FREQUENCIES, resample_ohlc
+from level_engine import CAMARILLA_MULTIPLIER, compute_levels
+
+
+def build_pyramid(daily):
+    """{frequency: aggregated frame} for a date-sorted daily frame."""
+    return {freq: resample_ohlc(daily, freq) for freq in FREQUENCIES}
+
+
+def frozen_levels(df, multiplier=CAMARILLA_MULTIPLIER):
+    """Engine output for ``df`` with read-only arrays, safe to share from a cache.
+
+    Levels take the precision of the prices: float32 frames (compact mode)
+    get float32 levels.
+    """
+    dtype = np.result_type(df["High"].dtype, np.float32)
+    levels = compute_levels(df["High"].to_numpy(), df["Low"].to_numpy(), df["Close"].to_numpy(),
+                            multiplier=multiplier, dtype=dtype)
+    for values in levels.values():
+        values.flags.writeable = False
+    return levels
+
+
+def pyramid_levels(frames, multiplier=CAMARILLA_MULTIPLIER):
+    return {freq: frozen_levels(df, multiplier) for freq, df in frames.items()}
+
+
+def stack_pyramid(frames):
+    """One long frame with a leading Frequency column (for a single sidecar file)."""
+    return pd.concat([df.assign(Frequency=freq) for freq, df in frames.items()], ignore_index=True)
+
+
+def split_pyramid(stacked):
+    frames = {}
+    for freq in FREQUENCIES:
+        df = stacked[stacked["Frequency"] == freq]
+        frames[freq] = df.drop(columns="Frequency").reset_index(drop=True)
+    return frames
@@ -0,0 +1,84 @@
+"""Vectorized two-period relationship classification.
+
+Labels every period of a history at once, comparing the levels derived from
+period ``i`` ("next") against those derived from period ``i - 1``
+("current"). The rule order is the same as the app's if/elif chain, so the
+last row reproduces what the app shows for the next session. The first row
+has no prior period and is left missing.
+"""
+import numpy as np
+import pandas as pd
+
+UNCHANGED_THRESHOLD = 0.05
+
+# In rule order; index in this tuple is the relationship code
+RELATIONSHIP_KINDS = (
+    ("Higher Value", "Bullish"),
+    ("Overlapping Higher Value", "Moderately Bullish"),
+    ("Lower Value", "Bearish"),
+    ("Overlapping Lower Value", "Moderately Bearish"),
+    ("Unchanged Value", "Sideways/Breakout"),
+    ("Outside Value", "Sideways"),
+    ("Inside Value", "Breakout"),
+)
+NO_RELATIONSHIP = len(RELATIONSHIP_KINDS)
+MISSING = -1
+
+
+def relationship_codes(prev_top, prev_bottom, curr_top, curr_bottom, unchanged_threshold=UNCHANGED_THRESHOLD):
+    """Relationship code per element: an index into RELATIONSHIP_KINDS,
+    NO_RELATIONSHIP when no rule matches, MISSING when an input is NaN."""
+    prev_top = np.asarray(prev_top, dtype=np.float64)
+    prev_bottom = np.asarray(prev_bottom, dtype=np.float64)
+    curr_top = np.asarray(curr_top, dtype=np.float64)
+    curr_bottom = np.asarray(curr_bottom, dtype=np.float64)
+
+    top_up = curr_top > prev_top
+    top_down = curr_top < prev_top
+    bottom_up = curr_bottom > prev_bottom
+    bottom_down = curr_bottom < prev_bottom
+    conditions = [
+        curr_bottom > prev_top,
+        top_up & (curr_bottom < prev_top) & bottom_up,
+        curr_top < prev_bottom,
+        (curr_top > prev_bottom) & top_down & bottom_down,
+        (np.abs(curr_top - prev_top) < unchanged_threshold) & (np.abs(curr_bottom - prev_bottom) < unchanged_threshold),
+        top_up & bottom_down,
+        top_down & bottom_up,
+    ]
+    codes = np.select(conditions, np.arange(len(conditions), dtype=np.int8), default=NO_RELATIONSHIP).astype(np.int8)
+    missing = np.isnan(prev_top) | np.isnan(prev_bottom) | np.isnan(curr_top) | np.isnan(curr_bottom)
+    codes[missing] = MISSING
+    return codes
+
+
+def _history_codes(top, bottom, unchanged_threshold):
+    top = np.asarray(top, dtype=np.float64)
+    bottom = np.asarray(bottom, dtype=np.float64)
+    prev_top = np.concatenate(([np.nan], top[:-1]))
+    prev_bottom = np.concatenate(([np.nan], bottom[:-1]))
+    return relationship_codes(prev_top, prev_bottom, top, bottom, unchanged_threshold)
+
+
+def _labelled(codes, relationships, sentiments, index):
+    return pd.DataFrame({
+        "Relationship": pd.Categorical.from_codes(codes, categories=relationships),
+        "Sentiment": pd.Categorical.from_codes(codes, categories=sentiments),
+    }, index=index)
+
+
+def cpr_relationships(tc, bc, index=None, unchanged_threshold=UNCHANGED_THRESHOLD):
+    """CPR (TC/BC) relationship and sentiment for every period."""
+    codes = _history_codes(tc, bc, unchanged_threshold)
+    relationships = [f"{kind} Relationship" for kind, _ in RELATIONSHIP_KINDS] + ["No Clear Relationship"]
+    sentiments = [sentiment for _, sentiment in RELATIONSHIP_KINDS] + ["Neutral"]
+    return _labelled(codes, relationships, sentiments, index)
+
+
+def camarilla_relationships(r3, s3, data_freq="Daily", index=None, unchanged_threshold=UNCHANGED_THRESHOLD):
+    """Camarilla (R3/S3) "CE" relationship and sentiment for every period."""
+    codes = _history_codes(r3, s3, unchanged_threshold)
+    relationships = ([f"CE {kind} {data_freq} Relationship" for kind, _ in RELATIONSHIP_KINDS]
+                     + ["Not satisfying any of the conditions"])
+    sentiments = [sentiment for _, sentiment in RELATIONSHIP_KINDS] + ["Unknown"]
+    return _labelled(codes, relationships, sentiments, index)
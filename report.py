@@ -0,0 +1,178 @@
+"""Headless report generator for the pre-market levels sheet.
+
+Runs the same per-period analysis the Streamlit app shows (CPR, classic and
+Camarilla levels, CPR/CE relationships, GPZ and DPZ) over every input file
+in parallel and writes one combined table with a leading Symbol column (the
+file name without its extension). By default only the next-period row of
+each file is written; ``--history`` writes every period.
+
+Only pandas/NumPy and the headless modules are imported -- never streamlit,
+plotly or matplotlib -- so startup stays a fraction of a second.
+
+    python report.py data/*.xlsx --freq Daily --output premarket.csv
+    python report.py data/ --freq Weekly --format parquet --output weekly.parquet
+
+With ``--state-dir`` each file's incremental.StateStore state is kept
+between runs: a re-run over files that gained a few rows folds in only the
+new bars instead of re-analyzing every file's full history.
+
+    python report.py data/*.csv --state-dir .cpr_state --output premarket.csv
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis import analyze_ohlc, prepare_ohlc
+from batch import combine_outputs
+from dpz import DPZ_TOLERANCE_PCT
+from incremental import StateStore
+from ingest import FILE_FORMATS, FREQUENCIES, read_ohlc
+from level_engine import ALL_FAMILIES, DEFAULT_FAMILIES
+from width_stats import WIDTH_WINDOW
+
+REPORT_FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet", ".json": "json"}
+
+
+def expand_inputs(patterns):
+    """Input files for a mix of file paths, directories and glob patterns."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in sorted(os.listdir(pattern))]
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        paths += [p for p in matches if os.path.splitext(p)[1].lower() in FILE_FORMATS and os.path.isfile(p)]
+    return list(dict.fromkeys(paths))
+
+
+def _report_task(task):
+    path, data_freq, market_type, tolerance_pct, history, families, width_window = task
+    symbol = os.path.splitext(os.path.basename(path))[0]
+    try:
+        out = analyze_ohlc(prepare_ohlc(read_ohlc(path, path)), data_freq, market_type, tolerance_pct,
+                           families=families, width_window=width_window)
+        if len(out) < 2:
+            raise ValueError(f"Need at least 2 {data_freq.lower()} periods.")
+    except Exception as e:
+        return symbol, path, None, str(e)
+    if not history:
+        out = out.iloc[-1:]
+    return symbol, path, {col: out[col].to_numpy() for col in out.columns}, None
+
+
+def _state_task(task):
+    """_report_task's next-period row from the file's saved StateStore state."""
+    path, data_freq, market_type, tolerance_pct, state_dir, width_window = task
+    symbol = os.path.splitext(os.path.basename(path))[0]
+    try:
+        state = StateStore(state_dir).update(symbol, read_ohlc(path, path))
+        if len(state.periods[data_freq]) < 2:
+            raise ValueError(f"Need at least 2 {data_freq.lower()} periods.")
+        out = state.snapshot(market_type, tolerance_pct)
+        out = out[out["Frequency"] == data_freq].drop(columns="Frequency")
+        if not width_window:
+            out = out.drop(columns=list(state.width_stats(data_freq)))
+    except Exception as e:
+        return symbol, path, None, str(e)
+    return symbol, path, {col: out[col].to_numpy() for col in out.columns}, None
+
+
+def iter_reports(paths, data_freq="Daily", market_type="Stock Market", tolerance_pct=DPZ_TOLERANCE_PCT,
+                 history=False, max_workers=None, families=DEFAULT_FAMILIES, width_window=None, state_dir=None):
+    """Analyze every file in ``paths``, yielding ``(symbol, path, columns, error)`` in input order.
+
+    ``columns`` is a dict of column arrays (None on error). Results are
+    yielded as the pool finishes them, so a consumer that writes each one
+    out holds only a few files' tables at a time. With ``state_dir`` the
+    next-period rows come from each file's incremental state (default
+    families and a WIDTH_WINDOW width window only; no ``history``).
+    """
+    if state_dir:
+        if history:
+            raise ValueError("history needs the full analysis; it cannot be combined with a state directory")
+        if tuple(families) != DEFAULT_FAMILIES or width_window not in (None, WIDTH_WINDOW):
+            raise ValueError(f"a state directory supports the default families and a width window of "
+                             f"{WIDTH_WINDOW} only")
+        fn = _state_task
+        tasks = [(path, data_freq, market_type, tolerance_pct, state_dir, width_window) for path in paths]
+    else:
+        fn = _report_task
+        tasks = [(path, data_freq, market_type, tolerance_pct, history, tuple(families), width_window)
+                 for path in paths]
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(tasks) <= 1:
+        yield from map(fn, tasks)
+        return
+    chunksize = max(1, len(tasks) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        yield from pool.map(fn, tasks, chunksize=chunksize)
+
+
+def build_report(paths, data_freq="Daily", market_type="Stock Market", tolerance_pct=DPZ_TOLERANCE_PCT,
+                 history=False, max_workers=None, families=DEFAULT_FAMILIES, width_window=None, state_dir=None):
+    """Analyze every file in ``paths``; returns ``(report, errors)`` like batch.run_batch."""
+    outputs = list(iter_reports(paths, data_freq, market_type, tolerance_pct, history, max_workers, families,
+                                width_window, state_dir))
+    errors = {path: error for _, path, _, error in outputs if error is not None}
+    report = combine_outputs([(symbol, columns) for symbol, _, columns, _ in outputs if columns is not None])
+    return report, errors
+
+
+def write_report(report, path, fmt):
+    if fmt == "csv":
+        report.to_csv(path, index=False)
+    elif fmt == "parquet":
+        report.to_parquet(path, index=False)
+    else:
+        report.to_json(path, orient="records", date_format="iso", indent=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write CPR / Camarilla / relationship / GPZ / DPZ tables for OHLC files.")
+    parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns")
+    parser.add_argument("--freq", default="Daily", choices=FREQUENCIES)
+    parser.add_argument("--market", default="Stock Market", choices=["Stock Market", "Bitcoin"])
+    parser.add_argument("--format", choices=sorted(set(REPORT_FORMATS.values())),
+                        help="output format (default: from the --output extension)")
+    parser.add_argument("--output", default="levels_report.csv")
+    parser.add_argument("--history", action="store_true", help="write every period, not just the next-period row")
+    parser.add_argument("--tolerance", type=float, default=DPZ_TOLERANCE_PCT, help="DPZ tolerance as a fraction of price")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--families", nargs="+", choices=ALL_FAMILIES, default=list(DEFAULT_FAMILIES),
+                        help="pivot level families to include (default: %(default)s)")
+    parser.add_argument("--width-window", type=int,
+                        help="add rolling CPR/Camarilla width mean, z-score and percentile over N periods")
+    parser.add_argument("--state-dir",
+                        help="keep per-file incremental state here and fold in only bars newer than the last run")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or REPORT_FORMATS.get(os.path.splitext(args.output)[1].lower())
+    if fmt is None:
+        parser.error("cannot tell the output format from --output; pass --format")
+    if args.state_dir and args.history:
+        parser.error("--state-dir writes next-period rows only; it cannot be combined with --history")
+    if args.state_dir and (tuple(args.families) != DEFAULT_FAMILIES or args.width_window not in (None, WIDTH_WINDOW)):
+        parser.error(f"--state-dir supports the default --families and --width-window {WIDTH_WINDOW} only")
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("no supported input files found")
+
+    start = time.perf_counter()
+    report, errors = build_report(paths, args.freq, args.market, args.tolerance, args.history, args.workers,
+                                  args.families, args.width_window, args.state_dir)
+    for path, error in errors.items():
+        print(f"Skipping {path}: {error}", file=sys.stderr)
+    if report.empty:
+        print("No files could be analyzed.", file=sys.stderr)
+        return 1
+    write_report(report, args.output, fmt)
+    print(f"Wrote {len(report)} rows for {len(paths) - len(errors)} files to {args.output} "
+          f"in {time.perf_counter() - start:.1f}s ({len(errors)} skipped)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
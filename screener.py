@@ -0,0 +1,302 @@
+"""Universe screener over precomputed next-period snapshots.
+
+Each symbol's latest analysis row -- the next-period CPR, classic and
+Camarilla levels with their relationship, GPZ and DPZ labels, the same row
+report.py writes -- is kept in one columnar table, together with the CPR
+and Camarilla widths relative to price. Two kinds of index are rebuilt
+whenever the table changes:
+
+    sort indexes   the row order by each width column (NaN last), with the
+                   sorted values, so "narrowest N" is a slice and a width
+                   bound is a binary search
+    postings       per label column, the rows holding each label, so a
+                   filter only touches the matching rows
+
+Queries intersect postings with a sort index and never rescan the
+analysis. Refreshes are incremental: each row records its source (a file
+or a history-store symbol) and a fingerprint (file mtime and size, or the
+store's row count and last date), and only new or changed sources are
+re-analyzed. A symbol is its file's name without the extension, so files
+that share a name (the same symbol from two directories, or as .csv and
+.xlsx) are rejected rather than left to overwrite one another. The table persists as one Parquet file, together with the
+frequency, market and DPZ tolerance its snapshots were built with;
+opening it with different ones starts the table over.
+
+    python screener.py refresh data/ --db screener.parquet --freq Daily
+    python screener.py query --db screener.parquet --gpz Bullish --top 20
+    python screener.py query --db screener.parquet --relationship "Inside Value" --max-width 0.1
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from analysis import analyze_ohlc
+from batch import CATEGORY_COLUMNS, SYMBOL_COL, combine_outputs
+from dpz import DPZ_TOLERANCE_PCT
+from ingest import FREQUENCIES
+from report import build_report, expand_inputs
+from width_stats import width_pct
+
+SORT_COLUMNS = ("CPR_WidthPct", "Cam_WidthPct")
+FILTER_COLUMNS = CATEGORY_COLUMNS
+STORE_PREFIX = "store:"
+PARAMS_ATTR = "screener_params"
+DEFAULT_PARAMS = {"data_freq": "Daily", "market_type": "Stock Market", "tolerance_pct": DPZ_TOLERANCE_PCT}
+
+
+def _file_fingerprint(path):
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _file_symbol(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _store_fingerprint(info):
+    return f"rows:{info['rows']}:{info['last']}"
+
+
+def snapshot_columns(report):
+    """Add the width columns the screener ranks on to a report table."""
+    levels = {col: report[col].to_numpy(dtype=np.float64) for col in ("TC", "BC", "Cam_R3", "Cam_S3")}
+    widths = width_pct(levels, report["Close"].to_numpy())
+    report["CPR_WidthPct"], report["Cam_WidthPct"] = widths["CPR"], widths["Cam"]
+    return report
+
+
+# ==========================================================
+# --- Screener ---
+class Screener:
+    """Latest snapshot per symbol with width sort indexes and label postings.
+
+    Parameters left as None come from the saved table (or DEFAULT_PARAMS).
+    When given ones differ from the saved ones, the stored snapshots are
+    dropped (``rebuilt`` is set) so the next refresh recomputes every source.
+    """
+
+    def __init__(self, path=None, data_freq=None, market_type=None, tolerance_pct=None):
+        self.path = path
+        empty = pd.DataFrame(columns=[SYMBOL_COL, "Source", "Fingerprint"])
+        table = pd.read_parquet(path) if path and os.path.exists(path) else empty
+        saved = {**DEFAULT_PARAMS, **table.attrs.get(PARAMS_ATTR, {})}
+        self.data_freq = data_freq or saved["data_freq"]
+        self.market_type = market_type or saved["market_type"]
+        self.tolerance_pct = saved["tolerance_pct"] if tolerance_pct is None else tolerance_pct
+        self.rebuilt = len(table) > 0 and self.params() != saved
+        self._set_table(empty if self.rebuilt else table)
+
+    def params(self):
+        return {"data_freq": self.data_freq, "market_type": self.market_type, "tolerance_pct": self.tolerance_pct}
+
+    @property
+    def table(self):
+        return self._table
+
+    def __len__(self):
+        return len(self._table)
+
+    # --- Indexes ---
+    def _set_table(self, table):
+        table = table.reset_index(drop=True)
+        for col in FILTER_COLUMNS:
+            if col in table.columns:
+                table[col] = table[col].astype("category")
+        self._table = table
+        self._sorted = {}
+        for col in SORT_COLUMNS:
+            if col in table.columns:
+                values = table[col].to_numpy(dtype=np.float64)
+                order = np.argsort(values, kind="stable")
+                self._sorted[col] = (order, values[order], int(np.count_nonzero(~np.isnan(values))))
+        self._postings = {}
+        for col in FILTER_COLUMNS:
+            if col in table.columns:
+                codes = table[col].cat.codes.to_numpy()
+                order = np.argsort(codes, kind="stable")
+                bounds = np.searchsorted(codes[order], np.arange(len(table[col].cat.categories) + 1))
+                self._postings[col] = {label: order[bounds[i]:bounds[i + 1]]
+                                       for i, label in enumerate(table[col].cat.categories)}
+
+    def labels(self, col):
+        """Labels present in filter column ``col``."""
+        return list(self._postings.get(col, {}))
+
+    def match_labels(self, col, text):
+        """Labels of ``col`` containing ``text`` (case-insensitive)."""
+        return [label for label in self.labels(col) if text.lower() in str(label).lower()]
+
+    # --- Queries ---
+    def query(self, filters=None, sort_by="CPR_WidthPct", ascending=True, min_value=None, max_value=None, top=None):
+        """Snapshot rows matching every filter, ranked by ``sort_by``.
+
+        ``filters`` maps a label column to one label or a list of labels
+        (any of them matches). ``min_value``/``max_value`` bound the sort
+        column; rows where it is NaN are left out.
+        """
+        if sort_by not in self._sorted:
+            return self._table.iloc[0:0]
+        order, values, n_valid = self._sorted[sort_by]
+        lo = 0 if min_value is None else int(np.searchsorted(values[:n_valid], min_value, "left"))
+        hi = n_valid if max_value is None else int(np.searchsorted(values[:n_valid], max_value, "right"))
+        order = order[lo:hi]
+        if not ascending:
+            order = order[::-1]
+
+        for col, wanted in (filters or {}).items():
+            postings = self._postings.get(col, {})
+            wanted = [wanted] if isinstance(wanted, str) else wanted
+            mask = np.zeros(len(self._table), dtype=bool)
+            for label in wanted:
+                mask[postings.get(label, [])] = True
+            order = order[mask[order]]
+        if top is not None:
+            order = order[:top]
+        return self._table.iloc[order]
+
+    # --- Updates ---
+    def upsert(self, snapshots):
+        """Replace (or add) the rows of the symbols in ``snapshots`` and rebuild the indexes."""
+        if snapshots.empty:
+            return
+        snapshots = snapshot_columns(snapshots)
+        kept = self._table[~self._table[SYMBOL_COL].isin(snapshots[SYMBOL_COL])]
+        parts = [part for part in (kept, snapshots) if len(part)]
+        self._set_table(pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0])
+
+    def remove(self, symbols):
+        self._set_table(self._table[~self._table[SYMBOL_COL].isin(list(symbols))])
+
+    def refresh(self, paths, max_workers=None, prune=False):
+        """Re-analyze the files in ``paths`` that are new or changed.
+
+        Returns ``(updated symbols, errors)``. Files whose name (the
+        symbol) is shared by another file in ``paths`` are skipped with an
+        error. With ``prune``, symbols whose source file is not in ``paths``
+        are dropped.
+        """
+        paths = list(dict.fromkeys(paths))
+        by_symbol = {}
+        for path in paths:
+            by_symbol.setdefault(_file_symbol(path), []).append(path)
+        errors = {path: f"symbol {symbol!r} also comes from " + ", ".join(p for p in same if p != path)
+                  for symbol, same in by_symbol.items() if len(same) > 1 for path in same}
+
+        known = dict(zip(self._table["Source"], self._table["Fingerprint"]))
+        current = {path: _file_fingerprint(path) for path in paths if path not in errors}
+        changed = [path for path, fingerprint in current.items() if known.get(path) != fingerprint]
+        report, report_errors = build_report(changed, self.data_freq, self.market_type, self.tolerance_pct,
+                                             max_workers=max_workers)
+        errors.update(report_errors)
+        if len(report):
+            sources = {_file_symbol(path): path for path in changed}
+            report["Source"] = report[SYMBOL_COL].map(sources)
+            report["Fingerprint"] = report["Source"].map(current)
+            self.upsert(report)
+        if prune:
+            gone = self._table.loc[~self._table["Source"].str.startswith(STORE_PREFIX)
+                                   & ~self._table["Source"].isin(paths), SYMBOL_COL]
+            if len(gone):
+                self.remove(gone)
+        return list(report[SYMBOL_COL]) if len(report) else [], errors
+
+    def refresh_store(self, store, symbols=None):
+        """Re-analyze history-store symbols whose stored rows changed."""
+        known = dict(zip(self._table["Source"], self._table["Fingerprint"]))
+        outputs, errors = [], {}
+        for symbol in store.symbols() if symbols is None else symbols:
+            info = store.info(symbol)
+            source, fingerprint = STORE_PREFIX + symbol, _store_fingerprint(info)
+            if known.get(source) == fingerprint:
+                continue
+            try:
+                out = analyze_ohlc(store.frame(symbol), self.data_freq, self.market_type, self.tolerance_pct)
+                if len(out) < 2:
+                    raise ValueError(f"Need at least 2 {self.data_freq.lower()} periods.")
+            except Exception as e:
+                errors[symbol] = str(e)
+                continue
+            row = {col: out[col].to_numpy()[-1:] for col in out.columns}
+            row["Source"], row["Fingerprint"] = [source], [fingerprint]
+            outputs.append((symbol, row))
+        if outputs:
+            self.upsert(combine_outputs(outputs))
+        return [symbol for symbol, _ in outputs], errors
+
+    def save(self, path=None):
+        path = path or self.path
+        tmp_path = path + ".tmp"
+        table = self._table.copy(deep=False)
+        table.attrs = {PARAMS_ATTR: self.params()}
+        table.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+
+# ==========================================================
+# --- CLI ---
+QUERY_FLAGS = {"gpz": "GPZ", "dpz": "DPZ", "relationship": "CPR_Relationship", "sentiment": "CPR_Sentiment",
+               "ce_relationship": "CE_Relationship", "ce_sentiment": "CE_Sentiment"}
+DISPLAY_COLUMNS = [SYMBOL_COL, "Date", "Close", "Pivot", "BC", "TC", "CPR_WidthPct", "Cam_WidthPct",
+                   "CPR_Relationship", "CPR_Sentiment", "GPZ", "DPZ"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a universe on precomputed next-period levels.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    refresh = commands.add_parser("refresh", help="analyze new or changed files (and history-store symbols)")
+    refresh.add_argument("inputs", nargs="*", help="files, directories or glob patterns")
+    refresh.add_argument("--db", default="screener.parquet")
+    refresh.add_argument("--store", help="also refresh every symbol of this history store")
+    refresh.add_argument("--freq", choices=FREQUENCIES, help="default: the db's, else Daily")
+    refresh.add_argument("--market", choices=["Stock Market", "Bitcoin"], help="default: the db's, else Stock Market")
+    refresh.add_argument("--tolerance", type=float, help="DPZ tolerance (default: the db's, else %s)" % DPZ_TOLERANCE_PCT)
+    refresh.add_argument("--workers", type=int)
+    refresh.add_argument("--prune", action="store_true", help="drop symbols whose file is no longer listed")
+
+    query = commands.add_parser("query", help="filter and rank the stored snapshots")
+    query.add_argument("--db", default="screener.parquet")
+    for flag, col in QUERY_FLAGS.items():
+        query.add_argument(f"--{flag.replace('_', '-')}", help=f"{col} label containing this text")
+    query.add_argument("--sort", choices=SORT_COLUMNS, default="CPR_WidthPct")
+    query.add_argument("--descending", action="store_true")
+    query.add_argument("--min-width", type=float, help="lower bound on the sort column (%% of price)")
+    query.add_argument("--max-width", type=float, help="upper bound on the sort column (%% of price)")
+    query.add_argument("--top", type=int, default=20)
+    query.add_argument("--output", help="write the matches to this CSV instead of printing them")
+    args = parser.parse_args(argv)
+
+    if args.command == "refresh":
+        screener = Screener(args.db, args.freq, args.market, args.tolerance)
+        if screener.rebuilt:
+            print(f"Snapshot parameters changed; rebuilding {args.db}", file=sys.stderr)
+        updated, errors = screener.refresh(expand_inputs(args.inputs), args.workers, args.prune)
+        if args.store:
+            from history_store import HistoryStore
+            stored, store_errors = screener.refresh_store(HistoryStore(args.store))
+            updated, errors = updated + stored, {**errors, **store_errors}
+        screener.save()
+        for source, error in errors.items():
+            print(f"Skipping {source}: {error}", file=sys.stderr)
+        print(f"Updated {len(updated)} of {len(screener)} symbols in {args.db}", file=sys.stderr)
+        return 0
+
+    screener = Screener(args.db)
+    filters = {}
+    for flag, col in QUERY_FLAGS.items():
+        text = getattr(args, flag)
+        if text is not None:
+            filters[col] = screener.match_labels(col, text)
+    matches = screener.query(filters, args.sort, not args.descending, args.min_width, args.max_width, args.top)
+    if args.output:
+        matches.to_csv(args.output, index=False)
+        print(f"Wrote {len(matches)} matches to {args.output}", file=sys.stderr)
+    else:
+        print(matches[[col for col in DISPLAY_COLUMNS if col in matches.columns]].to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+"""Local HTTP API for the levels the Streamlit app shows.
+
+Endpoints (JSON responses; parameters go in the query string):
+
+    GET  /health                 status, worker count and cache statistics
+    POST /levels?name=NIFTY.csv  one OHLC file (any ingest format) as the body
+    GET  /levels/SYMBOL          one history-store symbol (needs --store)
+    POST /batch?name=u.xlsx      a universe as the body: sheet-per-symbol
+                                 workbook or long file with a Symbol column
+    GET  /batch?symbols=A,B      history-store symbols (default: all)
+
+    freq=Daily|Weekly|Monthly|Yearly   market=Stock Market|Bitcoin
+    tolerance=0.0015   history=1   families=fibonacci,woodie   width_window=50
+
+Each symbol's result is {"symbol", "frequency", "rows"} -- the next-period
+row, or every period with history=1 -- the same table report.py writes.
+Batch responses are {"results": [...], "errors": {symbol: reason}}.
+
+Requests are handled on their own threads. Encoded per-symbol results are
+kept in a bounded LRU keyed on a hash of the input (the upload's bytes, a
+universe symbol's arrays, or a store symbol's row count and last date),
+the frequency and the parameters, so a hit never touches pandas. Entries
+hold no symbol -- it is added to each response -- so the same bars under
+two names share an entry without answering for each other. Batch results
+are assembled from the same per-symbol entries (and a repeated batch
+upload is answered whole, without re-parsing). Misses run on a
+process pool, so analyses of different inputs proceed in parallel instead
+of queueing behind the GIL, and identical requests arriving together share
+one computation.
+
+    python server.py --port 8765 --store .cpr_history --workers 4
+    curl --data-binary @nifty.csv "http://127.0.0.1:8765/levels?name=nifty.csv&freq=Weekly"
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import signal
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pandas as pd
+
+from analysis import analyze_ohlc, prepare_ohlc
+from batch import read_universe, to_arrays
+from dpz import DPZ_TOLERANCE_PCT
+from ingest import FREQUENCIES, read_ohlc
+from level_engine import ALL_FAMILIES, DEFAULT_FAMILIES
+
+DEFAULT_PORT = 8765
+CACHE_ENTRIES = 1024
+CACHE_BYTES = 256 * 1024 * 1024
+MAX_BODY_BYTES = 512 * 1024 * 1024
+MARKET_TYPES = ("Stock Market", "Bitcoin")
+
+
+class RequestError(ValueError):
+    """A bad request: reported to the client with ``status``."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# ==========================================================
+# --- Response cache ---
+class ResponseCache:
+    """Bounded LRU of encoded responses, limited by entry count and total bytes."""
+
+    def __init__(self, max_entries=CACHE_ENTRIES, max_bytes=CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+# ==========================================================
+# --- Worker tasks ---
+# params = (data_freq, market_type, tolerance_pct, history, families, width_window)
+def _encode(out, params):
+    """The cached payload: {"frequency", "rows"}, without the symbol."""
+    data_freq, history = params[0], params[3]
+    if len(out) < 2:
+        raise ValueError(f"Need at least 2 {data_freq.lower()} periods.")
+    if not history:
+        out = out.iloc[-1:]
+    rows = out.to_json(orient="records", date_format="iso")
+    return f'{{"frequency":{json.dumps(data_freq)},"rows":{rows}}}'.encode("utf-8")
+
+
+def with_symbol(symbol, payload):
+    """A symbol's response body from its cached payload."""
+    return b'{"symbol":' + json.dumps(symbol).encode("utf-8") + b"," + payload[1:]
+
+
+def _analyze(df, params):
+    data_freq, market_type, tolerance_pct, _, families, width_window = params
+    out = analyze_ohlc(df, data_freq, market_type, tolerance_pct, families=families, width_window=width_window)
+    return _encode(out, params)
+
+
+def _upload_task(task):
+    data, name, params = task
+    return _analyze(prepare_ohlc(read_ohlc(data, name)), params)
+
+
+def _arrays_task(task):
+    arrays, params = task
+    df = pd.DataFrame({"Date": arrays["dates"], "High": arrays["high"],
+                       "Low": arrays["low"], "Close": arrays["close"]})
+    if arrays["open"] is not None:
+        df.insert(1, "Open", arrays["open"])
+    return _analyze(df, params)
+
+
+def _universe_task(task):
+    """symbol -> batch.to_arrays payload (and symbol -> error) for a universe file."""
+    data, name = task
+    universe, errors = {}, {}
+    for symbol, df in read_universe(io.BytesIO(data), name).items():
+        try:
+            universe[symbol] = to_arrays(df)
+        except Exception as e:
+            errors[symbol] = str(e)
+    return universe, errors
+
+
+def arrays_digest(arrays):
+    digest = hashlib.sha256()
+    for name in ("dates", "open", "high", "low", "close"):
+        if arrays[name] is not None:
+            digest.update(name.encode())
+            digest.update(arrays[name].tobytes())
+    return digest.hexdigest()
+
+
+# ==========================================================
+# --- Service ---
+class LevelService:
+    """Cached, pooled level computation behind the HTTP handlers."""
+
+    def __init__(self, store_dir=None, max_workers=None, threads=False,
+                 cache_entries=CACHE_ENTRIES, cache_bytes=CACHE_BYTES):
+        self.store = None
+        if store_dir:
+            from history_store import HistoryStore
+            self.store = HistoryStore(store_dir)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        executor = ThreadPoolExecutor if threads else ProcessPoolExecutor
+        self._pool = executor(max_workers=self.max_workers)
+        self.cache = ResponseCache(cache_entries, cache_bytes)
+        self._inflight = {}
+        self._lock = threading.RLock()      # done callbacks may run inside _start
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    # --- Single flight ---
+    def _start(self, key, fn, make_task):
+        """Future for ``key``'s response: cached, already running, or newly
+        submitted as ``fn(make_task())`` (the task is only built on a miss)."""
+        body = self.cache.get(key)
+        if body is not None:
+            future = Future()
+            future.set_result(body)
+            return future
+        with self._lock:
+            future = self._inflight.get(key)
+        if future is not None:
+            return future
+        task = make_task()
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._pool.submit(fn, task)
+                self._inflight[key] = future
+                future.add_done_callback(partial(self._done, key))
+        return future
+
+    def _done(self, key, future):
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    # --- Inputs ---
+    def _start_stored(self, symbol, params):
+        """_start for a history-store symbol, keyed on its row count and last date."""
+        if self.store is None:
+            raise RequestError("no history store configured (start the server with --store)", 404)
+        info = self.store.info(symbol)
+        if info is None:
+            raise RequestError(f"unknown symbol: {symbol}", 404)
+        key = ("store", symbol, info["rows"], str(info["last"]), params)
+        return self._start(key, _arrays_task, lambda: (to_arrays(self.store.frame(symbol)), params))
+
+    def _collect(self, futures, errors):
+        results = []
+        for symbol, future in futures:
+            try:
+                results.append(with_symbol(symbol, future.result()))
+            except Exception as e:
+                errors[symbol] = str(e)
+        return (b'{"results":[' + b",".join(results) + b'],"errors":'
+                + json.dumps(errors).encode("utf-8") + b"}")
+
+    # --- Endpoints ---
+    def levels_upload(self, data, name, params):
+        symbol = os.path.splitext(os.path.basename(name))[0]
+        key = ("upload", hashlib.sha256(data).hexdigest(), name.rsplit(".", 1)[-1].lower(), params)
+        return with_symbol(symbol, self._start(key, _upload_task, lambda: (data, name, params)).result())
+
+    def levels_stored(self, symbol, params):
+        return with_symbol(symbol, self._start_stored(symbol, params).result())
+
+    def batch_upload(self, data, name, params):
+        # A repeated upload skips parsing; a new one still reuses the per-symbol entries
+        batch_key = ("batch", hashlib.sha256(data).hexdigest(), name.rsplit(".", 1)[-1].lower(), params)
+        body = self.cache.get(batch_key)
+        if body is not None:
+            return body
+        universe, errors = self._pool.submit(_universe_task, (data, name)).result()
+        futures = []
+        for symbol, arrays in universe.items():
+            key = ("arrays", arrays_digest(arrays), params)
+            futures.append((symbol, self._start(key, _arrays_task, lambda task=(arrays, params): task)))
+        body = self._collect(futures, errors)
+        self.cache.put(batch_key, body)
+        return body
+
+    def batch_stored(self, symbols, params):
+        if self.store is None:
+            raise RequestError("no history store configured (start the server with --store)", 404)
+        futures, errors = [], {}
+        for symbol in symbols or self.store.symbols():
+            try:
+                futures.append((symbol, self._start_stored(symbol, params)))
+            except RequestError as e:
+                errors[symbol] = str(e)
+        return self._collect(futures, errors)
+
+    def health(self):
+        return json.dumps({"status": "ok", "workers": self.max_workers, "cache": self.cache.stats(),
+                           "store": self.store.root if self.store is not None else None}).encode("utf-8")
+
+
+# ==========================================================
+# --- HTTP ---
+def parse_params(query):
+    """The params tuple for a parsed query string; RequestError when invalid."""
+    def value(name, default=None):
+        return query.get(name, [default])[-1]
+
+    data_freq = value("freq", "Daily")
+    if data_freq not in FREQUENCIES:
+        raise RequestError(f"freq must be one of {', '.join(FREQUENCIES)}")
+    market_type = value("market", "Stock Market")
+    if market_type not in MARKET_TYPES:
+        raise RequestError(f"market must be one of {', '.join(MARKET_TYPES)}")
+    families = [f for f in (value("families") or "").split(",") if f]
+    unknown = [f for f in families if f not in ALL_FAMILIES]
+    if unknown:
+        raise RequestError(f"unknown families: {', '.join(unknown)}")
+    families = DEFAULT_FAMILIES + tuple(f for f in ALL_FAMILIES if f in families and f not in DEFAULT_FAMILIES)
+    try:
+        tolerance_pct = float(value("tolerance", DPZ_TOLERANCE_PCT))
+        width_window = int(value("width_window")) if value("width_window") else None
+    except ValueError as e:
+        raise RequestError(str(e))
+    history = value("history", "0").lower() in ("1", "true", "yes")
+    return data_freq, market_type, tolerance_pct, history, families, width_window
+
+
+class LevelHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive for repeated requests
+    disable_nagle_algorithm = True      # headers and body go out as separate writes
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise RequestError("request body too large", 413)
+        if not length:
+            raise RequestError("empty request body")
+        return self.rfile.read(length)
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        try:
+            if method == "GET" and parts == ["health"]:
+                body = self.service.health()
+            elif method == "POST" and parts in (["levels"], ["batch"]):
+                data = self._body()
+                params = parse_params(query)
+                name = query.get("name", ["upload.csv"])[-1]
+                if parts == ["levels"]:
+                    body = self.service.levels_upload(data, name, params)
+                else:
+                    body = self.service.batch_upload(data, name, params)
+            elif method == "GET" and len(parts) == 2 and parts[0] == "levels":
+                body = self.service.levels_stored(parts[1], parse_params(query))
+            elif method == "GET" and parts == ["batch"]:
+                symbols = [s for s in query.get("symbols", [""])[-1].split(",") if s]
+                body = self.service.batch_stored(symbols, parse_params(query))
+            else:
+                raise RequestError(f"no route for {method} {url.path}", 404)
+        except RequestError as e:
+            self._send(e.status, json.dumps({"error": str(e)}).encode("utf-8"))
+        except ValueError as e:
+            # Unreadable input: missing columns, unsupported file type, too few periods
+            self._send(400, json.dumps({"error": str(e)}).encode("utf-8"))
+        except Exception as e:
+            self._send(500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8"))
+        else:
+            self._send(200, body)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class LevelServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128            # the default 5 drops bursts of new connections
+
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, service=None, verbose=False):
+    server = LevelServer((host, port), LevelHandler)
+    server.service = service or LevelService()
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve CPR / Camarilla / GPZ / DPZ levels over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--store", help="history store directory for the GET endpoints")
+    parser.add_argument("--workers", type=int, help="analysis worker processes (default: CPU count)")
+    parser.add_argument("--threads", action="store_true", help="analyze on worker threads instead of processes")
+    parser.add_argument("--cache-entries", type=int, default=CACHE_ENTRIES, help="0 disables the response cache")
+    parser.add_argument("--cache-mb", type=int, default=CACHE_BYTES // (1024 * 1024))
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    service = LevelService(args.store, args.workers, args.threads, args.cache_entries, args.cache_mb * 1024 * 1024)
+    server = make_server(args.host, args.port, service, args.verbose)
+    print(f"Serving levels on http://{args.host}:{server.server_port} with {service.max_workers} "
+          f"{'threads' if args.threads else 'processes'}", file=sys.stderr, flush=True)
+    # Stop on SIGTERM like on Ctrl+C, so the worker processes are shut down too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
+from level_engine import compute_levels, shift_levels
 
 st.title("Central Pivot Range (CPR) Calculator with Support & Resistance Levels")
 
@@ -19,26 +20,14 @@ if uploaded_file:
         # Sort by date just in case
         df = df.sort_values("Date")
 
-        # CPR Calculation for next day
-        df["Pivot"] = (df["High"] + df["Low"] + df["Close"]) / 3
-        df["BC"] = (df["High"] + df["Low"]) / 2
-        df["TC"] = 2 * df["Pivot"] - df["BC"]
-
-        # Calculate support/resistance
-        df["R1"] = 2 * df["Pivot"] - df["Low"]
-        df["S1"] = 2 * df["Pivot"] - df["High"]
-        df["R2"] = df["Pivot"] + (df["High"] - df["Low"])
-        df["S2"] = df["Pivot"] - (df["High"] - df["Low"])
-        df["R3"] = df["R1"]  + (df["High"] - df["Low"])
-        df["S3"] = df["S1"]  + (df["High"] - df["Low"])
-        df["R4"] = df["R3"] + (df["R2"] - df["R1"])
-        df["S4"] = df["S3"] - (df["S1"] - df["S2"])
-        df["R5"] = df["R4"] + (df["R2"] - df["Pivot"])
-        df["S5"] = df["S4"] - (df["S1"] - df["S2"])
+        # CPR and support/resistance levels (shared level engine)
+        levels = compute_levels(df["High"].to_numpy(), df["Low"].to_numpy(), df["Close"].to_numpy())
+        applied_levels = shift_levels(levels)
 
         # Shift to next day
         for col in ["Pivot", "BC", "TC", "R1", "S1", "R2", "S2", "R3", "S3", "R4", "S4", "R5", "S5"]:
-            df[f"{col}_next"] = df[col].shift(1)
+            df[col] = levels[col]
+            df[f"{col}_next"] = applied_levels[col]
 
         st.subheader("Data with CPR & Support/Resistance Levels")
         st.dataframe(df.tail(10))
@@ -1,7 +1,168 @@
+import os
 import streamlit as st
+import numpy as np
 import pandas as pd
-from datetime import timedelta
-import plotly.graph_objects as go
+from confluence import CONFLUENCE_TOLERANCE_PCT, MIN_TIMEFRAMES, confluence_table
+from data_cache import OhlcCache
+from history_store import HistoryStore
+from ingest import UPLOAD_TYPES, MissingColumnsError, resample_ohlc
+from level_engine import LEVEL_FAMILIES, compute_levels, next_period_levels, tail_levels
+from relationships import cpr_relationships, camarilla_relationships
+from dpz import DPZ_TOLERANCE_PCT, scan_dpz
+from gpz import gpz_frame
+from profiling import StageRecorder, activate, begin_stage, end_stage
+from pyramid import frozen_levels
+from trading_calendar import market_calendar
+from width_stats import NARROW_PERCENTILE, WIDTH_MIN_PERIODS, WIDTH_WINDOW, width_stats
+
+
+# One cache per server process, shared across sessions.
+# Set CPR_CACHE_DIR="" to disable the on-disk Parquet sidecar, and
+# CPR_COMPACT=1 to keep float32 prices and levels for very long histories.
+@st.cache_resource
+def get_ohlc_cache():
+    return OhlcCache(max_entries=16, sidecar_dir=os.environ.get("CPR_CACHE_DIR", ".cpr_cache") or None,
+                     compact=os.environ.get("CPR_COMPACT", "") not in ("", "0"))
+
+
+# Memory-mapped per-symbol histories (CPR_HISTORY_DIR), sliced by date range
+@st.cache_resource
+def get_history_store():
+    return HistoryStore(os.environ.get("CPR_HISTORY_DIR", ".cpr_history"))
+
+
+# ==========================================================
+# --- Chart sections ---
+# Each chart is a fragment inside a lazy expander: moving its slider reruns
+# only that chart, and a closed expander runs nothing. plotly (via charts)
+# is imported the first time a chart is opened.
+@st.fragment
+def cpr_chart_section(df_trading, next_date, next_pivot, next_bc, next_tc, next_period_label):
+    section = st.expander("📈 CPR Levels Chart", key="cpr_chart_open", on_change="rerun")
+    with section:
+        if not section.open:
+            return
+        from charts import level_chart
+
+        selected_days_cpr = st.slider("Select number of periods to display (CPR Levels)", 1, len(df_trading) + 1, min(7, len(df_trading)) + 1)
+        df_plot_historical = df_trading.tail(selected_days_cpr - 1)
+        next_day_row = pd.DataFrame({"Date": [next_date], "Pivot": [next_pivot], "BC": [next_bc], "TC": [next_tc]})
+        df_plot = pd.concat([df_plot_historical, next_day_row], ignore_index=True)
+
+        # One NaN-separated segment trace per level (downsampled for wide windows)
+        fig_cpr = level_chart(df_plot, [("TC", dict(color="red", width=2)),
+                                        ("Pivot", dict(color="black", dash="dot")),
+                                        ("BC", dict(color="green", width=2))])
+        fig_cpr.update_layout(title=f"CPR Levels (Historical + {next_period_label.capitalize()})", height=600,
+                              template="plotly_white", xaxis_title="Date",
+                              yaxis_title="Price", xaxis_rangeslider_visible=False)
+        st.plotly_chart(fig_cpr, use_container_width=True)
+
+
+@st.fragment
+def width_stats_section(levels, close, dates, next_period_label):
+    section = st.expander("📏 CPR & Camarilla Width Statistics", key="width_stats_open", on_change="rerun")
+    with section:
+        if not section.open:
+            return
+        window = st.slider("Rolling window (periods)", 5, max(10, min(len(close), 500)),
+                           min(WIDTH_WINDOW, max(10, min(len(close), 500))), key="width_window")
+        shown = min(20, len(close))
+        # Only the shown rows and the window before them are needed
+        n = min(len(close), shown + window - 1)
+        stats = width_stats(tail_levels(levels, n), close[-n:], window, min(WIDTH_MIN_PERIODS, window),
+                            index=pd.Index(dates[-n:], name="Period")).tail(shown)
+        last = stats.iloc[-1]
+        m1, m2, m3 = st.columns(3)
+        m1.metric(f"CPR width for {next_period_label}", f"{last['CPR_WidthPct']:.3f}%")
+        m2.metric("Percentile rank", "—" if pd.isna(last["CPR_WidthPctRank"]) else f"{last['CPR_WidthPctRank']:.0f}%")
+        m3.metric("Z-score", "—" if pd.isna(last["CPR_WidthZ"]) else f"{last['CPR_WidthZ']:+.2f}")
+        if last["NarrowCPR"]:
+            st.success(f"Narrow CPR: in the bottom {NARROW_PERCENTILE:.0f}% of the last {window} periods "
+                       "-- a trending session is more likely.")
+        st.dataframe(stats.style.format("{:.3f}", subset=[c for c in stats.columns if c != "NarrowCPR"]),
+                     use_container_width=True)
+        st.caption("Widths are % of the period's close: CPR = TC - BC, Camarilla = R3 - S3. Each row's "
+                   "levels apply to the period after it.")
+
+
+@st.fragment
+def camarilla_chart_section(df_cam_history, next_cam_row, market_type):
+    section = st.expander("📈 Camarilla R3/S3 Chart", key="camarilla_chart_open", on_change="rerun")
+    with section:
+        if not section.open:
+            return
+        from charts import level_chart
+
+        selected_days_cam = st.slider(f"Select number of periods to display (Camarilla R3/S3)", 1, len(df_cam_history) + 1, min(7, len(df_cam_history) + 1))
+        df_plot_cam = pd.concat([df_cam_history.tail(selected_days_cam - 1), next_cam_row], ignore_index=True)
+
+        fig_cam = level_chart(df_plot_cam, [("R3", dict(color="red", width=2)),
+                                            ("S3", dict(color="green", width=2))])
+
+        fig_cam.update_layout(title=f"{market_type} Camarilla Levels (R3 & S3 Only)", 
+                              height=600, template="plotly_white",
+                              xaxis_title="Date", yaxis_title="Price",
+                              xaxis_rangeslider_visible=False)
+        st.plotly_chart(fig_cam, use_container_width=True)
+
+
+@st.fragment
+def confluence_section(load_daily):
+    section = st.expander("🔗 Multi-Timeframe Confluence", key="confluence_open", on_change="rerun")
+    with section:
+        if not section.open:
+            return
+        tol_col, tf_col = st.columns([1, 1])
+        with tol_col:
+            tolerance = st.slider("Zone width (% of price)", 0.05, 1.0, CONFLUENCE_TOLERANCE_PCT * 100, 0.05,
+                                  key="confluence_tolerance")
+        with tf_col:
+            min_timeframes = st.radio("Minimum timeframes", [2, 3, 4], index=MIN_TIMEFRAMES - 2, horizontal=True,
+                                      key="confluence_timeframes")
+        # Next-period Daily, Weekly, Monthly and Yearly levels pooled and clustered
+        zones = confluence_table(load_daily(), tolerance / 100, min_timeframes)
+        if zones.empty:
+            st.info("No levels from different timeframes line up within this zone width.")
+            return
+        st.dataframe(zones.style.format({"Low": "{:.2f}", "High": "{:.2f}", "Center": "{:.2f}",
+                                         "DistancePct": "{:+.2f}%"}),
+                     use_container_width=True, hide_index=True)
+        st.caption("Members: D/W/M/Y = Daily/Weekly/Monthly/Yearly level; "
+                   "Score weighs higher timeframes more (D 1, W 2, M 3, Y 4).")
+
+
+@st.fragment
+def export_section(load_daily, source_name, data_freq, market_type, tolerance_pct):
+    section = st.expander("⬇️ Export Level History", key="export_open", on_change="rerun")
+    with section:
+        if not section.open:
+            return
+        from analysis import analyze_ohlc
+        from export import EXPORT_EXTENSIONS, EXPORT_MIME, export_bytes
+        from ingest import FREQUENCIES
+
+        fmt_col, freq_col = st.columns([1, 2])
+        with fmt_col:
+            fmt = st.radio("Format", ["excel", "csv", "parquet"], horizontal=True, key="export_format",
+                           format_func={"excel": "Excel", "csv": "CSV", "parquet": "Parquet"}.get)
+        with freq_col:
+            freqs = st.multiselect("Frequencies", list(FREQUENCIES), default=[data_freq], key="export_freqs")
+        symbol = os.path.splitext(source_name)[0]
+
+        def tables():
+            for freq in freqs:
+                out = analyze_ohlc(load_daily(), freq, market_type, tolerance_pct)
+                if len(out):
+                    yield ({"Symbol": symbol, "Frequency": freq} if len(freqs) > 1 else {"Symbol": symbol}), out
+
+        # The file is only built when the button is clicked
+        st.download_button("Download", data=lambda: export_bytes(tables(), fmt),
+                           file_name=f"{symbol}_levels{EXPORT_EXTENSIONS[fmt]}", mime=EXPORT_MIME[fmt],
+                           disabled=not freqs, key="export_download")
+        st.caption("Every period's CPR, classic and Camarilla levels with the relationship, GPZ and DPZ "
+                   "columns; Excel gets one sheet per frequency.")
+
 
 # --- App title ---
 st.set_page_config(layout="wide")
@@ -47,109 +208,103 @@ elif data_freq == "Yearly":
     current_period_label = "Current Trading Year"
     prev_period_label = "Previous Trading Year"
 
-# --- File uploader ---
-uploaded_file = st.file_uploader("Upload Excel File with Data (Date, High, Low, Close)", type=["xlsx", "xls"])
-
-if uploaded_file is None:
-    st.info("Please upload an Excel file with columns: Date, High, Low, Close.")
+# --- Debug: per-stage timings ---
+# Records wall time and peak memory per stage; CPR_PROFILE_LOG sets the log path.
+debug_timings = st.sidebar.toggle("⏱ Debug: stage timings & memory", key="debug_timings")
+log_timings = debug_timings and st.sidebar.checkbox("Append timings to JSON-lines log", key="log_timings")
+recorder = activate(StageRecorder() if debug_timings else None)
+
+# --- Data source: stored history or file upload ---
+history_store = get_history_store()
+stored_symbols = history_store.symbols()
+stored_symbol = None
+if stored_symbols:
+    source = st.sidebar.selectbox("📚 Stored history", ["Upload a file"] + stored_symbols, key="stored_symbol")
+    stored_symbol = None if source == "Upload a file" else source
+
+uploaded_file = None
+if stored_symbol is None:
+    uploaded_file = st.file_uploader("Upload Excel / CSV / Parquet / Arrow File with Data (Date, High, Low, Close)", type=UPLOAD_TYPES)
+
+if stored_symbol is None and uploaded_file is None:
+    st.info("Please upload an Excel, CSV, Parquet or Arrow file with columns: Date, High, Low, Close.")
 else:
-    try:
-        df = pd.read_excel(uploaded_file)
-    except Exception as e:
-        st.error(f"Could not read uploaded file: {e}")
-        st.stop()
-
-    required_cols = {"Date", "High", "Low", "Close"}
-    if not required_cols.issubset(df.columns):
-        st.error(f"Excel file must contain columns: {required_cols}")
-        st.stop()
+    if stored_symbol is not None:
+        # Only the selected date range is touched: the store hands out views
+        # of its memory-mapped columns
+        begin_stage("load stored history")
+        stored = history_store.info(stored_symbol)
+        date_range = st.sidebar.date_input("Date range", value=(stored["first"].date(), stored["last"].date()),
+                                           min_value=stored["first"].date(), max_value=stored["last"].date(),
+                                           key=f"date_range_{stored_symbol}")
+        range_start = date_range[0] if len(date_range) > 0 else None
+        range_end = date_range[1] if len(date_range) > 1 else None
+        stored_daily = history_store.frame(stored_symbol, range_start, range_end)
+        df = resample_ohlc(stored_daily, data_freq)
+        levels = frozen_levels(df)
+        load_daily = lambda: stored_daily
+        source_name = stored_symbol
+        end_stage()
+    else:
+        # The upload is parsed once into a Daily/Weekly/Monthly/Yearly pyramid with
+        # levels, cached on the file hash, so switching frequency is a lookup
+        begin_stage("load upload")
+        try:
+            df, levels = get_ohlc_cache().load(uploaded_file.getvalue(), data_freq, name=uploaded_file.name)
+        except MissingColumnsError as e:
+            st.error(str(e))
+            st.stop()
+        except Exception as e:
+            st.error(f"Could not read uploaded file: {e}")
+            st.stop()
+        source_name = uploaded_file.name
+        upload_bytes, upload_name = uploaded_file.getvalue(), uploaded_file.name
+        load_daily = lambda: get_ohlc_cache().load(upload_bytes, "Daily", name=upload_name)[0]
+        end_stage()
+
+        # Appends only the rows after the symbol's last stored date
+        store_symbol = os.path.splitext(uploaded_file.name)[0]
+        if st.sidebar.button(f"💾 Add upload to history store as {store_symbol}"):
+            try:
+                daily, _ = get_ohlc_cache().load(uploaded_file.getvalue(), "Daily", name=uploaded_file.name)
+                added = history_store.append(store_symbol, daily, skip_existing=True)
+                st.sidebar.success(f"Added {added} new rows to {store_symbol}.")
+            except Exception as e:
+                st.sidebar.error(f"Could not store {store_symbol}: {e}")
 
-    df = df.sort_values("Date").reset_index(drop=True)
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-    df = df.dropna(subset=["Date"])
     if len(df) < 2:
         st.warning("Need at least 2 trading days in the file.")
         st.stop()
 
     # ==========================================================
-    # --- Resample for Weekly / Monthly ---
-    if data_freq == "Weekly":
-        # Resample to Friday for week ending OHLC
-        df = (df.set_index("Date")
-                .resample('W-FRI')
-                .agg({'High':'max', 'Low':'min', 'Close':'last'})
-                .reset_index())
-        df["NextDate"] = df["Date"] + pd.offsets.Week(weekday=0)  # Next Monday
-    elif data_freq == "Monthly":
-        # Resample to month end for monthly OHLC
-        df = (df.set_index("Date")
-                .resample('M')
-                .agg({'High':'max', 'Low':'min', 'Close':'last'})
-                .reset_index())
-        df["NextDate"] = df["Date"] + pd.offsets.MonthBegin(1)   # First day next month
-
-    elif data_freq == "Yearly":
-        df = (df.set_index("Date")
-              .resample('Y')
-              .agg({'High':'max', 'Low':'min', 'Close':'last'})
-              .reset_index())
-        df["NextDate"] = df["Date"] + pd.offsets.YearBegin(1) #First day of next year
-    
-    else:
-        # Daily calculation — untouched
-        df["NextDate"] = df["Date"] + timedelta(days=1)
-
-    # ==========================================================
-    # --- CPR CALCULATION ---
-    df["Pivot_T_to_T1"] = (df["High"] + df["Low"] + df["Close"]) / 3
-    df["BC_T_to_T1"] = (df["High"] + df["Low"]) / 2
-    df["TC_T_to_T1"] = df["Pivot_T_to_T1"] + (df["Pivot_T_to_T1"] - df["BC_T_to_T1"])
-
-    # Fix swapped TC/BC values
-    mask_swap = df["BC_T_to_T1"] > df["TC_T_to_T1"]
-    df.loc[mask_swap, ["TC_T_to_T1", "BC_T_to_T1"]] = df.loc[mask_swap, ["BC_T_to_T1", "TC_T_to_T1"]].values
-
-    swap_note = ""
-
-    df["Pivot"] = df["Pivot_T_to_T1"].shift(1)
-    df["BC"] = df["BC_T_to_T1"].shift(1)
-    df["TC"] = df["TC_T_to_T1"].shift(1)
+    # --- LEVEL ENGINE (CPR, classic R/S, Camarilla for every row; cached with the frame) ---
+    # Engine row i holds the levels derived from period i, i.e. the ones that
+    # apply to period i + 1. Nothing is copied into df: the history tables
+    # below are views of the cached arrays, the relationships compare the
+    # next period with the last complete row, and GPZ and DPZ only look at
+    # the last two rows.
+    begin_stage("cpr levels + table")
+    nxt = next_period_levels(levels)
+    recent = tail_levels(levels, 2)
+    dates = df["Date"].to_numpy()
 
     # --- Next Day CPR Calculation ---
     last_day_data = df.iloc[-1]
-    next_pivot = (last_day_data["High"] + last_day_data["Low"] + last_day_data["Close"]) / 3
-    next_bc = (last_day_data["High"] + last_day_data["Low"]) / 2
-    next_tc = next_pivot + (next_pivot - next_bc)
+    next_pivot, next_bc, next_tc = nxt["Pivot"], nxt["BC"], nxt["TC"]
 
-    if next_bc > next_tc:
-        next_tc, next_bc = next_bc, next_tc
+    if nxt["Swapped"]:
         swap_note = f"<br><span style='color:red;'><i>⚠️ Note:</i> BC and TC were swapped due to BC > TC condition."
     else:
         swap_note = f"<br><i> </i> "
 
     curr_date = last_day_data["Date"]
-    next_date = last_day_data["NextDate"]
-    if market_type == "Stock Market" and data_freq == "Daily":
-        while next_date.weekday() >= 5:
-            next_date += timedelta(days=1)
+    # First session of the next period on the exchange calendar (weekends and holidays skipped)
+    next_date = market_calendar(market_type).next_session(curr_date, data_freq)
 
     # --- CPR R/S Levels ---
-    high = last_day_data["High"]
-    low = last_day_data["Low"]
-    pivot = next_pivot
-    bc = next_bc
-    tc = next_tc
-
-    r1 = (2 * pivot) - low
-    s1 = (2 * pivot) - high
-    r2 = pivot + (high - low)
-    s2 = pivot - (high - low)
-    r3 = r1 + (high - low)
-    s3 = s1 - (high - low)
-    r4 = r3 + (r2 - r1)
-    s4 = s3 - (s1 - s2)
-    r5 = r4 + (r2 - r1)
-    s5 = s4 - (s1 - s2)
+    pivot, bc, tc = next_pivot, next_bc, next_tc
+    r1, r2, r3, r4, r5 = nxt["R1"], nxt["R2"], nxt["R3"], nxt["R4"], nxt["R5"]
+    s1, s2, s3, s4, s5 = nxt["S1"], nxt["S2"], nxt["S3"], nxt["S4"], nxt["S5"]
 
     # --- CPR Table ---
     result_df = pd.DataFrame({
@@ -172,46 +327,52 @@ else:
     st.subheader(f"📊 {market_type} CPR Levels for {next_period_label} ({next_date.strftime('%A, %d-%b-%Y')})")
     st.dataframe(styled_df, use_container_width=True)
 
+    # --- Other pivot families (next period only, from the last row) ---
+    with st.expander("📐 Fibonacci, Woodie & DeMark Pivots"):
+        extra_families = ("fibonacci", "woodie", "demark")
+        last = df.iloc[-1:]
+        extra = compute_levels(last["High"].to_numpy(), last["Low"].to_numpy(), last["Close"].to_numpy(),
+                               families=extra_families,
+                               open_=last["Open"].to_numpy() if "Open" in df.columns else None)
+        family_rows = [{"Family": name.capitalize(), "Level": col, "Value": float(extra[col][0])}
+                       for name in extra_families for col in LEVEL_FAMILIES[name].columns]
+        st.dataframe(pd.DataFrame(family_rows).style.format({"Value": "{:.2f}"}),
+                     use_container_width=True, hide_index=True)
+
     # ==========================================================
     # --- Two-day pivot relationship ---
-    df_cpr_ready = df.dropna(subset=["Pivot", "BC", "TC"]).copy()
+    end_stage()
+    begin_stage("cpr relationship")
+    # Engine rows whose CPR is complete; row j's levels applied to period j + 1
+    cpr_ok = ~(np.isnan(levels["Pivot"][:-1]) | np.isnan(levels["BC"][:-1]) | np.isnan(levels["TC"][:-1]))
     
-    if len(df_cpr_ready) < 1:
+    if not cpr_ok.any():
          st.warning("Not enough data to compute T-day levels for relationship analysis.")
          sentiment, relationship, condition_text = "N/A", "N/A", "N/A"
          prev_pivot, prev_bc, prev_tc = 0.0, 0.0, 0.0
          prev_date = curr_date
     else:
-        prev_row_cpr = df_cpr_ready.iloc[-1]
-        prev_pivot, prev_bc, prev_tc = float(prev_row_cpr["Pivot"]), float(prev_row_cpr["BC"]), float(prev_row_cpr["TC"])
-        prev_date = prev_row_cpr["Date"]
+        j = len(cpr_ok) - 1 - int(np.argmax(cpr_ok[::-1]))
+        prev_pivot, prev_bc, prev_tc = float(levels["Pivot"][j]), float(levels["BC"][j]), float(levels["TC"][j])
+        prev_date = df["Date"].iloc[j + 1]
         curr_pivot, curr_bc, curr_tc = next_pivot, next_bc, next_tc 
-        relationship, sentiment, condition_text = None, None, ""
-
-        if curr_bc > prev_tc:
-            relationship, sentiment = "Higher Value Relationship", "Bullish"
-            condition_text = f"Next Day BC ({curr_bc:.2f}) > Current Day TC ({prev_tc:.2f})"
-        elif curr_tc > prev_tc and curr_bc < prev_tc and curr_bc > prev_bc:
-            relationship, sentiment = "Overlapping Higher Value Relationship", "Moderately Bullish"
-            condition_text = f"Next Day TC ({curr_tc:.2f}) > Current Day TC ({prev_tc:.2f}) and BC between ranges"
-        elif curr_tc < prev_bc:
-            relationship, sentiment = "Lower Value Relationship", "Bearish"
-            condition_text = f"Next Day TC ({curr_tc:.2f}) < Current Day BC ({prev_bc:.2f})"
-        elif curr_tc > prev_bc and curr_tc < prev_tc and curr_bc < prev_bc:
-            relationship, sentiment = "Overlapping Lower Value Relationship", "Moderately Bearish"
-            condition_text = f"Next Day BC ({curr_bc:.2f}) < Current Day BC ({prev_bc:.2f}) and TC ({curr_tc:.2f}) > Current Day BC ({prev_bc:.2f})"
-        elif abs(curr_tc - prev_tc) < 0.05 and abs(curr_bc - prev_bc) < 0.05:
-            relationship, sentiment = "Unchanged Value Relationship", "Sideways/Breakout"
-            condition_text = f"Next and Current {data_freq.lower()} CPRs nearly equal"
-        elif curr_tc > prev_tc and curr_bc < prev_bc:
-            relationship, sentiment = "Outside Value Relationship", "Sideways"
-            condition_text = f"Next {data_freq.lower()} range fully engulfs Current {data_freq.lower()} range"
-        elif curr_tc < prev_tc and curr_bc > prev_bc:
-            relationship, sentiment = "Inside Value Relationship", "Breakout"
-            condition_text = f"Next {data_freq.lower()} range inside Current {data_freq.lower()} range"
+        # Classify the pair shown here: the last complete row against the next period
+        cpr_pair = cpr_relationships([prev_tc, curr_tc], [prev_bc, curr_bc]).iloc[-1]
+        if cpr_pair.isna().any():
+            relationship, sentiment = "N/A", "N/A"
         else:
-            relationship, sentiment = "No Clear Relationship", "Neutral"
-            condition_text = "N/A"
+            relationship, sentiment = cpr_pair["Relationship"], cpr_pair["Sentiment"]
+
+        condition_texts = {
+            "Higher Value Relationship": f"Next Day BC ({curr_bc:.2f}) > Current Day TC ({prev_tc:.2f})",
+            "Overlapping Higher Value Relationship": f"Next Day TC ({curr_tc:.2f}) > Current Day TC ({prev_tc:.2f}) and BC between ranges",
+            "Lower Value Relationship": f"Next Day TC ({curr_tc:.2f}) < Current Day BC ({prev_bc:.2f})",
+            "Overlapping Lower Value Relationship": f"Next Day BC ({curr_bc:.2f}) < Current Day BC ({prev_bc:.2f}) and TC ({curr_tc:.2f}) > Current Day BC ({prev_bc:.2f})",
+            "Unchanged Value Relationship": f"Next and Current {data_freq.lower()} CPRs nearly equal",
+            "Outside Value Relationship": f"Next {data_freq.lower()} range fully engulfs Current {data_freq.lower()} range",
+            "Inside Value Relationship": f"Next {data_freq.lower()} range inside Current {data_freq.lower()} range",
+        }
+        condition_text = condition_texts.get(relationship, "N/A")
 
     next_tc_pivot_diff = next_tc - next_pivot
     next_pivot_bc_diff = next_pivot - next_bc
@@ -270,59 +431,22 @@ else:
 
     # ==========================================================
     # --- CPR CHART ---
-    df_trading = df.dropna(subset=["Pivot", "BC", "TC"]).copy()
-    selected_days_cpr = st.slider("Select number of periods to display (CPR Levels)", 1, len(df_trading) + 1, min(7, len(df_trading)) + 1)
-    df_plot_historical = df_trading.tail(selected_days_cpr - 1).copy()
-    next_day_row = pd.DataFrame({"Date": [next_date], "Pivot": [next_pivot], "BC": [next_bc], "TC": [next_tc]})
-    df_plot = pd.concat([df_plot_historical[["Date", "Pivot", "BC", "TC"]], next_day_row], ignore_index=True)
-
-    fig_cpr = go.Figure()
-    for _, row in df_plot.iterrows():
-        date = row["Date"]
-        x0, x1 = date - pd.Timedelta(hours=8), date + pd.Timedelta(hours=8)
-        fig_cpr.add_trace(go.Scatter(x=[x0, x1], y=[row["TC"], row["TC"]],
-                                     mode="lines", line=dict(color="red", width=2), name="TC"))
-        fig_cpr.add_trace(go.Scatter(x=[x0, x1], y=[row["Pivot"], row["Pivot"]],
-                                     mode="lines", line=dict(color="black", dash="dot"), name="Pivot"))
-        fig_cpr.add_trace(go.Scatter(x=[x0, x1], y=[row["BC"], row["BC"]],
-                                     mode="lines", line=dict(color="green", width=2), name="BC"))
-    fig_cpr.update_layout(title=f"CPR Levels (Historical + {next_period_label.capitalize()})", height=600,
-                          template="plotly_white", xaxis_title="Date",
-                          yaxis_title="Price", xaxis_rangeslider_visible=False)
-    st.plotly_chart(fig_cpr, use_container_width=True)
+    end_stage()
+    begin_stage("cpr chart")
+    df_trading = pd.DataFrame({"Date": dates[1:], "Pivot": levels["Pivot"][:-1], "BC": levels["BC"][:-1],
+                               "TC": levels["TC"][:-1]}, copy=False)
+    if not cpr_ok.all():
+        df_trading = df_trading[cpr_ok]
+    cpr_chart_section(df_trading, next_date, next_pivot, next_bc, next_tc, next_period_label)
+    width_stats_section(levels, df["Close"].to_numpy(), dates, next_period_label)
 
     # ==========================================================
     # --- CAMARILLA CALCULATION ---
-    df["Range"] = df["High"] - df["Low"]
-    df["R4"] = df["Close"] + df["Range"] * 1.1 / 2
-    df["R3"] = df["Close"] + df["Range"] * 1.1 / 4
-    df["R2"] = df["Close"] + df["Range"] * 1.1 / 6
-    df["R1"] = df["Close"] + df["Range"] * 1.1 / 12
-    df["S1"] = df["Close"] - df["Range"] * 1.1 / 12
-    df["S2"] = df["Close"] - df["Range"] * 1.1 / 6
-    df["S3"] = df["Close"] - df["Range"] * 1.1 / 4
-    df["S4"] = df["Close"] - df["Range"] * 1.1 / 2
-
-    for col in ["R1", "R2", "R3", "R4", "S1", "S2", "S3", "S4"]:
-        df[col] = df[col].shift(1)
-
-    rng = last_day_data["High"] - last_day_data["Low"]
-    next_R4 = last_day_data["Close"] + rng * 1.1 / 2
-    next_R3 = last_day_data["Close"] + rng * 1.1 / 4
-    next_R2 = last_day_data["Close"] + rng * 1.1 / 6
-    next_R1 = last_day_data["Close"] + rng * 1.1 / 12
-    next_S1 = last_day_data["Close"] - rng * 1.1 / 12
-    next_S2 = last_day_data["Close"] - rng * 1.1 / 6
-    next_S3 = last_day_data["Close"] - rng * 1.1 / 4
-    next_S4 = last_day_data["Close"] - rng * 1.1 / 2
-
-    next_row = pd.DataFrame({
-        "Date": [next_date], "Range": [rng],
-        "R4": [next_R4], "R3": [next_R3], "R2": [next_R2], "R1": [next_R1],
-        "S1": [next_S1], "S2": [next_S2], "S3": [next_S3], "S4": [next_S4]
-    })
-
-    df_camarilla = pd.concat([df[["Date", "Range", "R4", "R3", "R2", "R1", "S1", "S2", "S3", "S4"]], next_row], ignore_index=True)
+    end_stage()
+    begin_stage("camarilla levels + table")
+    rng = nxt["Range"]
+    next_R4, next_R3, next_R2, next_R1 = nxt["Cam_R4"], nxt["Cam_R3"], nxt["Cam_R2"], nxt["Cam_R1"]
+    next_S1, next_S2, next_S3, next_S4 = nxt["Cam_S1"], nxt["Cam_S2"], nxt["Cam_S3"], nxt["Cam_S4"]
 
     # --- Camarilla Table ---
     camarilla_table = pd.DataFrame({
@@ -346,32 +470,21 @@ else:
     st.dataframe(styled_camarilla, use_container_width=True)
 
     # --- CE TWO-DAY RELATIONSHIP (R3 & S3) ---
-    df_camarilla_ready = df_camarilla.dropna(subset=["R3", "S3"]).copy()
-    if len(df_camarilla_ready) < 2:
+    end_stage()
+    begin_stage("ce relationship")
+    cam_ok = ~(np.isnan(levels["Cam_R3"][:-1]) | np.isnan(levels["Cam_S3"][:-1]))
+    if not cam_ok.any():
         st.warning("Not enough data for CE two-period relationship.")
     else:
-        prev_row = df_camarilla_ready.iloc[-2]
-        curr_row = df_camarilla_ready.iloc[-1]
-
-        prev_R3, prev_S3 = prev_row["R3"], prev_row["S3"]
-        curr_R3, curr_S3 = curr_row["R3"], curr_row["S3"]
-
-        if curr_S3 > prev_R3:
-            relationship, sentiment = f"CE Higher Value {data_freq} Relationship", "Bullish"
-        elif curr_R3 > prev_R3 and curr_S3 < prev_R3 and curr_S3 > prev_S3:
-            relationship, sentiment = f"CE Overlapping Higher Value {data_freq} Relationship", "Moderately Bullish"
-        elif curr_R3 < prev_S3:
-            relationship, sentiment = f"CE Lower Value {data_freq} Relationship", "Bearish"
-        elif curr_R3 < prev_R3 and curr_S3 < prev_S3 and curr_R3 > prev_S3:
-            relationship, sentiment = f"CE Overlapping Lower Value {data_freq} Relationship", "Moderately Bearish"
-        elif abs(curr_R3 - prev_R3) < 0.05 and abs(curr_S3 - prev_S3) < 0.05:
-            relationship, sentiment = f"CE Unchanged Value {data_freq} Relationship", "Sideways/Breakout"
-        elif curr_R3 > prev_R3 and curr_S3 < prev_S3:
-            relationship, sentiment = f"CE Outside Value {data_freq} Relationship", "Sideways"
-        elif curr_R3 < prev_R3 and curr_S3 > prev_S3:
-            relationship, sentiment = f"CE Inside Value {data_freq} Relationship", "Breakout"
-        else :
-            relationship, sentiment = "Not satisfying any of the conditions", "Unknown"
+        k = len(cam_ok) - 1 - int(np.argmax(cam_ok[::-1]))
+        prev_R3, prev_S3 = float(levels["Cam_R3"][k]), float(levels["Cam_S3"][k])
+        curr_R3, curr_S3 = next_R3, next_S3
+
+        ce_pair = camarilla_relationships([prev_R3, curr_R3], [prev_S3, curr_S3], data_freq).iloc[-1]
+        if ce_pair.isna().any():
+            relationship, sentiment = "N/A", "N/A"
+        else:
+            relationship, sentiment = ce_pair["Relationship"], ce_pair["Sentiment"]
 
         curr_cm_diff = prev_R3 - prev_S3
         next_cm_diff = curr_R3 - curr_S3
@@ -419,30 +532,17 @@ else:
         """, unsafe_allow_html=True)
 
     # --- Camarilla Chart (ONLY R3 and S3) ---
-    selected_days_cam = st.slider(f"Select number of periods to display (Camarilla R3/S3)", 1, len(df_camarilla), min(7, len(df_camarilla)))
-    df_plot_cam = df_camarilla.tail(selected_days_cam)
-
-    fig_cam = go.Figure()
-    for _, row in df_plot_cam.iterrows():
-        date = row["Date"]
-        x0, x1 = date - pd.Timedelta(hours=8), date + pd.Timedelta(hours=8)
-        fig_cam.add_trace(go.Scatter(
-            x=[x0, x1], y=[row["R3"], row["R3"]],
-            mode="lines", line=dict(color="red", width=2), name="R3"
-        ))
-        fig_cam.add_trace(go.Scatter(
-            x=[x0, x1], y=[row["S3"], row["S3"]],
-            mode="lines", line=dict(color="green", width=2), name="S3"
-        ))
-
-    fig_cam.update_layout(title=f"{market_type} Camarilla Levels (R3 & S3 Only)", 
-                          height=600, template="plotly_white",
-                          xaxis_title="Date", yaxis_title="Price",
-                          xaxis_rangeslider_visible=False)
-    st.plotly_chart(fig_cam, use_container_width=True)
+    end_stage()
+    begin_stage("camarilla chart")
+    df_cam_history = pd.DataFrame({"Date": dates[1:], "R3": levels["Cam_R3"][:-1], "S3": levels["Cam_S3"][:-1]},
+                                  copy=False)
+    next_cam_row = pd.DataFrame({"Date": [next_date], "R3": [next_R3], "S3": [next_S3]})
+    camarilla_chart_section(df_cam_history, next_cam_row, market_type)
 
     # ==========================================================
     # === GOLDEN PIVOT HOT ZONE (with conditions and comments) ===
+    end_stage()
+    begin_stage("gpz")
     golden_pivot_map = {
         "Bullish": "#16a34a",
         "Bearish": "#dc2626",
@@ -450,9 +550,9 @@ else:
     }
     
     # Previous period's CPR
-    prev_bc = float(df.iloc[-2]["BC_T_to_T1"])
-    prev_tc = float(df.iloc[-2]["TC_T_to_T1"])
-    prev_close = float(df.iloc[-2]["Close"])
+    prev_bc = float(recent["BC"][-2])
+    prev_tc = float(recent["TC"][-2])
+    prev_close = float(df["Close"].iloc[-2])
     
     # Handle Open price (if not present, use Close as fallback)
     curr_open = last_day_data["Open"] if "Open" in last_day_data else last_day_data["Close"]
@@ -460,16 +560,16 @@ else:
     
     bearish_comment = ""
     bullish_comment = ""
+
+    gpz_history = gpz_frame(recent, df["Open"].to_numpy()[-2:] if "Open" in df else None, df["Close"].to_numpy()[-2:])
+    gpz_last = gpz_history.iloc[-1]
+    golden_pivot_sentiment = gpz_last["GPZ"]
+    first_fact, second_fact, third_fact = gpz_last["GPZ_FirstFact"], gpz_last["GPZ_SecondFact"], gpz_last["GPZ_ThirdFact"]
     
-    if next_tc >= next_R3 >= next_bc:
-        golden_pivot_sentiment = "Bearish (GPZ)"
+    if golden_pivot_sentiment == "Bearish (GPZ)":
         golden_pivot_cond = "TC ≥ R3 ≥ BC"
         golden_pivot_comment = f"(TC ≥ R3 ≥ BC)<br>TC = {next_tc:.2f}, R3 = {next_R3:.2f}, BC = {next_bc:.2f}"
     
-        first_fact = curr_open < prev_bc or curr_open < prev_tc
-        second_fact = curr_open < prev_bc and curr_close < prev_tc
-        third_fact = curr_bc > prev_close
-    
         bearish_comment = f"""
         <b>However, there are a couple of factors that must be in place in order for a "Sell the rip" opportunity to exist.<br>
         <b><u>First</u></b>, price should open the day below the central pivot range.<br>
@@ -479,16 +579,10 @@ else:
         </b>
         """
     
-    elif next_bc <= next_S3 <= next_tc:
-        golden_pivot_sentiment = "Bullish (GPZ)"
+    elif golden_pivot_sentiment == "Bullish (GPZ)":
         golden_pivot_cond = "BC ≤ S3 ≤ TC"
         golden_pivot_comment = f"(BC ≤ S3 ≤ TC)<br>BC = {next_bc:.2f}, S3 = {next_S3:.2f}, TC = {next_tc:.2f}"
     
-        first_fact = curr_open > prev_bc or curr_open > prev_tc
-        # second_fact = prev_close > prev_bc and prev_close > prev_tc
-        second_fact = curr_open > prev_bc and curr_open > prev_tc #Updated this logic on Feb 3rd to see the correct
-        third_fact = curr_tc < prev_close
-    
         bullish_comment = f"""
         <b>However, there are a couple of factors that must be in place in order for a "buy the dip" opportunity to exist.<br>
         <b><u>First</u></b>, price should open the day above the central pivot range.<br>
@@ -499,7 +593,6 @@ else:
         """
     
     else:
-        golden_pivot_sentiment = "Neutral"
         golden_pivot_cond = "No condition"
         golden_pivot_comment = f"No condition for golden pivot satisfied.<br>TC = {next_tc:.2f}, R3 = {next_R3:.2f}, BC = {next_bc:.2f}, S3 = {next_S3:.2f}"
     
@@ -530,67 +623,24 @@ else:
 
     # ==========================================================
     # === DOUBLE PIVOT HOT ZONE (DPZ) ===
+    end_stage()
+    begin_stage("dpz")
     # Using CPR (classic pivot) & Camarilla levels already computed above
 
     # tolerance as % of price (can tweak, e.g. 0.001 = 0.1%)
-    tolerance_pct = 0.001
-
-    # helper to check if two levels are within tolerance
-    def is_within_tolerance(a, b, ref_price):
-        if ref_price == 0:
-            return False
-        return abs(a - b) <= ref_price * tolerance_pct
-
-    current_price_ref = last_day_data["Close"]
-
-    dpz_messages = []
+    tolerance_pct = DPZ_TOLERANCE_PCT
+
+    # Only the last engine row (the next session's levels) is scanned
+    next_hits = scan_dpz(tail_levels(levels, 1), df["Close"].to_numpy()[-1:], tolerance_pct)
+    dpz_messages = [
+        f"Classic {hit.Classic} ({hit.ClassicValue:.2f}) and Camarilla {hit.Camarilla} ({hit.CamarillaValue:.2f}) are overlapping → {hit.Strength}"
+        for hit in next_hits.itertuples()
+    ]
     dpz_type = "None"
 
-    # --- Resistance DPZ: Classic vs Camarilla ---
-    # 1) Classic R1 with Camarilla R3
-    if is_within_tolerance(r1, next_R3, current_price_ref):
-        dpz_messages.append(f"Classic R1 ({r1:.2f}) and Camarilla R3 ({next_R3:.2f}) are overlapping → Resistance DPZ")
-
-    # 2) Classic R1 with Camarilla R4
-    if is_within_tolerance(r1, next_R4, current_price_ref):
-        dpz_messages.append(f"Classic R1 ({r1:.2f}) and Camarilla R4 ({next_R4:.2f}) are overlapping → Strong Resistance DPZ")
-
-    # 3) Classic R2 with Camarilla R3
-    if is_within_tolerance(r2, next_R3, current_price_ref):
-        dpz_messages.append(f"Classic R2 ({r2:.2f}) and Camarilla R3 ({next_R3:.2f}) are overlapping → Resistance DPZ")
-
-    # 4) Classic R2 with Camarilla R4
-    if is_within_tolerance(r2, next_R4, current_price_ref):
-        dpz_messages.append(f"Classic R2 ({r2:.2f}) and Camarilla R4 ({next_R4:.2f}) are overlapping → Very Strong Resistance DPZ")
-
-    # 5) Classic Pivot with Camarilla R3/R4
-    if is_within_tolerance(pivot, next_R3, current_price_ref):
-        dpz_messages.append(f"Classic Pivot ({pivot:.2f}) and Camarilla R3 ({next_R3:.2f}) are overlapping → Resistance DPZ")
-    if is_within_tolerance(pivot, next_R4, current_price_ref):
-        dpz_messages.append(f"Classic Pivot ({pivot:.2f}) and Camarilla R4 ({next_R4:.2f}) are overlapping → Very Strong Resistance DPZ")
-
-    # --- Support DPZ: Classic vs Camarilla ---
-    # 6) Classic S1 with Camarilla S3/S4
-    if is_within_tolerance(s1, next_S3, current_price_ref):
-        dpz_messages.append(f"Classic S1 ({s1:.2f}) and Camarilla S3 ({next_S3:.2f}) are overlapping → Support DPZ")
-    if is_within_tolerance(s1, next_S4, current_price_ref):
-        dpz_messages.append(f"Classic S1 ({s1:.2f}) and Camarilla S4 ({next_S4:.2f}) are overlapping → Strong Support DPZ")
-
-    # 7) Classic S2 with Camarilla S3/S4
-    if is_within_tolerance(s2, next_S3, current_price_ref):
-        dpz_messages.append(f"Classic S2 ({s2:.2f}) and Camarilla S3 ({next_S3:.2f}) are overlapping → Support DPZ")
-    if is_within_tolerance(s2, next_S4, current_price_ref):
-        dpz_messages.append(f"Classic S2 ({s2:.2f}) and Camarilla S4 ({next_S4:.2f}) are overlapping → Very Strong Support DPZ")
-
-    # 8) Classic Pivot with Camarilla S3/S4
-    if is_within_tolerance(pivot, next_S3, current_price_ref):
-        dpz_messages.append(f"Classic Pivot ({pivot:.2f}) and Camarilla S3 ({next_S3:.2f}) are overlapping → Support DPZ")
-    if is_within_tolerance(pivot, next_S4, current_price_ref):
-        dpz_messages.append(f"Classic Pivot ({pivot:.2f}) and Camarilla S4 ({next_S4:.2f}) are overlapping → Strong Support DPZ")
-
     if dpz_messages:
-        has_res = any("Resistance" in m for m in dpz_messages)
-        has_sup = any("Support" in m for m in dpz_messages)
+        has_res = (next_hits["Side"] == "Resistance").any()
+        has_sup = (next_hits["Side"] == "Support").any()
         if has_res and has_sup:
             dpz_type = "Mixed (Support & Resistance DPZ)"
             dpz_color = "#9333ea"
@@ -625,4 +675,28 @@ else:
                 🔍 No Double Pivot Hot Zone (DPZ) detected for the next session within the current tolerance ({tolerance_pct*100:.2f}% of price).
             </div>
         """, unsafe_allow_html=True)
+    end_stage()
+
+    # ==========================================================
+    # --- MULTI-TIMEFRAME CONFLUENCE ---
+    begin_stage("confluence")
+    confluence_section(load_daily)
+    end_stage()
+
+    # ==========================================================
+    # --- EXPORT ---
+    export_section(load_daily, source_name, data_freq, market_type, tolerance_pct)
+
+    # ==========================================================
+    # --- Debug: stage timings panel ---
+    if recorder is not None:
+        recorder.stop()
+        with st.expander("⏱ Stage timings", expanded=True):
+            st.dataframe(recorder.frame().style.format({"ms": "{:.1f}", "Peak MB": "{:.2f}", "Net MB": "{:.2f}"}),
+                         use_container_width=True)
+        if log_timings:
+            log_path = os.environ.get("CPR_PROFILE_LOG", "cpr_profile.jsonl")
+            recorder.write_jsonl(log_path, file=source_name, frequency=data_freq,
+                                 market=market_type, periods=len(df))
+            st.caption(f"Appended {len(recorder.records)} stage records to {log_path}")
 
@@ -0,0 +1,258 @@
+"""Streaming intraday aggregator.
+
+Consumes minute bars from a tailed local file or a local TCP socket (one bar
+per line, CSV or a JSON object with Date/[Open]/High/Low/Close keys; CSV
+fields follow the source's header line, or without one are
+``Date,Open,High,Low,Close`` or ``Date,High,Low,Close``), keeps the running OHLC of the current day, week, month and year in
+an incremental.SymbolState, and publishes the next-period CPR, Camarilla,
+relationship and GPZ levels -- with the rolling CPR/Camarilla width
+statistics of the closing period -- as soon as each period closes. Levels come from
+the shared level engine run over just the last two periods, so publishing
+costs the same at any point in the stream.
+
+A period closes when the first bar of a later period arrives or, with a
+``session_close`` time, at the first bar at/after that time: then the day
+closes, along with any week/month/year that ends on that day. A late bar
+after the session close still belongs to that day and republishes it.
+
+    python streaming.py --symbol NIFTY --file minutes.csv --session-close 15:30
+    python streaming.py --symbol BTC --market Bitcoin --port 9009
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import time as dtime
+
+import numpy as np
+import pandas as pd
+
+from gpz import gpz_frame
+from incremental import FREQUENCIES, StateStore, SymbolState, period_key
+from level_engine import CAMARILLA_COLUMNS, CLASSIC_COLUMNS, compute_levels, next_period_levels
+from relationships import cpr_relationships
+from trading_calendar import market_calendar
+
+BAR_FIELDS = ("Date", "Open", "High", "Low", "Close")
+REQUIRED_FIELDS = ("Date", "High", "Low", "Close")
+
+
+def csv_header(line):
+    """Field names of a CSV header line (one naming a Date column), else None."""
+    line = line.strip()
+    if line.startswith("{"):
+        return None
+    fields = tuple(v.strip() for v in line.split(","))
+    return fields if "Date" in fields else None
+
+
+def parse_bar(line, header=None):
+    """Bar dict from a CSV or JSON line; None for blank or header lines.
+
+    CSV values are mapped to fields by ``header`` (the source's header line
+    fields) or, without one, by position: four values are REQUIRED_FIELDS,
+    more are BAR_FIELDS (extra trailing values are ignored). Open is
+    optional (None when missing or empty); missing or bad values raise
+    ValueError, TypeError or KeyError.
+    """
+    line = line.strip()
+    if not line or csv_header(line):
+        return None
+    if line.startswith("{"):
+        raw = json.loads(line)
+    else:
+        values = [v.strip() for v in line.split(",")]
+        fields = header or (REQUIRED_FIELDS if len(values) == len(REQUIRED_FIELDS) else BAR_FIELDS)
+        raw = dict(zip(fields, values))
+    bar = {"Date": pd.Timestamp(raw["Date"])}
+    bar["Open"] = None if raw.get("Open") in (None, "") else float(raw["Open"])
+    for field in REQUIRED_FIELDS[1:]:
+        bar[field] = float(raw[field])
+    return bar
+
+
+class LineParser:
+    """parse_bar for the lines of one source: remembers the source's CSV
+    header and logs and skips malformed lines instead of stopping it."""
+
+    def __init__(self):
+        self.header = None
+
+    def __call__(self, line):
+        header = csv_header(line)
+        if header:
+            self.header = header
+            return None
+        try:
+            return parse_bar(line, self.header)
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"Skipping line {line.strip()[:80]!r}: {e!r}", file=sys.stderr)
+            return None
+
+
+def period_levels(symbol, periods, data_freq, market_type="Stock Market", widths=None):
+    """Next-period CPR / Camarilla / relationship / GPZ for the last stored period.
+
+    ``widths`` (a width_stats.WidthTracker over the earlier periods) adds
+    the last period's width statistics.
+    """
+    high = np.array([p["High"] for p in periods])
+    low = np.array([p["Low"] for p in periods])
+    close = np.array([p["Close"] for p in periods])
+    opens = [p["Open"] for p in periods]
+    open_ = None if any(o is None for o in opens) else np.array(opens)
+
+    levels = compute_levels(high, low, close)
+    nxt = next_period_levels(levels)
+    gpz = gpz_frame(levels, open_, close).iloc[-1]
+    relationship = cpr_relationships(levels["TC"], levels["BC"]).iloc[-1]
+
+    period_date = periods[-1]["Date"]
+    next_date = market_calendar(market_type).next_session(period_date, data_freq)
+
+    out = {"Symbol": symbol, "Frequency": data_freq,
+           "Period": period_date.isoformat(), "NextDate": next_date.isoformat()}
+    for name in ("Pivot", "BC", "TC") + CLASSIC_COLUMNS + CAMARILLA_COLUMNS:
+        out[name] = nxt[name]
+    out["CPR_Relationship"] = None if pd.isna(relationship["Relationship"]) else relationship["Relationship"]
+    out["CPR_Sentiment"] = None if pd.isna(relationship["Sentiment"]) else relationship["Sentiment"]
+    out["GPZ"] = gpz["GPZ"]
+    out["GPZ_FirstFact"] = bool(gpz["GPZ_FirstFact"])
+    out["GPZ_SecondFact"] = bool(gpz["GPZ_SecondFact"])
+    if widths is not None:
+        out.update(widths.stats(high[-1], low[-1], close[-1]))
+    return out
+
+
+class StreamingAggregator:
+    """Folds bars into a SymbolState and returns the levels of closed periods."""
+
+    def __init__(self, symbol, market_type="Stock Market", session_close=None, state=None):
+        self.symbol = symbol
+        self.market_type = market_type
+        self.session_close = session_close
+        self.state = state or SymbolState(symbol)
+        self._published = {}   # freq -> last period published, as (Date, Open, High, Low, Close)
+
+    def _publish(self, freqs):
+        published = []
+        for freq in freqs:
+            # Keyed on the period's values, so a period changed by a late bar is published again
+            key = tuple(self.state.periods[freq][-1][field] for field in BAR_FIELDS)
+            if self._published.get(freq) != key:
+                self._published[freq] = key
+                published.append(period_levels(self.symbol, self.state.periods[freq], freq, self.market_type,
+                                               self.state.widths[freq]))
+        return published
+
+    def on_bar(self, bar):
+        ts = bar["Date"]
+        if self.state.last_date is not None and ts <= self.state.last_date:
+            raise ValueError(f"bar is not after the last bar ({self.state.last_date})")
+
+        rolled = [freq for freq in FREQUENCIES
+                  if self.state.periods[freq] and period_key(ts, freq) != self.state.periods[freq][-1]["Date"]]
+        published = self._publish(rolled)
+
+        self.state.append_bar(ts, bar["High"], bar["Low"], bar["Close"], bar["Open"])
+
+        if self.session_close is not None and ts.time() >= self.session_close:
+            # The day ends here, with any week/month/year the next session falls outside of
+            next_day = market_calendar(self.market_type).next_session(ts.normalize(), "Daily")
+            ending = [freq for freq in FREQUENCIES if period_key(next_day, freq) != period_key(ts, freq)]
+            published += self._publish(ending)
+        return published
+
+
+# ==========================================================
+# --- Sources ---
+async def tail_file(path, queue, poll_interval=0.25, from_start=True):
+    """Push bars appended to ``path`` onto ``queue``, like ``tail -f``."""
+    with open(path, encoding="utf-8") as f:
+        if not from_start:
+            f.seek(0, 2)
+        pending = ""
+        parse = LineParser()
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                await asyncio.sleep(poll_interval)
+                continue
+            pending += chunk
+            if not pending.endswith("\n"):
+                continue   # partial line still being written
+            bar = parse(pending)
+            pending = ""
+            if bar is not None:
+                await queue.put(bar)
+
+
+async def serve_socket(host, port, queue):
+    """Local TCP stand-in for a market data feed: one bar per line."""
+    async def handle(reader, writer):
+        parse = LineParser()
+        try:
+            while line := await reader.readline():
+                bar = parse(line.decode("utf-8", "replace"))
+                if bar is not None:
+                    await queue.put(bar)
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def run_stream(queue, aggregator, publish):
+    while True:
+        bar = await queue.get()
+        try:
+            for levels in aggregator.on_bar(bar):
+                result = publish(levels)
+                if asyncio.iscoroutine(result):
+                    await result
+        except ValueError as e:
+            print(f"Skipping bar {bar['Date']}: {e}", file=sys.stderr)
+        finally:
+            queue.task_done()
+
+
+def print_levels(levels):
+    print(json.dumps(levels), flush=True)
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish next-period CPR/Camarilla/GPZ levels from minute bars.")
+    parser.add_argument("--symbol", required=True)
+    parser.add_argument("--market", default="Stock Market", choices=["Stock Market", "Bitcoin"])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="CSV/JSON-lines file to tail")
+    source.add_argument("--port", type=int, help="listen for bars on this local TCP port")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--session-close", help="HH:MM; close the day at the first bar at/after this time")
+    parser.add_argument("--state-dir", help="StateStore directory to resume from and save to on exit")
+    args = parser.parse_args(argv)
+
+    store = StateStore(args.state_dir) if args.state_dir else None
+    state = store.load(args.symbol) if store else None
+    session_close = dtime.fromisoformat(args.session_close) if args.session_close else None
+    aggregator = StreamingAggregator(args.symbol, args.market, session_close, state)
+
+    queue = asyncio.Queue(maxsize=10_000)
+    if args.file:
+        producer = asyncio.create_task(tail_file(args.file, queue))
+    else:
+        server = await serve_socket(args.host, args.port, queue)
+        producer = asyncio.create_task(server.serve_forever())
+    try:
+        await run_stream(queue, aggregator, print_levels)
+    finally:
+        producer.cancel()
+        if store:
+            store.save(aggregator.state)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
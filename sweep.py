@@ -0,0 +1,216 @@
+"""Parallel parameter sweep over the DPZ tolerance, the Camarilla multiplier
+and the relationship "unchanged" threshold.
+
+The universe is aggregated and concatenated once (backtest.stack_universe)
+and its Open/High/Low/Close arrays are copied into one shared-memory block
+that every worker maps instead of receiving a pickled copy. Work is split
+by multiplier -- the only parameter the level engine depends on -- so a
+task computes the levels, the DPZ side gaps and the next-period outcomes
+once and then evaluates each of its tolerance/threshold cells with cheap
+comparisons.
+
+Every cell yields the backtest stats of the GPZ and CPR signals plus two
+DPZ signals (resistance-only rows traded short, support-only rows long).
+Cells are cached per dataset -- a hash of the stacked arrays and the
+frequency -- in a bounded in-memory LRU and optionally as one Parquet file
+per dataset, so repeating or widening a sweep only computes the cells it
+has not seen.
+"""
+import hashlib
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import (SIGNALS, next_period_outcomes, signal_masks, signal_stats, stack_universe,
+                      symbol_boundaries)
+from dpz import DPZ_TOLERANCE_PCT, dpz_side_gaps
+from level_engine import CAMARILLA_MULTIPLIER, compute_levels
+from relationships import UNCHANGED_THRESHOLD
+
+PARAM_COLUMNS = ("Multiplier", "TolerancePct", "UnchangedThreshold")
+DPZ_SIGNALS = {"DPZ Resistance": -1, "DPZ Support": 1}
+SWEEP_SIGNALS = {**SIGNALS, **DPZ_SIGNALS}
+PRICE_ROWS = ("open", "high", "low", "close")
+SWEEP_CACHE_ENTRIES = 16
+
+
+def dataset_digest(prices, lengths, data_freq):
+    h = hashlib.sha256()
+    h.update(data_freq.encode())
+    h.update(np.asarray(lengths, dtype=np.int64).tobytes())
+    h.update(np.ascontiguousarray(prices).tobytes())
+    return h.hexdigest()
+
+
+# ==========================================================
+# --- Cache ---
+class SweepCache:
+    """Computed sweep cells per dataset digest: an LRU of ``max_entries``
+    datasets in memory, optionally backed by Parquet files."""
+
+    def __init__(self, cache_dir=None, max_entries=SWEEP_CACHE_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._cells = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, f"sweep_{digest}.parquet")
+
+    def _remember(self, digest, cells):
+        with self._lock:
+            self._cells[digest] = cells
+            self._cells.move_to_end(digest)
+            while len(self._cells) > self.max_entries:
+                self._cells.popitem(last=False)
+
+    def get(self, digest):
+        with self._lock:
+            cells = self._cells.get(digest)
+            if cells is not None:
+                self._cells.move_to_end(digest)
+        if cells is not None or not self.cache_dir or not os.path.exists(self._path(digest)):
+            return cells
+        try:
+            cells = pd.read_parquet(self._path(digest))
+        except Exception:
+            # Missing pyarrow or a half-written file: treat as a miss
+            return None
+        self._remember(digest, cells)
+        return cells
+
+    def put(self, digest, rows):
+        """Merge newly computed cell rows into the dataset's entry."""
+        existing = self.get(digest)
+        cells = rows if existing is None else pd.concat([existing, rows], ignore_index=True)
+        self._remember(digest, cells)
+        if not self.cache_dir:
+            return cells
+        path = self._path(digest)
+        tmp_path = path + ".tmp"
+        try:
+            cells.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return cells
+
+
+_DEFAULT_CACHE = SweepCache()
+
+
+# ==========================================================
+# --- Workers ---
+_ATTACHED = {}   # shared-memory name -> (SharedMemory, array), per worker process
+
+
+def _attach(name, shape):
+    if name not in _ATTACHED:
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13: pool workers share the parent's resource tracker,
+            # so the registration is released when the parent unlinks
+            shm = shared_memory.SharedMemory(name=name)
+        _ATTACHED[name] = (shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+    return _ATTACHED[name][1]
+
+
+def _sweep_task(task):
+    source, shape, lengths, multiplier, cells = task
+    prices = _attach(source, shape) if isinstance(source, str) else source
+    open_, high, low, close = prices
+    first, last = symbol_boundaries(lengths)
+
+    levels = compute_levels(high, low, close, multiplier=multiplier)
+    outcomes = next_period_outcomes(levels, open_, high, low, close, last)
+    res_gap, sup_gap = dpz_side_gaps(levels)
+    priced = close != 0
+
+    parts, masks_by_threshold = [], {}
+    for tolerance_pct, threshold in cells:
+        if threshold not in masks_by_threshold:
+            masks_by_threshold[threshold] = signal_masks(levels, open_, close, first, threshold)
+        masks = dict(masks_by_threshold[threshold])
+        tolerance = close * tolerance_pct
+        has_res = (res_gap <= tolerance) & priced
+        has_sup = (sup_gap <= tolerance) & priced
+        masks["DPZ Resistance"] = has_res & ~has_sup
+        masks["DPZ Support"] = has_sup & ~has_res
+
+        stats = signal_stats(masks, outcomes, SWEEP_SIGNALS).reset_index()
+        for i, value in enumerate((multiplier, tolerance_pct, threshold)):
+            stats.insert(i, PARAM_COLUMNS[i], float(value))
+        parts.append(stats)
+    return pd.concat(parts, ignore_index=True)
+
+
+def _run_tasks(prices, lengths, tasks, max_workers):
+    """Run ``(multiplier, cells)`` tasks, across a pool on shared memory when worthwhile."""
+    if max_workers == 1 or len(tasks) <= 1:
+        return [_sweep_task((prices, prices.shape, lengths, m, cells)) for m, cells in tasks]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+    try:
+        np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)[:] = prices
+        payload = [(shm.name, prices.shape, lengths, m, cells) for m, cells in tasks]
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+            return list(pool.map(_sweep_task, payload))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _split_tasks(missing, max_workers):
+    """Group cells by multiplier, splitting groups until every worker has one."""
+    by_multiplier = {}
+    for multiplier, tolerance_pct, threshold in missing:
+        by_multiplier.setdefault(multiplier, []).append((tolerance_pct, threshold))
+    pieces = max(1, -(-max_workers // max(len(by_multiplier), 1)))
+    tasks = []
+    for multiplier, cells in by_multiplier.items():
+        size = max(1, -(-len(cells) // pieces))
+        tasks += [(multiplier, cells[i:i + size]) for i in range(0, len(cells), size)]
+    return tasks
+
+
+# ==========================================================
+# --- Entry point ---
+def sweep(frames, data_freq="Daily", tolerance_pcts=(DPZ_TOLERANCE_PCT,), multipliers=(CAMARILLA_MULTIPLIER,),
+          unchanged_thresholds=(UNCHANGED_THRESHOLD,), max_workers=None, cache=None):
+    """Signal counts and outcomes for every parameter combination.
+
+    ``frames`` maps symbol -> raw OHLC frame (one asset class per sweep).
+    Returns ``(results, errors)``: one row per (Multiplier, TolerancePct,
+    UnchangedThreshold, Signal) with the backtest.STAT_COLUMNS stats pooled
+    over all symbols, and a dict of symbol -> reason for skipped symbols.
+    ``cache`` is a SweepCache; by default a process-wide in-memory one
+    holding the last SWEEP_CACHE_ENTRIES datasets.
+    """
+    symbols, lengths, arrays, errors = stack_universe(frames, data_freq)
+    prices = np.vstack([arrays[name] for name in PRICE_ROWS])
+    cache = _DEFAULT_CACHE if cache is None else cache
+    digest = dataset_digest(prices, lengths, data_freq)
+
+    grid = [tuple(map(float, cell)) for cell in itertools.product(multipliers, tolerance_pcts, unchanged_thresholds)]
+    cached = cache.get(digest)
+    seen = set() if cached is None else set(cached[list(PARAM_COLUMNS)].itertuples(index=False, name=None))
+    missing = list(dict.fromkeys(cell for cell in grid if cell not in seen))
+    if missing:
+        max_workers = max_workers or os.cpu_count() or 1
+        cached = cache.put(digest, pd.concat(_run_tasks(prices, lengths, _split_tasks(missing, max_workers),
+                                                         max_workers), ignore_index=True))
+
+    wanted = pd.MultiIndex.from_tuples(grid, names=PARAM_COLUMNS).drop_duplicates()
+    results = cached[pd.MultiIndex.from_frame(cached[list(PARAM_COLUMNS)]).isin(wanted)]
+    results = results.assign(Signal=pd.Categorical(results["Signal"], categories=list(SWEEP_SIGNALS)))
+    return results.sort_values(list(PARAM_COLUMNS) + ["Signal"]).reset_index(drop=True), errors
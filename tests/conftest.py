@@ -0,0 +1,62 @@
+"""Shared fixtures: the bundled sample file and a seeded synthetic history.
+
+The modules live at the repository root, so it is put on sys.path for
+plain ``pytest`` runs as well as ``python -m pytest``.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SAMPLE_FILE = os.path.join(ROOT, "sample_input_file_for_CPR.xlsx")
+
+
+@pytest.fixture(scope="session")
+def sample_ohlc():
+    """The sample file, normalized (Date/High/Low/Close, 41 daily rows)."""
+    from analysis import prepare_ohlc
+    from ingest import read_ohlc
+    return prepare_ohlc(read_ohlc(SAMPLE_FILE, SAMPLE_FILE))
+
+
+def make_walk(n=600, seed=7, start="2021-01-04"):
+    """Seeded random-walk business-day history with Open. Every 25th bar
+    repeats the previous one, so "Unchanged" relationships occur too."""
+    rng = np.random.default_rng(seed)
+    close = 1000 + np.cumsum(rng.normal(0, 8, n))
+    open_ = close + rng.normal(0, 4, n)
+    high = np.maximum(open_, close) + rng.gamma(2.0, 3.0, n)
+    low = np.minimum(open_, close) - rng.gamma(2.0, 3.0, n)
+    df = pd.DataFrame({"Date": pd.bdate_range(start, periods=n), "Open": open_, "High": high, "Low": low,
+                       "Close": close})
+    repeat = np.arange(25, n, 25)
+    df.loc[repeat, ["Open", "High", "Low", "Close"]] = df.loc[repeat - 1, ["Open", "High", "Low", "Close"]].to_numpy()
+    return df
+
+
+@pytest.fixture(scope="session")
+def walk_ohlc():
+    return make_walk()
+
+
+@pytest.fixture(params=["sample", "walk", "flat_walk"])
+def history(request, sample_ohlc, walk_ohlc):
+    """(high, low, close, open) arrays; open is None for the sample file."""
+    if request.param == "sample":
+        df = sample_ohlc
+    elif request.param == "walk":
+        df = walk_ohlc
+    else:
+        # Tight ranges and closes pinned to the high: BC/TC swaps, GPZ and DPZ hits
+        df = make_walk(n=400, seed=11)
+        df["High"] = df[["Open", "Close"]].max(axis=1) + 0.5
+        df["Low"] = df[["Open", "Close"]].min(axis=1) - 0.5
+        df.loc[::3, "Close"] = df.loc[::3, "High"]
+    open_ = df["Open"].to_numpy() if "Open" in df.columns else None
+    return df["High"].to_numpy(), df["Low"].to_numpy(), df["Close"].to_numpy(), open_
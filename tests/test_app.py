@@ -0,0 +1,44 @@
+"""The Streamlit app end to end (streamlit.testing): every frequency runs
+on the sample file, and the lazy sections only render once opened."""
+import io
+import os
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT, SAMPLE_FILE
+
+APP = os.path.join(ROOT, "stock_market_analysis_v2.py")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    with open(SAMPLE_FILE, "rb") as f:
+        data = f.read()
+
+    class Upload(io.BytesIO):
+        name = os.path.basename(SAMPLE_FILE)
+        size = len(data)
+
+    monkeypatch.setattr(st, "file_uploader", lambda *args, **kwargs: Upload(data))
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    return at
+
+
+@pytest.mark.parametrize("data_freq", ["Daily", "Weekly", "Monthly"])
+def test_frequencies_run_cleanly(app, data_freq):
+    freq_radio = next(r for r in app.radio if "Daily" in r.options)
+    freq_radio.set_value(data_freq).run()
+    assert not app.exception
+    assert any("Relationship" in m.value for m in app.markdown)
+
+
+def test_sections_render_only_when_opened(app):
+    assert not app.exception
+    assert len(app.get("plotly_chart")) == 0
+    app.session_state["cpr_chart_open"] = True
+    app.run()
+    assert not app.exception
+    assert len(app.get("plotly_chart")) == 1
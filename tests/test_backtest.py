@@ -0,0 +1,58 @@
+"""Vectorized signal backtest: next-period outcomes, symbol boundaries and
+the pooled stats."""
+import numpy as np
+import pytest
+
+from backtest import SIGNALS, backtest, backtest_periods, backtest_universe, signal_stats, symbol_boundaries
+from conftest import make_walk
+from ingest import resample_ohlc
+from level_engine import compute_levels
+
+
+def test_outcomes_trade_the_next_period(walk_ohlc):
+    out = backtest_periods(walk_ohlc)
+    expected = walk_ohlc["Close"].shift(-1) / walk_ohlc["Open"].shift(-1) - 1
+    np.testing.assert_allclose(out["Return"], expected)
+    levels = compute_levels(walk_ohlc["High"], walk_ohlc["Low"], walk_ohlc["Close"])
+    np.testing.assert_array_equal(out["LongTarget"].to_numpy()[:-1],
+                                  walk_ohlc["High"].to_numpy()[1:] >= levels["Cam_R3"][:-1])
+
+
+def test_universe_pools_symbols_without_leaking():
+    frames = {"A": make_walk(n=200, seed=1), "B": make_walk(n=300, seed=2)}
+    pooled, errors = backtest_universe(frames)
+    assert errors == {}
+    separate = [backtest(df) for df in frames.values()]
+    assert pooled["Trades"].tolist() == (separate[0]["Trades"] + separate[1]["Trades"]).tolist()
+
+    by_symbol, _ = backtest_universe(frames, by_symbol=True)
+    for symbol, stats in zip(frames, separate):
+        rows = by_symbol[by_symbol["Symbol"] == symbol].set_index("Signal")
+        assert rows["Trades"].tolist() == stats["Trades"].tolist()
+        np.testing.assert_allclose(rows["MeanReturn"], stats["MeanReturn"])
+
+
+def test_boundaries_and_short_histories():
+    first, last = symbol_boundaries([2, 0, 3])
+    assert first.tolist() == [True, False, True, False, False]
+    assert last.tolist() == [False, True, False, False, True]
+    _, errors = backtest_universe({"ONE": make_walk(n=3)}, "Monthly")
+    assert errors == {"ONE": "Need at least 2 periods."}
+
+
+def test_total_return_survives_a_gap_through_short():
+    # The short's next period closes at 2.5x the entry: a -150% trade
+    outcomes = {"Return": np.array([1.5, 0.1]), **{f"{side}{check}": np.zeros(2, dtype=bool)
+                                                   for side in ("Long", "Short")
+                                                   for check in ("Target", "Stop", "Held")}}
+    masks = {"GPZ Bearish": np.array([True, True])}
+    stats = signal_stats(masks, outcomes, {"GPZ Bearish": -1})
+    assert stats.loc["GPZ Bearish", "TotalReturn"] == -1.0
+    assert stats.loc["GPZ Bearish", "MeanReturn"] == pytest.approx(-0.8)
+
+
+def test_stats_table_lists_every_signal(walk_ohlc):
+    stats = backtest(walk_ohlc, "Weekly")
+    assert stats.index.tolist() == list(SIGNALS)
+    assert stats["TotalReturn"].notna().all() and (stats["Trades"] > 0).all()
+    assert len(resample_ohlc(walk_ohlc, "Weekly")) - 1 >= stats["Trades"].max()
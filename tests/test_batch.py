@@ -0,0 +1,53 @@
+"""Multi-symbol batch mode: universe readers, per-symbol results equal to
+analyze_ohlc, and per-symbol errors instead of failed batches."""
+import io
+
+import pandas as pd
+import pytest
+
+from analysis import analyze_ohlc, prepare_ohlc
+from batch import SYMBOL_COL, read_universe, run_batch
+from conftest import make_walk
+
+
+@pytest.fixture(scope="module")
+def universe():
+    return {"AAA": make_walk(n=80, seed=1), "BBB": make_walk(n=120, seed=2)}
+
+
+def test_read_universe_long_csv_and_workbook(tmp_path, universe):
+    long = pd.concat([df.assign(Symbol=symbol) for symbol, df in universe.items()])
+    frames = read_universe(io.BytesIO(long.to_csv(index=False).encode()), name="universe.csv")
+    assert list(frames) == ["AAA", "BBB"]
+    assert SYMBOL_COL not in frames["AAA"].columns and len(frames["BBB"]) == 120
+
+    path = tmp_path / "universe.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        for symbol, df in universe.items():
+            df.to_excel(writer, sheet_name=symbol, index=False)
+    assert {symbol: len(df) for symbol, df in read_universe(str(path)).items()} == {"AAA": 80, "BBB": 120}
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_rows_match_analyze_ohlc(universe, max_workers):
+    results, errors = run_batch(universe, "Weekly", history=True, max_workers=max_workers)
+    assert errors == {}
+    for symbol, df in universe.items():
+        expected = analyze_ohlc(prepare_ohlc(df), "Weekly")
+        actual = results[results[SYMBOL_COL] == symbol].drop(columns=SYMBOL_COL).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_categorical=False)
+
+
+def test_next_period_row_only(universe):
+    results, _ = run_batch(universe, max_workers=1)
+    assert results[SYMBOL_COL].tolist() == ["AAA", "BBB"]
+
+
+def test_errors_are_per_symbol(universe):
+    frames = dict(universe, NOCLOSE=universe["AAA"].drop(columns="Close"),
+                  ONEWEEK=make_walk(n=4, start="2024-01-01"))
+    results, errors = run_batch(frames, "Weekly", max_workers=1)
+    assert results[SYMBOL_COL].tolist() == ["AAA", "BBB"]
+    assert set(errors) == {"NOCLOSE", "ONEWEEK"}
+    # Four daily rows pass a row count but are a single weekly period
+    assert errors["ONEWEEK"] == "Need at least 2 weekly periods."
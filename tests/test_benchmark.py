@@ -0,0 +1,40 @@
+"""Benchmark harness: deterministic synthetic data, every stage timed and
+the before/after comparison."""
+import numpy as np
+import pandas as pd
+
+from benchmark import compare, run_scenario, synthetic_ohlc, synthetic_universe
+
+
+def test_synthetic_ohlc_is_deterministic_business_days():
+    df = synthetic_ohlc(500, seed=3)
+    pd.testing.assert_frame_equal(df, synthetic_ohlc(500, seed=3))
+    assert len(df) == 500
+    assert df["Date"].is_monotonic_increasing and df["Date"].is_unique
+    assert np.is_busday(df["Date"].to_numpy().astype("datetime64[D]")).all()
+    assert (df["High"] >= df[["Open", "Close"]].max(axis=1)).all()
+    assert (df["Low"] <= df[["Open", "Close"]].min(axis=1)).all()
+
+
+def test_universe_splits_rows_over_symbols():
+    universe = synthetic_universe(1000, 4, seed=1)
+    assert list(universe) == ["SYM0000", "SYM0001", "SYM0002", "SYM0003"]
+    assert all(len(df) == 250 for df in universe.values())
+    assert not universe["SYM0000"]["Close"].equals(universe["SYM0001"]["Close"])
+
+
+def test_scenario_times_every_stage():
+    timings = run_scenario(400, 2, repeat=2)
+    for stage in ("ingest", "resample_weekly", "resample_monthly", "resample_yearly", "levels", "relations",
+                  "gpz", "dpz", "widths", "confluence"):
+        assert len(timings[stage]) == 2
+        assert all(t >= 0 for t in timings[stage])
+
+
+def test_compare_flags_regressions():
+    def run(times):
+        return {"results": [{"scenario": "1x1", "stage": s, "best_s": t} for s, t in times.items()]}
+    table = compare(run({"ingest": 1.0, "levels": 2.0}), run({"ingest": 1.5, "levels": 2.0, "plotly": 1.0}))
+    assert list(table["stage"]) == ["ingest", "levels"]
+    assert list(table["ratio"]) == [1.5, 1.0]
+    assert list(table["regression"]) == [True, False]
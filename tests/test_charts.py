@@ -0,0 +1,42 @@
+"""Segment traces: one trace per level, capped by the chart's pixel width."""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from charts import DEFAULT_CHART_WIDTH, PX_PER_SEGMENT, level_chart, level_segments, segment_cap
+
+
+def _frame(n):
+    return pd.DataFrame({"Date": pd.bdate_range("2020-01-01", periods=n), "TC": np.arange(n, dtype=float)})
+
+
+def test_one_segment_per_period_when_it_fits():
+    df = _frame(5)
+    x, ys = level_segments(df, ["TC"])
+    assert len(x) == 15
+    np.testing.assert_array_equal(ys["TC"][0::3], df["TC"].to_numpy())
+    assert np.isnan(ys["TC"][2::3]).all() and x[2::3].isna().all()
+
+
+def test_downsampled_buckets_end_on_the_last_period():
+    df = _frame(1001)
+    x, ys = level_segments(df, ["TC"], max_segments=100)
+    values = ys["TC"][0::3]
+    assert len(values) <= 100
+    assert values[-1] == 1000.0 and x[1::3][-1] == df["Date"].iloc[-1] + pd.Timedelta(hours=8)
+
+
+def test_cap_follows_the_chart_width():
+    assert segment_cap(300) == 300 // PX_PER_SEGMENT
+    df = _frame(5000)
+    narrow = level_chart(df, [("TC", {"color": "red"})], width=300)
+    assert narrow.layout.width == 300
+    assert len(narrow.data) == 1 and len(narrow.data[0].y) <= 3 * segment_cap(300)
+    default = level_chart(df, [("TC", {"color": "red"})])
+    assert len(default.data[0].y) <= 3 * (DEFAULT_CHART_WIDTH // PX_PER_SEGMENT)
+
+
+def test_webgl_for_large_traces():
+    df = _frame(2000)
+    assert isinstance(level_chart(df, [("TC", {})], max_segments=2000).data[0], go.Scattergl)
+    assert isinstance(level_chart(df, [("TC", {})], max_segments=50).data[0], go.Scatter)
@@ -0,0 +1,69 @@
+"""Confluence: the pointer-doubling sweep against a one-step-at-a-time
+sweep, last periods against a full resample, and cluster ranking."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from confluence import (CONFLUENCE_LEVELS, confluence_table, find_confluence, last_periods, sweep_clusters,
+                        universe_confluence)
+from ingest import FREQUENCIES, resample_ohlc
+
+
+def baseline_starts(prices, tolerance, groups):
+    """Cluster starts by walking the sorted levels one at a time."""
+    order = np.lexsort((prices, groups))
+    starts, first = [], None
+    for pos, i in enumerate(order):
+        if first is None or groups[i] != groups[first] or prices[i] > prices[first] + tolerance[first]:
+            starts.append(pos)
+            first = i
+    return order, np.array(starts)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_sweep_matches_step_by_step(seed):
+    rng = np.random.default_rng(seed)
+    n = 2000
+    prices = np.round(rng.uniform(90, 110, n), 1)      # rounded, so ties and exact-tolerance edges occur
+    groups = rng.integers(0, 5, n)
+    tolerance = np.where(groups % 2, 0.2, 0.5)
+    order, starts = sweep_clusters(prices, tolerance, groups)
+    expected_order, expected_starts = baseline_starts(prices, tolerance, groups)
+    np.testing.assert_array_equal(order, expected_order)
+    np.testing.assert_array_equal(starts, expected_starts)
+
+
+def test_sweep_clusters_small_cases():
+    order, starts = sweep_clusters([10.0, 10.15, 10.3, 10.05, 12.0], 0.2)
+    np.testing.assert_array_equal(order, [0, 3, 1, 2, 4])
+    np.testing.assert_array_equal(starts, [0, 3, 4])        # {10, 10.05, 10.15}, {10.3}, {12}
+    assert sweep_clusters([], 0.1)[1].tolist() == []
+    assert sweep_clusters([5.0], 0.1)[1].tolist() == [0]
+
+
+def test_last_periods_match_resample(walk_ohlc):
+    periods = last_periods(walk_ohlc)
+    for freq in FREQUENCIES:
+        last = resample_ohlc(walk_ohlc, freq).iloc[-1]
+        assert periods[freq] == pytest.approx((last["High"], last["Low"], last["Close"], last["Open"])), freq
+
+
+def test_find_confluence_ranks_by_timeframes():
+    def levels(price):
+        return {name: np.array([price, np.nan]) for name in CONFLUENCE_LEVELS}
+    by_freq = {"Daily": levels(100.0), "Weekly": levels(100.1), "Monthly": levels(150.0), "Yearly": levels(100.05)}
+    table = find_confluence(by_freq, [100.0, 100.0], tolerance_pct=0.002)
+    assert list(table["Rank"]) == [1]            # the Monthly cluster has one timeframe, symbol 1 has no levels
+    row = table.iloc[0]
+    assert row["Symbol"] == 0 and row["Timeframes"] == 3 and row["Levels"] == 3 * len(CONFLUENCE_LEVELS)
+    assert row["Score"] == len(CONFLUENCE_LEVELS) * (1 + 2 + 4)
+    assert row["Low"] == 100.0 and row["High"] == 100.1
+
+
+def test_universe_matches_per_symbol_tables(walk_ohlc, sample_ohlc):
+    universe = universe_confluence({"WALK": walk_ohlc, "SAMPLE": sample_ohlc})
+    for symbol, df in (("WALK", walk_ohlc), ("SAMPLE", sample_ohlc)):
+        alone = confluence_table(df)
+        part = universe[universe["Symbol"] == symbol].drop(columns="Symbol").reset_index(drop=True)
+        pd.testing.assert_frame_equal(part, alone, check_dtype=False)
+    assert (universe["Timeframes"] >= 2).all()
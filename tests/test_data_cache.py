@@ -0,0 +1,82 @@
+"""OhlcCache: one parse per upload, frequency switches and the sidecar."""
+import numpy as np
+import pandas as pd
+
+from conftest import SAMPLE_FILE
+from data_cache import OhlcCache, file_digest
+from ingest import normalize_ohlc, read_ohlc, resample_ohlc
+from level_engine import compute_levels
+
+
+def _sample_bytes():
+    with open(SAMPLE_FILE, "rb") as f:
+        return f.read()
+
+
+def test_load_matches_direct_resample():
+    data = _sample_bytes()
+    cache = OhlcCache()
+    daily = normalize_ohlc(read_ohlc(data, SAMPLE_FILE))
+    for data_freq in ("Daily", "Weekly", "Monthly"):
+        frame, levels = cache.load(data, data_freq, name=SAMPLE_FILE)
+        expected = resample_ohlc(daily, data_freq)
+        pd.testing.assert_frame_equal(frame.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False)
+        np.testing.assert_allclose(levels["TC"], compute_levels(expected["High"], expected["Low"],
+                                                                expected["Close"])["TC"])
+
+
+def test_second_load_is_a_lookup():
+    data = _sample_bytes()
+    cache = OhlcCache()
+    _, first = cache.load(data, "Weekly", name=SAMPLE_FILE)
+    _, second = cache.load(data, "Weekly", name=SAMPLE_FILE)
+    assert second["Pivot"] is first["Pivot"]
+
+
+def test_caller_changes_do_not_reach_the_cache():
+    data = _sample_bytes()
+    cache = OhlcCache()
+    frame, _ = cache.load(data, "Daily", name=SAMPLE_FILE)
+    frame["Close"] = 0.0
+    assert (cache.load(data, "Daily", name=SAMPLE_FILE)[0]["Close"] != 0).all()
+
+
+def test_sidecar_survives_a_new_cache(tmp_path):
+    data = _sample_bytes()
+    frame, _ = OhlcCache(sidecar_dir=str(tmp_path)).load(data, "Weekly", name=SAMPLE_FILE)
+    reloaded = OhlcCache(sidecar_dir=str(tmp_path))
+    assert reloaded.get(file_digest(data)) is not None
+    pd.testing.assert_frame_equal(reloaded.load(data, "Weekly", name=SAMPLE_FILE)[0], frame, check_dtype=False)
+
+
+def test_compact_mode_keeps_float32():
+    frame, levels = OhlcCache(compact=True).load(_sample_bytes(), "Daily", name=SAMPLE_FILE)
+    assert frame["Close"].dtype == np.float32 and levels["TC"].dtype == np.float32
+    assert "NextDate" not in frame.columns
+
+
+def test_compact_levels_track_full_precision():
+    data = _sample_bytes()
+    cache = OhlcCache(compact=True)
+    full_frame, full = OhlcCache().load(data, "Weekly", name=SAMPLE_FILE)
+    frame, levels = cache.load(data, "Weekly", name=SAMPLE_FILE)
+    np.testing.assert_array_equal(frame["Date"], full_frame["Date"])
+    for column in ("Pivot", "TC", "BC", "Cam_R3", "Cam_S3"):
+        np.testing.assert_allclose(levels[column], full[column], rtol=1e-6)
+    assert cache.get(file_digest(data)) is None
+    assert cache.get(file_digest(data) + "-compact") is not None
+
+
+def test_compact_sidecar_stays_float32(tmp_path):
+    data = _sample_bytes()
+    OhlcCache(sidecar_dir=str(tmp_path), compact=True).load(data, "Daily", name=SAMPLE_FILE)
+    frame, levels = OhlcCache(sidecar_dir=str(tmp_path), compact=True).load(data, "Daily", name=SAMPLE_FILE)
+    assert frame["Close"].dtype == np.float32 and levels["TC"].dtype == np.float32
+
+
+def test_compact_upload_retains_less_memory():
+    from benchmark import memory_scenario
+    full = memory_scenario(20_000, compact=False)
+    compact = memory_scenario(20_000, compact=True)
+    assert compact["retained_mb"] < 0.75 * full["retained_mb"]
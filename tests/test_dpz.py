@@ -0,0 +1,81 @@
+"""Full-history DPZ scan against the original app's per-pair tolerance
+checks, evaluated one period at a time."""
+import numpy as np
+import pytest
+
+from dpz import dpz_hits, dpz_pair_labels, dpz_side_gaps, dpz_types, scan_dpz
+from level_engine import compute_levels
+
+BASELINE_CHECKS = [
+    ("R1", "R3", "Resistance DPZ"), ("R1", "R4", "Strong Resistance DPZ"),
+    ("R2", "R3", "Resistance DPZ"), ("R2", "R4", "Very Strong Resistance DPZ"),
+    ("Pivot", "R3", "Resistance DPZ"), ("Pivot", "R4", "Very Strong Resistance DPZ"),
+    ("S1", "S3", "Support DPZ"), ("S1", "S4", "Strong Support DPZ"),
+    ("S2", "S3", "Support DPZ"), ("S2", "S4", "Very Strong Support DPZ"),
+    ("Pivot", "S3", "Support DPZ"), ("Pivot", "S4", "Strong Support DPZ"),
+]
+
+
+def baseline_dpz(lv, current_price_ref, tolerance_pct):
+    """(messages as (classic, camarilla, strength) tuples, dpz_type)."""
+    def is_within_tolerance(a, b, ref_price):
+        if ref_price == 0:
+            return False
+        return abs(a - b) <= ref_price * tolerance_pct
+
+    messages = [(classic, cam, strength) for classic, cam, strength in BASELINE_CHECKS
+                if is_within_tolerance(lv[classic], lv[f"Cam_{cam}"], current_price_ref)]
+    if not messages:
+        return messages, "None"
+    has_res = any("Resistance" in m[2] for m in messages)
+    has_sup = any("Support" in m[2] for m in messages)
+    if has_res and has_sup:
+        return messages, "Mixed (Support & Resistance DPZ)"
+    if has_res:
+        return messages, "Resistance Double Pivot Hot Zone"
+    return messages, "Support Double Pivot Hot Zone"
+
+
+@pytest.mark.parametrize("tolerance_pct", [0.001, 0.005, 0.02])
+def test_scan_matches_baseline(history, tolerance_pct):
+    high, low, close, _ = history
+    levels = compute_levels(high, low, close)
+    table = scan_dpz(levels, close, tolerance_pct)
+    types = dpz_types(dpz_hits(levels, close, tolerance_pct))
+    by_period = {period: list(zip(group["Classic"], group["Camarilla"], group["Strength"]))
+                 for period, group in table.groupby("Period", sort=False)}
+    for i in range(len(close)):
+        row = {name: float(values[i]) for name, values in levels.items() if name != "Swapped"}
+        messages, dpz_type = baseline_dpz(row, close[i], tolerance_pct)
+        assert by_period.get(i, []) == messages, i
+        assert types.iloc[i] == dpz_type, i
+
+
+def test_side_gaps_agree_with_hits(walk_ohlc):
+    close = walk_ohlc["Close"].to_numpy()
+    levels = compute_levels(walk_ohlc["High"], walk_ohlc["Low"], close)
+    res_gap, sup_gap = dpz_side_gaps(levels)
+    for tolerance_pct in (0.001, 0.01):
+        types = dpz_types(dpz_hits(levels, close, tolerance_pct)).astype(str).to_numpy()
+        has_res = res_gap <= close * tolerance_pct
+        has_sup = sup_gap <= close * tolerance_pct
+        np.testing.assert_array_equal(np.isin(types, ["Resistance Double Pivot Hot Zone",
+                                                      "Mixed (Support & Resistance DPZ)"]), has_res)
+        np.testing.assert_array_equal(np.isin(types, ["Support Double Pivot Hot Zone",
+                                                      "Mixed (Support & Resistance DPZ)"]), has_sup)
+
+
+def test_pair_labels_follow_reporting_order(walk_ohlc):
+    close = walk_ohlc["Close"].to_numpy()
+    levels = compute_levels(walk_ohlc["High"], walk_ohlc["Low"], close)
+    hits = dpz_hits(levels, close, 0.02)
+    labels = dpz_pair_labels(hits)
+    table = scan_dpz(levels, close, 0.02)
+    for period, group in table.groupby("Period"):
+        assert labels[period] == ", ".join(f"{a}~{b}" for a, b in zip(group["Classic"], group["Camarilla"]))
+    assert labels[~hits.any(axis=(1, 2))].tolist() == [""] * int((~hits.any(axis=(1, 2))).sum())
+
+
+def test_zero_price_never_overlaps():
+    zeros = np.zeros(3)
+    assert scan_dpz(compute_levels(zeros, zeros, zeros), zeros, 0.5).empty
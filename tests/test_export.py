@@ -0,0 +1,93 @@
+"""Bulk export: round trips through the streamed Excel writer and the
+Arrow CSV/Parquet writers, sheet splitting and column conforming."""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import analyze_ohlc
+from conftest import make_walk
+from export import ExcelExporter, PandasCsvExporter, export_bytes, export_tables
+
+# "None" is a DPZ label, not a missing value
+READ_NA = {"keep_default_na": False, "na_values": [""]}
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return [({"Symbol": f"SYM{i}"}, analyze_ohlc(make_walk(n=80, seed=i), "Daily")) for i in range(3)]
+
+
+def _expected(tables):
+    parts = [frame.assign(Symbol=key["Symbol"])[["Symbol", *frame.columns]] for key, frame in tables]
+    return pd.concat(parts, ignore_index=True)
+
+
+def _labels(series):
+    return [str(v) for v in series.astype(object).where(series.notna(), "")]
+
+
+def _assert_same(got, expected):
+    for col in expected.columns:
+        if pd.api.types.is_numeric_dtype(expected[col]) and not pd.api.types.is_bool_dtype(expected[col]):
+            np.testing.assert_allclose(got[col].to_numpy(dtype=np.float64), expected[col].to_numpy(dtype=np.float64),
+                                       rtol=1e-12, err_msg=col)
+        elif pd.api.types.is_datetime64_any_dtype(expected[col]):
+            np.testing.assert_array_equal(pd.to_datetime(got[col]).to_numpy().astype("datetime64[ns]"),
+                                          expected[col].to_numpy().astype("datetime64[ns]"), err_msg=col)
+        else:
+            assert _labels(got[col]) == _labels(expected[col]), col
+
+
+def test_excel_round_trip(tables):
+    data = export_bytes(tables, "excel")
+    sheets = pd.read_excel(io.BytesIO(data), sheet_name=None, **READ_NA)
+    assert list(sheets) == ["SYM0", "SYM1", "SYM2"]
+    for (key, frame), sheet in zip(tables, sheets.values()):
+        assert list(sheet.columns) == list(frame.columns)
+        _assert_same(sheet, frame)
+
+
+def test_excel_splits_long_tables_and_cleans_names(tables):
+    buf = io.BytesIO()
+    exporter = ExcelExporter(buf, batch_rows=7, max_rows=31)
+    frame = tables[0][1]
+    exporter.write(frame, {"Symbol": "A/B:C", "Frequency": "Daily"})
+    exporter.write(frame.iloc[:5], {"Symbol": "A/B:C", "Frequency": "Daily"})
+    exporter.close()
+    sheets = pd.read_excel(io.BytesIO(buf.getvalue()), sheet_name=None, **READ_NA)
+    assert list(sheets) == ["A_B_C Daily", "A_B_C Daily (2)", "A_B_C Daily (3)", "A_B_C Daily (4)"]
+    long_parts = [sheets[name] for name in list(sheets)[:3]]
+    assert [len(part) for part in long_parts] == [30, 30, 20]
+    _assert_same(pd.concat(long_parts, ignore_index=True), frame)
+    assert exporter.rows == len(frame) + 5
+
+
+def test_parquet_round_trip(tables, tmp_path):
+    path = str(tmp_path / "levels.parquet")
+    assert export_tables(tables, path, "parquet", batch_rows=25) == sum(len(frame) for _, frame in tables)
+    _assert_same(pd.read_parquet(path), _expected(tables))
+
+
+def test_csv_matches_pandas_writer(tables, tmp_path):
+    arrow_path = str(tmp_path / "arrow.csv")
+    export_tables(tables, arrow_path, "csv", batch_rows=25)
+    buf = io.BytesIO()
+    exporter = PandasCsvExporter(buf, batch_rows=25)
+    for key, frame in tables:
+        exporter.write(frame, key)
+    exporter.close()
+    arrow = pd.read_csv(arrow_path, **READ_NA)
+    _assert_same(arrow, _expected(tables))
+    pd.testing.assert_frame_equal(arrow, pd.read_csv(io.BytesIO(buf.getvalue()), **READ_NA), check_dtype=False)
+
+
+def test_later_tables_are_conformed_to_the_first(tables, tmp_path):
+    path = str(tmp_path / "levels.parquet")
+    first, second = tables[0][1], tables[1][1]
+    export_tables([({"Symbol": "A"}, first), ({"Symbol": "B"}, second.drop(columns="R5").assign(Extra=1.0))],
+                  path, "parquet")
+    out = pd.read_parquet(path)
+    assert list(out.columns) == ["Symbol", *first.columns]
+    assert out.loc[out["Symbol"] == "B", "R5"].isna().all()
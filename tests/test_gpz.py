@@ -0,0 +1,34 @@
+"""GPZ sentiment and supporting facts against the original app's rules,
+applied to every period and its predecessor."""
+from gpz import gpz_frame
+from level_engine import compute_levels
+
+
+def baseline_gpz(next_tc, next_bc, next_R3, next_S3, prev_tc, prev_bc, prev_close, curr_open, curr_close):
+    """(sentiment, first_fact, second_fact, third_fact); facts are None on Neutral."""
+    if next_tc >= next_R3 >= next_bc:
+        return ("Bearish (GPZ)", curr_open < prev_bc or curr_open < prev_tc,
+                curr_open < prev_bc and curr_close < prev_tc, next_bc > prev_close)
+    elif next_bc <= next_S3 <= next_tc:
+        return ("Bullish (GPZ)", curr_open > prev_bc or curr_open > prev_tc,
+                curr_open > prev_bc and curr_open > prev_tc, next_tc < prev_close)
+    return "Neutral", None, None, None
+
+
+def test_gpz_matches_baseline(history):
+    high, low, close, open_ = history
+    levels = compute_levels(high, low, close)
+    gpz = gpz_frame(levels, open_, close)
+    curr_open = close if open_ is None else open_
+    tc, bc, r3, s3 = (levels[name].tolist() for name in ("TC", "BC", "Cam_R3", "Cam_S3"))
+    sentiments = set()
+    for i in range(1, len(close)):
+        sentiment, *facts = baseline_gpz(tc[i], bc[i], r3[i], s3[i], tc[i - 1], bc[i - 1], close[i - 1],
+                                         curr_open[i], close[i])
+        row = gpz.iloc[i]
+        assert row["GPZ"] == sentiment, i
+        actual = [bool(row["GPZ_FirstFact"]), bool(row["GPZ_SecondFact"]), bool(row["GPZ_ThirdFact"])]
+        assert actual == ([False] * 3 if sentiment == "Neutral" else [bool(f) for f in facts]), i
+        sentiments.add(sentiment)
+    if len(close) > 100:
+        assert sentiments == {"Neutral", "Bearish (GPZ)", "Bullish (GPZ)"}
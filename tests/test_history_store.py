@@ -0,0 +1,57 @@
+"""Memory-mapped history store: appends, overlap handling, date-range
+slicing over the maps and recovery from an interrupted append."""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from history_store import HistoryStore
+
+
+def test_append_and_slice(tmp_path, walk_ohlc):
+    store = HistoryStore(str(tmp_path))
+    assert store.append("WALK", walk_ohlc.iloc[:300]) == 300
+    assert store.append("WALK", walk_ohlc.iloc[300:]) == len(walk_ohlc) - 300
+    pd.testing.assert_frame_equal(store.frame("WALK"), walk_ohlc[["Date", "Open", "High", "Low", "Close"]],
+                                  check_dtype=False)
+
+    part = store.frame("WALK", "2021-03-01", datetime.date(2021, 3, 31))
+    expected = walk_ohlc[(walk_ohlc["Date"] >= "2021-03-01") & (walk_ohlc["Date"] < "2021-04-01")]
+    np.testing.assert_array_equal(part["Close"], expected["Close"])
+    assert not store.columns("WALK")["Close"].flags.owndata     # a view of the map, not a copy
+
+
+def test_append_with_skip_existing(tmp_path, walk_ohlc):
+    store = HistoryStore(str(tmp_path))
+    store.append("WALK", walk_ohlc.iloc[:200])
+    with pytest.raises(ValueError, match="skip_existing"):
+        store.append("WALK", walk_ohlc.iloc[150:250])
+    assert store.append("WALK", walk_ohlc.iloc[150:250], skip_existing=True) == 50
+    assert store.append("WALK", walk_ohlc.iloc[100:250], skip_existing=True) == 0
+    info = store.info("WALK")
+    assert info["rows"] == 250 and info["has_open"]
+    assert info["first"] == walk_ohlc["Date"].iloc[0] and info["last"] == walk_ohlc["Date"].iloc[249]
+    np.testing.assert_array_equal(store.frame("WALK")["Date"], walk_ohlc["Date"].iloc[:250])
+
+
+def test_missing_open_is_dropped_and_torn_append_is_truncated(tmp_path, walk_ohlc):
+    store = HistoryStore(str(tmp_path), price_dtype="float32")
+    store.append("WALK", walk_ohlc.iloc[:10])
+    store.append("WALK", walk_ohlc.iloc[10:20].drop(columns="Open"))
+    assert "Open" not in store.columns("WALK")
+    assert store.columns("WALK")["Close"].dtype == np.float32
+
+    with open(tmp_path / "WALK" / "Close.bin", "ab") as f:    # bytes of an append that never committed
+        f.write(b"\0" * 12)
+    store.append("WALK", walk_ohlc.iloc[20:30])
+    np.testing.assert_allclose(store.frame("WALK")["Close"], walk_ohlc["Close"].iloc[:30], rtol=1e-6)
+
+
+def test_symbol_names_are_checked(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.info("../outside")
+    with pytest.raises(KeyError):
+        store.columns("NONE")
+    assert store.symbols() == []
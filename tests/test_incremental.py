@@ -0,0 +1,87 @@
+"""Incremental append mode against the full-history analysis: after
+appending bar by bar, every frequency's snapshot row must equal the last
+row of analyze_ohlc on the whole history."""
+import pandas as pd
+import pytest
+
+from analysis import analyze_ohlc
+from incremental import SymbolState, StateStore
+from report import build_report
+from width_stats import WIDTH_WINDOW
+
+WIDTH_COLUMNS = ("CPR_WidthPct", "CPR_WidthMean", "CPR_WidthZ", "CPR_WidthPctRank",
+                 "Cam_WidthPct", "Cam_WidthMean", "Cam_WidthZ", "Cam_WidthPctRank")
+
+
+def _append_all(state, df):
+    has_open = "Open" in df.columns
+    for row in df.itertuples(index=False):
+        state.append_bar(row.Date, row.High, row.Low, row.Close, row.Open if has_open else None)
+
+
+def _assert_matches_full(snapshot, df):
+    for data_freq, row in snapshot.set_index("Frequency").iterrows():
+        full = analyze_ohlc(df, data_freq, width_window=WIDTH_WINDOW).iloc[-1]
+        for col in full.index:
+            expected, actual = full[col], row[col]
+            if col in WIDTH_COLUMNS:
+                assert actual == pytest.approx(expected, rel=1e-9, nan_ok=True), (data_freq, col)
+            elif pd.isna(expected):
+                assert pd.isna(actual), (data_freq, col)
+            else:
+                assert actual == expected, (data_freq, col)
+
+
+@pytest.mark.parametrize("split", [2, 20, 40])
+def test_incremental_matches_full_sample(sample_ohlc, split):
+    state = SymbolState.from_history("SAMPLE", sample_ohlc.iloc[:split])
+    _append_all(state, sample_ohlc.iloc[split:])
+    _assert_matches_full(state.snapshot(), sample_ohlc)
+
+
+def test_incremental_matches_full_walk(walk_ohlc):
+    # Long enough to close many weeks and months and to fill the width window
+    state = SymbolState.from_history("WALK", walk_ohlc.iloc[:100])
+    _append_all(state, walk_ohlc.iloc[100:])
+    _assert_matches_full(state.snapshot(), walk_ohlc)
+
+
+def test_state_store_round_trip(tmp_path, walk_ohlc):
+    store = StateStore(str(tmp_path))
+    store.rebuild("WALK", walk_ohlc.iloc[:300])
+    store.append("WALK", walk_ohlc.iloc[300:])
+    # JSON round trip keeps the dates but not their datetime64 resolution
+    pd.testing.assert_frame_equal(store.load("WALK").snapshot(), SymbolState.from_history("WALK", walk_ohlc).snapshot(),
+                                  check_dtype=False)
+
+
+def test_append_rejects_old_bars(sample_ohlc):
+    state = SymbolState.from_history("SAMPLE", sample_ohlc)
+    last = sample_ohlc.iloc[-1]
+    with pytest.raises(ValueError):
+        state.append_bar(last["Date"], last["High"], last["Low"], last["Close"])
+
+
+def test_reupload_folds_in_only_new_bars(tmp_path, walk_ohlc):
+    store = StateStore(str(tmp_path))
+    store.append("WALK", walk_ohlc.iloc[:300])
+    # The whole file again, with rows appended: only the new rows are folded in
+    again = store.append("WALK", walk_ohlc.iloc[:310])
+    assert store.load("WALK").last_date == walk_ohlc["Date"].iloc[309]
+    expected = SymbolState.from_history("WALK", walk_ohlc.iloc[:310]).snapshot()
+    pd.testing.assert_frame_equal(again, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(store.append("WALK", walk_ohlc.iloc[:310]), expected, check_dtype=False)
+
+
+def test_report_state_dir_matches_full_report(tmp_path, walk_ohlc):
+    path = str(tmp_path / "WALK.csv")
+    state_dir = str(tmp_path / "state")
+    for n in (300, 301, 320):
+        walk_ohlc.iloc[:n].to_csv(path, index=False)
+        for data_freq in ("Daily", "Weekly"):
+            incremental, errors = build_report([path], data_freq, max_workers=1, state_dir=state_dir)
+            full, _ = build_report([path], data_freq, max_workers=1)
+            assert errors == {}
+            pd.testing.assert_frame_equal(incremental, full, check_dtype=False, check_categorical=False)
+    with pytest.raises(ValueError):
+        build_report([path], history=True, state_dir=state_dir)
@@ -0,0 +1,70 @@
+"""Date handling in ingest: parsing before sorting, dropped bad dates and
+the chunked CSV path agreeing with the in-memory one."""
+import io
+
+import pandas as pd
+import pytest
+
+from ingest import MissingColumnsError, file_format, normalize_ohlc, read_ohlc, resample_ohlc, stream_resample_csv
+
+# Shuffled MM/DD/YYYY rows across a year boundary: as strings, "01/..."
+# sorts before "12/..." although December 2024 comes first
+US_DATES_CSV = """Date,Open,High,Low,Close
+01/03/2025,103,106,101,105
+12/30/2024,100,102,98,101
+01/02/2025,101,104,100,103
+12/31/2024,101,103,99,102
+not a date,1,1,1,1
+01/06/2025,105,108,104,107
+"""
+
+
+def test_normalize_parses_before_sorting():
+    df = normalize_ohlc(read_ohlc(US_DATES_CSV.encode(), "us.csv"))
+    assert df["Date"].dt.strftime("%Y-%m-%d").tolist() == [
+        "2024-12-30", "2024-12-31", "2025-01-02", "2025-01-03", "2025-01-06"]
+    assert df["Close"].tolist() == [101, 102, 103, 105, 107]
+
+
+def test_normalize_sorts_parsed_dates_stably():
+    dates = pd.to_datetime(["2025-01-03", "2024-12-30", None, "2025-01-03"])
+    df = normalize_ohlc(pd.DataFrame({"Date": dates, "High": 1.0, "Low": 1.0, "Close": [3.0, 1.0, 9.0, 4.0]}))
+    assert df["Close"].tolist() == [1.0, 3.0, 4.0]
+    assert df.index.tolist() == [0, 1, 2]
+
+
+@pytest.mark.parametrize("data_freq", ["Daily", "Weekly", "Monthly", "Yearly"])
+@pytest.mark.filterwarnings("ignore:Could not infer format")   # a chunk starting at "not a date"
+def test_stream_resample_matches_in_memory(data_freq):
+    data = US_DATES_CSV.encode()
+    expected = resample_ohlc(normalize_ohlc(read_ohlc(data, "us.csv")), data_freq)
+    # Two-row chunks: periods straddle chunks and arrive out of order
+    streamed = stream_resample_csv(io.BytesIO(data), data_freq, chunksize=2)
+    cols = ["Date", "Open", "High", "Low", "Close", "NextDate"]
+    pd.testing.assert_frame_equal(streamed[cols].reset_index(drop=True), expected[cols].reset_index(drop=True),
+                                  check_dtype=False)
+
+
+@pytest.mark.parametrize("name", ["data.csv", "data.parquet", "data.arrow", "data.xlsx"])
+def test_readers_agree(tmp_path, sample_ohlc, name):
+    path = tmp_path / name
+    fmt = file_format(name)
+    if fmt == "csv":
+        sample_ohlc.to_csv(path, index=False)
+    elif fmt == "parquet":
+        sample_ohlc.to_parquet(path, index=False)
+    elif fmt == "arrow":
+        sample_ohlc.to_feather(path)
+    else:
+        sample_ohlc.to_excel(path, index=False)
+    df = normalize_ohlc(read_ohlc(str(path), name))
+    pd.testing.assert_frame_equal(df, sample_ohlc, check_dtype=False)
+    compact = read_ohlc(str(path), name, price_dtype="float32")
+    assert compact["Close"].dtype == "float32"
+
+
+def test_unsupported_and_missing_columns():
+    with pytest.raises(ValueError):
+        file_format("prices.doc")
+    with pytest.raises(MissingColumnsError):
+        read_ohlc(b"Date,High,Low\n2024-01-02,2,1\n", "x.csv")
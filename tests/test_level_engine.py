@@ -0,0 +1,122 @@
+"""The vectorized level engine against the original app's scalar formulas.
+
+``baseline_levels`` is a direct port of the CPR, classic and Camarilla code
+in the first version of stock_market_analysis_v2.py, evaluated one period
+at a time; every row of the engine output must agree with it.
+"""
+import numpy as np
+import pytest
+
+from level_engine import (ALL_FAMILIES, LEVEL_COLUMNS, compute_levels, family_columns, levels_frame,
+                          next_period_levels, shift_levels, tail_levels)
+
+
+def baseline_levels(high, low, close):
+    pivot = (high + low + close) / 3
+    bc = (high + low) / 2
+    tc = pivot + (pivot - bc)
+    swapped = bc > tc
+    if swapped:
+        tc, bc = bc, tc
+    r1 = (2 * pivot) - low
+    s1 = (2 * pivot) - high
+    r2 = pivot + (high - low)
+    s2 = pivot - (high - low)
+    r3 = r1 + (high - low)
+    s3 = s1 - (high - low)
+    r4 = r3 + (r2 - r1)
+    s4 = s3 - (s1 - s2)
+    r5 = r4 + (r2 - r1)
+    s5 = s4 - (s1 - s2)
+    rng = high - low
+    return {
+        "Pivot": pivot, "BC": bc, "TC": tc, "Swapped": swapped,
+        "R1": r1, "R2": r2, "R3": r3, "R4": r4, "R5": r5, "S1": s1, "S2": s2, "S3": s3, "S4": s4, "S5": s5,
+        "Cam_R4": close + rng * 1.1 / 2, "Cam_R3": close + rng * 1.1 / 4,
+        "Cam_R2": close + rng * 1.1 / 6, "Cam_R1": close + rng * 1.1 / 12,
+        "Cam_S1": close - rng * 1.1 / 12, "Cam_S2": close - rng * 1.1 / 6,
+        "Cam_S3": close - rng * 1.1 / 4, "Cam_S4": close - rng * 1.1 / 2,
+    }
+
+
+def test_levels_match_baseline(history):
+    high, low, close, _ = history
+    levels = compute_levels(high, low, close)
+    for i in range(len(close)):
+        expected = baseline_levels(high[i], low[i], close[i])
+        assert bool(levels["Swapped"][i]) == expected.pop("Swapped"), i
+        for name, value in expected.items():
+            assert float(levels[name][i]) == pytest.approx(value, rel=1e-12), (i, name)
+
+
+def test_next_period_is_the_last_row(sample_ohlc):
+    df = sample_ohlc
+    levels = compute_levels(df["High"], df["Low"], df["Close"])
+    nxt = next_period_levels(levels)
+    last = df.iloc[-1]
+    expected = baseline_levels(last["High"], last["Low"], last["Close"])
+    assert nxt["Swapped"] == expected.pop("Swapped")
+    assert nxt == pytest.approx({**expected, "Range": last["High"] - last["Low"], "Swapped": nxt["Swapped"]})
+
+
+def test_shift_and_tail(sample_ohlc):
+    df = sample_ohlc
+    levels = compute_levels(df["High"], df["Low"], df["Close"])
+    shifted = shift_levels(levels)
+    assert np.isnan(shifted["TC"][0]) and not shifted["Swapped"][0]
+    np.testing.assert_array_equal(shifted["TC"][1:], levels["TC"][:-1])
+    tail = tail_levels(levels, 2)
+    assert tail["Pivot"].base is not None and len(tail["Pivot"]) == 2
+
+
+def test_float32_and_frame(sample_ohlc):
+    df = sample_ohlc
+    full = compute_levels(df["High"], df["Low"], df["Close"])
+    compact = compute_levels(df["High"], df["Low"], df["Close"], dtype=np.float32)
+    assert compact["R3"].dtype == np.float32
+    np.testing.assert_allclose(compact["R3"], full["R3"], rtol=1e-6)
+    frame = levels_frame(df)
+    assert frame.index.equals(df.index)
+    np.testing.assert_array_equal(frame["Cam_S4"].to_numpy(), full["Cam_S4"])
+
+
+def baseline_families(high, low, close, open_):
+    """Textbook Fibonacci, Woodie and DeMark pivots for one period."""
+    pivot = (high + low + close) / 3
+    rng = high - low
+    woodie = (high + low + 2 * close) / 4
+    if close < open_:
+        x = high + 2 * low + close
+    elif close > open_:
+        x = 2 * high + low + close
+    else:
+        x = high + low + 2 * close
+    return {
+        "Fib_R1": pivot + 0.382 * rng, "Fib_R2": pivot + 0.618 * rng, "Fib_R3": pivot + rng,
+        "Fib_S1": pivot - 0.382 * rng, "Fib_S2": pivot - 0.618 * rng, "Fib_S3": pivot - rng,
+        "Woodie_Pivot": woodie, "Woodie_R1": 2 * woodie - low, "Woodie_S1": 2 * woodie - high,
+        "Woodie_R2": woodie + rng, "Woodie_S2": woodie - rng,
+        "Woodie_R3": high + 2 * (woodie - low), "Woodie_S3": low - 2 * (high - woodie),
+        "DeMark_Pivot": x / 4, "DeMark_R1": x / 2 - low, "DeMark_S1": x / 2 - high,
+    }
+
+
+def test_all_families_match_baseline(history):
+    high, low, close, open_ = history
+    levels = compute_levels(high, low, close, families=ALL_FAMILIES, open_=open_)
+    default = compute_levels(high, low, close)
+    for name in LEVEL_COLUMNS:
+        np.testing.assert_array_equal(levels[name], default[name])
+    opens = close if open_ is None else open_
+    for i in range(len(close)):
+        for name, value in baseline_families(high[i], low[i], close[i], opens[i]).items():
+            assert float(levels[name][i]) == pytest.approx(value, rel=1e-12), (i, name)
+
+
+def test_family_columns():
+    assert family_columns() == LEVEL_COLUMNS
+    assert family_columns(("demark",)) == ("Range", "Pivot", "DeMark_Pivot", "DeMark_R1", "DeMark_S1")
+    with pytest.raises(ValueError, match="Unknown level families"):
+        family_columns(("cpr", "gann"))
+    levels = compute_levels([12.0], [10.0], [11.0], families=("fibonacci",))
+    assert "Swapped" not in levels and set(levels) == set(family_columns(("fibonacci",)))
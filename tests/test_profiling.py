@@ -0,0 +1,49 @@
+"""Stage instrumentation: nesting, peak memory, the table and JSONL output,
+and the no-op path when nothing is recording."""
+import json
+
+import numpy as np
+
+from profiling import begin_stage, current_recorder, end_stage, recording, stage
+
+
+def test_stages_are_noops_without_a_recorder():
+    assert current_recorder() is None
+    with stage("idle"):
+        pass
+    begin_stage("idle")
+    end_stage()
+    assert current_recorder() is None
+
+
+def test_nested_stages_record_depth_and_peak():
+    with recording() as rec:
+        with stage("outer", rows=3):
+            with stage("inner"):
+                buf = np.ones(2**20)     # 8 MB
+                del buf
+            begin_stage("tail")
+            end_stage()
+    assert current_recorder() is None
+    assert [(r["stage"], r["depth"]) for r in rec.records] == [("inner", 1), ("tail", 1), ("outer", 0)]
+    inner, _, outer = rec.records
+    assert inner["peak_bytes"] >= 8 * 2**20
+    assert outer["peak_bytes"] >= inner["peak_bytes"]
+    assert outer["rows"] == 3
+
+    table = rec.frame()
+    assert list(table.columns) == ["Stage", "ms", "Peak MB", "Net MB"]
+    assert list(table["Stage"]) == ["  inner", "  tail", "outer"]
+
+
+def test_write_jsonl_appends_tagged_records(tmp_path):
+    path = tmp_path / "runs" / "stages.jsonl"
+    for _ in range(2):
+        with recording(trace_memory=False) as rec:
+            with stage("load"):
+                pass
+        rec.write_jsonl(path, source="test")
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 2
+    assert all(line["stage"] == "load" and line["source"] == "test" and "run" in line for line in lines)
+    assert lines[0]["peak_bytes"] == 0
@@ -0,0 +1,35 @@
+"""Resample pyramid: every frequency from one daily frame, shareable levels
+and the single-file round trip used by the upload sidecar."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import FREQUENCIES, resample_ohlc
+from pyramid import build_pyramid, frozen_levels, pyramid_levels, split_pyramid, stack_pyramid
+
+
+def test_each_frequency_is_resampled_from_daily(walk_ohlc):
+    frames = build_pyramid(walk_ohlc)
+    assert list(frames) == list(FREQUENCIES)
+    weekly = walk_ohlc.groupby(walk_ohlc["Date"].dt.to_period("W-FRI")).agg(
+        Open=("Open", "first"), High=("High", "max"), Low=("Low", "min"), Close=("Close", "last"))
+    np.testing.assert_allclose(frames["Weekly"][["Open", "High", "Low", "Close"]].to_numpy(), weekly.to_numpy())
+    assert len(frames["Yearly"]) == walk_ohlc["Date"].dt.year.nunique()
+
+
+def test_levels_are_read_only(walk_ohlc):
+    levels = pyramid_levels(build_pyramid(walk_ohlc))
+    with pytest.raises(ValueError):
+        levels["Weekly"]["TC"][0] = 0.0
+    assert frozen_levels(walk_ohlc.astype({"Close": "float32", "High": "float32", "Low": "float32"}))["TC"].dtype \
+        == np.float32
+
+
+def test_stack_round_trip(walk_ohlc):
+    frames = build_pyramid(walk_ohlc)
+    restored = split_pyramid(stack_pyramid(frames))
+    for freq in FREQUENCIES:
+        pd.testing.assert_frame_equal(restored[freq].reset_index(drop=True), frames[freq].reset_index(drop=True),
+                                      check_dtype=False)
+    pd.testing.assert_frame_equal(restored["Monthly"].reset_index(drop=True),
+                                  resample_ohlc(walk_ohlc, "Monthly").reset_index(drop=True), check_dtype=False)
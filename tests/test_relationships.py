@@ -0,0 +1,74 @@
+"""Vectorized relationship classification against the original app's
+scalar if/elif chains, for every consecutive pair of periods."""
+import numpy as np
+import pytest
+
+from level_engine import compute_levels
+from relationships import MISSING, NO_RELATIONSHIP, camarilla_relationships, cpr_relationships, relationship_codes
+
+
+def baseline_cpr_relationship(prev_tc, prev_bc, curr_tc, curr_bc):
+    if curr_bc > prev_tc:
+        return "Higher Value Relationship", "Bullish"
+    elif curr_tc > prev_tc and curr_bc < prev_tc and curr_bc > prev_bc:
+        return "Overlapping Higher Value Relationship", "Moderately Bullish"
+    elif curr_tc < prev_bc:
+        return "Lower Value Relationship", "Bearish"
+    elif curr_tc > prev_bc and curr_tc < prev_tc and curr_bc < prev_bc:
+        return "Overlapping Lower Value Relationship", "Moderately Bearish"
+    elif abs(curr_tc - prev_tc) < 0.05 and abs(curr_bc - prev_bc) < 0.05:
+        return "Unchanged Value Relationship", "Sideways/Breakout"
+    elif curr_tc > prev_tc and curr_bc < prev_bc:
+        return "Outside Value Relationship", "Sideways"
+    elif curr_tc < prev_tc and curr_bc > prev_bc:
+        return "Inside Value Relationship", "Breakout"
+    return "No Clear Relationship", "Neutral"
+
+
+def baseline_ce_relationship(prev_R3, prev_S3, curr_R3, curr_S3, data_freq):
+    if curr_S3 > prev_R3:
+        return f"CE Higher Value {data_freq} Relationship", "Bullish"
+    elif curr_R3 > prev_R3 and curr_S3 < prev_R3 and curr_S3 > prev_S3:
+        return f"CE Overlapping Higher Value {data_freq} Relationship", "Moderately Bullish"
+    elif curr_R3 < prev_S3:
+        return f"CE Lower Value {data_freq} Relationship", "Bearish"
+    elif curr_R3 < prev_R3 and curr_S3 < prev_S3 and curr_R3 > prev_S3:
+        return f"CE Overlapping Lower Value {data_freq} Relationship", "Moderately Bearish"
+    elif abs(curr_R3 - prev_R3) < 0.05 and abs(curr_S3 - prev_S3) < 0.05:
+        return f"CE Unchanged Value {data_freq} Relationship", "Sideways/Breakout"
+    elif curr_R3 > prev_R3 and curr_S3 < prev_S3:
+        return f"CE Outside Value {data_freq} Relationship", "Sideways"
+    elif curr_R3 < prev_R3 and curr_S3 > prev_S3:
+        return f"CE Inside Value {data_freq} Relationship", "Breakout"
+    return "Not satisfying any of the conditions", "Unknown"
+
+
+def test_relationships_match_baseline(history):
+    high, low, close, _ = history
+    levels = compute_levels(high, low, close)
+    tc, bc, r3, s3 = (levels[name].tolist() for name in ("TC", "BC", "Cam_R3", "Cam_S3"))
+    cpr = cpr_relationships(levels["TC"], levels["BC"])
+    ce = camarilla_relationships(levels["Cam_R3"], levels["Cam_S3"], "Weekly")
+    assert cpr.iloc[0].isna().all() and ce.iloc[0].isna().all()
+    for i in range(1, len(close)):
+        assert tuple(cpr.iloc[i]) == baseline_cpr_relationship(tc[i - 1], bc[i - 1], tc[i], bc[i]), i
+        assert tuple(ce.iloc[i]) == baseline_ce_relationship(r3[i - 1], s3[i - 1], r3[i], s3[i], "Weekly"), i
+
+
+def test_walk_covers_every_relationship(walk_ohlc):
+    levels = compute_levels(walk_ohlc["High"], walk_ohlc["Low"], walk_ohlc["Close"])
+    codes = relationship_codes(levels["TC"][:-1], levels["BC"][:-1], levels["TC"][1:], levels["BC"][1:])
+    assert set(range(NO_RELATIONSHIP)) <= set(codes.tolist())
+
+
+def test_missing_inputs_are_missing():
+    codes = relationship_codes([10.0, np.nan], [9.0, 9.0], [12.0, 12.0], [11.0, 11.0])
+    assert codes.tolist() == [0, MISSING]
+    assert cpr_relationships([10.0, np.nan, 12.0], [9.0, 9.0, 11.0]).iloc[1:].isna().all().all()
+
+
+@pytest.mark.parametrize("threshold, expected", [(0.05, "Unchanged Value Relationship"),
+                                                 (0.01, "Outside Value Relationship")])
+def test_unchanged_threshold(threshold, expected):
+    out = cpr_relationships([100.0, 100.02], [99.0, 98.98], unchanged_threshold=threshold)
+    assert out["Relationship"].iloc[1] == expected
@@ -0,0 +1,52 @@
+"""Headless report CLI: input expansion, the written table and its
+lightweight imports."""
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from analysis import analyze_ohlc, prepare_ohlc
+from conftest import ROOT, make_walk
+from report import expand_inputs, main
+
+
+def _write_inputs(tmp_path):
+    make_walk(n=60, seed=1).to_csv(tmp_path / "AAA.csv", index=False)
+    make_walk(n=80, seed=2).to_parquet(tmp_path / "BBB.parquet", index=False)
+    (tmp_path / "notes.txt").write_text("Date,High\n", encoding="utf-8")
+    (tmp_path / "readme.md").write_text("ignored", encoding="utf-8")
+
+
+def test_expand_inputs(tmp_path):
+    _write_inputs(tmp_path)
+    names = [os.path.basename(p) for p in expand_inputs([str(tmp_path), str(tmp_path / "*.csv")])]
+    assert names == ["AAA.csv", "BBB.parquet", "notes.txt"]
+
+
+def test_main_writes_next_period_rows(tmp_path, capsys):
+    _write_inputs(tmp_path)
+    output = tmp_path / "out" / "report.csv"
+    output.parent.mkdir()
+    assert main([str(tmp_path), "--freq", "Weekly", "--workers", "1", "--output", str(output)]) == 0
+    assert "Skipping" in capsys.readouterr().err      # notes.txt has no Low/Close
+    report = pd.read_csv(output)
+    assert report["Symbol"].tolist() == ["AAA", "BBB"]
+    expected = analyze_ohlc(prepare_ohlc(make_walk(n=80, seed=2)), "Weekly").iloc[-1]
+    row = report.iloc[1]
+    assert row["TC"] == pytest.approx(expected["TC"]) and row["CPR_Relationship"] == expected["CPR_Relationship"]
+
+
+def test_history_and_json(tmp_path):
+    _write_inputs(tmp_path)
+    output = tmp_path / "report.json"
+    assert main([str(tmp_path / "AAA.csv"), "--history", "--output", str(output)]) == 0
+    assert len(pd.read_json(output)) == 60
+
+
+def test_imports_stay_headless():
+    code = ("import sys, report; "
+            "print(sorted({m.split('.')[0] for m in sys.modules} & {'streamlit', 'plotly', 'matplotlib'}))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,92 @@
+"""Screener: indexed queries against a plain pandas filter, incremental
+refreshes, duplicate file names, persistence and history-store sources."""
+import os
+
+import numpy as np
+import pytest
+
+from conftest import make_walk
+from history_store import HistoryStore
+from screener import Screener
+
+
+@pytest.fixture
+def universe_dir(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    for i in range(8):
+        make_walk(n=120, seed=i).to_csv(data / f"SYM{i}.csv", index=False)
+    return data
+
+
+def _paths(directory):
+    return sorted(str(p) for p in directory.iterdir())
+
+
+def test_query_matches_pandas_filter(universe_dir):
+    screener = Screener()
+    updated, errors = screener.refresh(_paths(universe_dir), max_workers=1)
+    assert errors == {} and sorted(updated) == [f"SYM{i}" for i in range(8)]
+    table = screener.table
+
+    label = table["CPR_Relationship"].iloc[0]
+    bound = float(table["CPR_WidthPct"].median())
+    result = screener.query({"CPR_Relationship": [label]}, max_value=bound)
+    expected = table[(table["CPR_Relationship"] == label) & (table["CPR_WidthPct"] <= bound)]
+    assert list(result["Symbol"]) == list(expected.sort_values("CPR_WidthPct", kind="stable")["Symbol"])
+
+    widest = screener.query(sort_by="Cam_WidthPct", ascending=False, top=3)
+    assert list(widest["Cam_WidthPct"]) == sorted(table["Cam_WidthPct"], reverse=True)[:3]
+    assert screener.match_labels("CPR_Relationship", label.lower()[:6]) == [
+        lab for lab in screener.labels("CPR_Relationship") if label.lower()[:6] in lab.lower()]
+
+
+def test_refresh_only_reanalyzes_changed_files(universe_dir):
+    screener = Screener()
+    screener.refresh(_paths(universe_dir), max_workers=1)
+    assert screener.refresh(_paths(universe_dir), max_workers=1) == ([], {})
+
+    make_walk(n=130, seed=42).to_csv(universe_dir / "SYM3.csv", index=False)
+    os.utime(universe_dir / "SYM3.csv", ns=(0, 10**18))
+    updated, _ = screener.refresh(_paths(universe_dir), max_workers=1)
+    assert updated == ["SYM3"] and len(screener) == 8
+
+    os.remove(universe_dir / "SYM5.csv")
+    screener.refresh(_paths(universe_dir), max_workers=1, prune=True)
+    assert "SYM5" not in set(screener.table["Symbol"]) and len(screener) == 7
+
+
+def test_duplicate_file_names_are_rejected(universe_dir, tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    make_walk(n=120, seed=99).to_csv(other / "SYM1.csv", index=False)
+    paths = _paths(universe_dir) + [str(other / "SYM1.csv")]
+    screener = Screener()
+    updated, errors = screener.refresh(paths, max_workers=1)
+    assert sorted(errors) == sorted([str(universe_dir / "SYM1.csv"), str(other / "SYM1.csv")])
+    assert "SYM1" not in updated and len(screener) == 7
+    assert screener.table["Source"].is_unique
+
+
+def test_save_and_parameter_rebuild(universe_dir, tmp_path):
+    db = str(tmp_path / "screener.parquet")
+    screener = Screener(db, data_freq="Weekly")
+    screener.refresh(_paths(universe_dir), max_workers=1)
+    screener.save()
+
+    reopened = Screener(db)
+    assert reopened.data_freq == "Weekly" and not reopened.rebuilt and len(reopened) == 8
+    np.testing.assert_array_equal(reopened.query(top=8)["Symbol"], screener.query(top=8)["Symbol"])
+    changed = Screener(db, data_freq="Daily")
+    assert changed.rebuilt and len(changed) == 0
+
+
+def test_refresh_store_tracks_stored_rows(tmp_path, walk_ohlc):
+    store = HistoryStore(str(tmp_path / "store"))
+    store.append("WALK", walk_ohlc.iloc[:300])
+    screener = Screener()
+    assert screener.refresh_store(store) == (["WALK"], {})
+    assert screener.refresh_store(store) == ([], {})
+    store.append("WALK", walk_ohlc.iloc[300:])
+    assert screener.refresh_store(store)[0] == ["WALK"]
+    assert screener.table["Date"].iloc[0] == walk_ohlc["Date"].iloc[-1]
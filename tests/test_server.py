@@ -0,0 +1,120 @@
+"""LevelService and the HTTP handler: the symbol in each response, the
+response cache and the mapping of bad input to status codes."""
+import http.client
+import json
+import threading
+
+import pandas as pd
+import pytest
+
+from conftest import make_walk
+from server import LevelService, RequestError, ResponseCache, make_server, parse_params
+
+PARAMS = parse_params({})
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = LevelService(store_dir=str(tmp_path / "store"), max_workers=2, threads=True)
+    yield service
+    service.close()
+
+
+@pytest.fixture(scope="module")
+def walk_csv():
+    return make_walk(n=60).to_csv(index=False).encode()
+
+
+def _json(body):
+    return json.loads(body.decode("utf-8"))
+
+
+def test_same_upload_under_two_names(service, walk_csv):
+    nifty = _json(service.levels_upload(walk_csv, "NIFTY.csv", PARAMS))
+    bank = _json(service.levels_upload(walk_csv, "BANKNIFTY.csv", PARAMS))
+    assert (nifty["symbol"], bank["symbol"]) == ("NIFTY", "BANKNIFTY")
+    assert nifty["rows"] == bank["rows"] and len(nifty["rows"]) == 1
+    stats = service.cache.stats()
+    assert (stats["hits"], stats["entries"]) == (1, 1)
+
+
+def test_params_are_part_of_the_key(service, walk_csv):
+    daily = _json(service.levels_upload(walk_csv, "NIFTY.csv", PARAMS))
+    weekly = _json(service.levels_upload(walk_csv, "NIFTY.csv", parse_params({"freq": ["Weekly"]})))
+    assert (daily["frequency"], weekly["frequency"]) == ("Daily", "Weekly")
+    assert service.cache.stats()["hits"] == 0
+
+
+def test_batch_keeps_symbols_with_identical_bars(service):
+    bars = make_walk(n=30)
+    universe = pd.concat([bars.assign(Symbol="AAA"), bars.assign(Symbol="BBB")])
+    data = universe.to_csv(index=False).encode()
+    body = _json(service.batch_upload(data, "universe.csv", PARAMS))
+    assert [r["symbol"] for r in body["results"]] == ["AAA", "BBB"]
+    assert body["results"][0]["rows"] == body["results"][1]["rows"]
+    assert body["errors"] == {}
+    # Repeating the batch is served from its cached body
+    assert _json(service.batch_upload(data, "universe.csv", PARAMS)) == body
+
+
+def test_stored_symbol_refreshes_after_append(service):
+    bars = make_walk(n=80)
+    service.store.append("NIFTY", bars.iloc[:60])
+    first = _json(service.levels_stored("NIFTY", PARAMS))
+    assert first["symbol"] == "NIFTY"
+    assert _json(service.levels_stored("NIFTY", PARAMS)) == first
+    assert service.cache.stats()["hits"] == 1
+
+    service.store.append("NIFTY", bars.iloc[60:])
+    refreshed = _json(service.levels_stored("NIFTY", PARAMS))
+    assert refreshed["rows"][0]["Date"] != first["rows"][0]["Date"]
+    with pytest.raises(RequestError) as e:
+        service.levels_stored("SENSEX", PARAMS)
+    assert e.value.status == 404
+
+
+def test_response_cache_is_bounded_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"          # "a" is now the most recent
+    cache.put("c", b"1234")
+    assert cache.get("b") is None and cache.get("c") == b"1234"
+    cache.put("d", b"12345678")                # over 10 bytes with anything else
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == 8
+    cache.put("e", b"x" * 11)                  # larger than the cache: never stored
+    assert cache.get("e") is None and cache.get("d") == b"12345678"
+
+
+def test_parse_params_rejects_unknown_values():
+    for query in ({"freq": ["Hourly"]}, {"market": ["Moon"]}, {"families": ["nope"]}, {"tolerance": ["x"]}):
+        with pytest.raises(RequestError):
+            parse_params(query)
+
+
+def test_http_status_codes(walk_csv):
+    server = make_server(port=0, service=LevelService(max_workers=1, threads=True))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        conn = http.client.HTTPConnection(*server.server_address, timeout=30)
+
+        def call(method, path, body=None):
+            conn.request(method, path, body=body)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+
+        status, body = call("POST", "/levels?name=NIFTY.csv", walk_csv)
+        assert (status, body["symbol"]) == (200, "NIFTY")
+        assert call("POST", "/levels?freq=Hourly", walk_csv)[0] == 400
+        one_row = b"\n".join(walk_csv.splitlines()[:2])
+        assert call("POST", "/levels?name=one.csv", one_row)[0] == 400     # fewer than 2 periods
+        assert call("POST", "/levels?name=data.doc", walk_csv)[0] == 400
+        assert call("GET", "/levels/NIFTY")[0] == 404       # no history store configured
+        assert call("GET", "/nowhere")[0] == 404
+        assert call("GET", "/health")[1]["cache"]["entries"] == 1
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
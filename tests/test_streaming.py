@@ -0,0 +1,93 @@
+"""Streaming aggregator: bar parsing, publishing at period close and at the
+session close, and sources that survive malformed lines."""
+import asyncio
+from datetime import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import analyze_periods
+from streaming import LineParser, StreamingAggregator, parse_bar, tail_file
+
+
+def _minute_bars(days=6, per_day=5, seed=3):
+    rng = np.random.default_rng(seed)
+    bars = []
+    for day in pd.bdate_range("2024-01-01", periods=days):
+        for minute in range(per_day):
+            close = 100 + rng.normal(0, 1)
+            bars.append({"Date": day + pd.Timedelta(hours=9, minutes=15 + minute), "Open": close - 0.2,
+                         "High": close + rng.uniform(0.1, 1), "Low": close - rng.uniform(0.3, 1), "Close": close})
+    return bars
+
+
+def test_parse_bar_positional_json_and_header():
+    assert parse_bar("2024-01-02 09:15,101,99,100") == {
+        "Date": pd.Timestamp("2024-01-02 09:15"), "Open": None, "High": 101.0, "Low": 99.0, "Close": 100.0}
+    assert parse_bar("2024-01-02 09:15,100.5,101,99,100,12345")["Open"] == 100.5
+    assert parse_bar('{"Date": "2024-01-02 09:15", "High": 101, "Low": 99, "Close": 100}')["Open"] is None
+    header = ("Symbol", "Date", "Close", "Low", "High")
+    assert parse_bar("NIFTY,2024-01-02 09:15,100,99,101", header)["High"] == 101.0
+    assert parse_bar("Date,Open,High,Low,Close") is None and parse_bar("  ") is None
+
+
+def test_line_parser_follows_header_and_skips_bad_lines(capsys):
+    parse = LineParser()
+    assert parse("Date,High,Low,Close,Open\n") is None
+    assert parse("2024-01-02 09:15,101,99,100,100.5\n")["Open"] == 100.5
+    for line in ('{"Date": "2024-01-02", "High": 1}', "oops,1,2,3", "2024-01-02,a,b,c,d", "{not json"):
+        assert parse(line) is None
+    assert capsys.readouterr().err.count("Skipping line") == 4
+
+
+def test_publishes_each_closed_day_like_the_full_analysis():
+    bars = _minute_bars()
+    aggregator = StreamingAggregator("X")
+    published = [levels for bar in bars for levels in aggregator.on_bar(bar)]
+    daily = [p for p in published if p["Frequency"] == "Daily"]
+    assert len(daily) == 5     # the last day is still open
+
+    minutes = pd.DataFrame(bars)
+    days = minutes.groupby(minutes["Date"].dt.normalize()).agg(
+        Open=("Open", "first"), High=("High", "max"), Low=("Low", "min"), Close=("Close", "last")).reset_index()
+    full = analyze_periods(days, "Daily")
+    for levels, (_, row) in zip(daily, full.iloc[:-1].iterrows()):
+        assert pd.Timestamp(levels["Period"]) == row["Date"]
+        assert levels["TC"] == pytest.approx(row["TC"]) and levels["Cam_R3"] == pytest.approx(row["Cam_R3"])
+        assert levels["GPZ"] == row["GPZ"]
+        assert levels["CPR_Relationship"] == (None if pd.isna(row["CPR_Relationship"]) else row["CPR_Relationship"])
+    assert daily[0]["CPR_Relationship"] is None
+
+
+def test_session_close_and_late_bar_republish():
+    aggregator = StreamingAggregator("X", session_close=time(15, 30))
+    day = pd.Timestamp("2024-01-02")
+    bar = {"Open": 100.0, "High": 101.0, "Low": 99.0, "Close": 100.0}
+    assert aggregator.on_bar(dict(bar, Date=day + pd.Timedelta(hours=9))) == []
+    at_close = aggregator.on_bar(dict(bar, Date=day + pd.Timedelta(hours=15, minutes=30), High=105.0))
+    assert [p["Frequency"] for p in at_close] == ["Daily"]
+    # A late bar the same day changes the day: it is published again
+    late = aggregator.on_bar(dict(bar, Date=day + pd.Timedelta(hours=15, minutes=45), Low=90.0))
+    assert [p["Frequency"] for p in late] == ["Daily"]
+    assert late[0]["Pivot"] == pytest.approx((105.0 + 90.0 + 100.0) / 3)
+    # ... and not a third time when the next day starts
+    next_day = aggregator.on_bar(dict(bar, Date=day + pd.Timedelta(days=1, hours=9)))
+    assert "Daily" not in [p["Frequency"] for p in next_day]
+
+
+def test_tail_file_survives_malformed_lines(tmp_path):
+    path = tmp_path / "bars.csv"
+    path.write_text("Date,High,Low,Close\n2024-01-02 09:15,101,99,100\n2024-01-02 09:16,bad\n"
+                    "2024-01-02 09:17,102,100,101\n", encoding="utf-8")
+
+    async def run():
+        queue = asyncio.Queue()
+        producer = asyncio.create_task(tail_file(str(path), queue, poll_interval=0.01))
+        bars = [await asyncio.wait_for(queue.get(), 5) for _ in range(2)]
+        alive = not producer.done()
+        producer.cancel()
+        return bars, alive
+
+    bars, alive = asyncio.run(run())
+    assert alive and [b["Close"] for b in bars] == [100.0, 101.0]
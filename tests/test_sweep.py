@@ -0,0 +1,63 @@
+"""Parameter sweep: cells equal to the plain backtest, the shared-memory
+pool equal to the serial path, and the per-dataset cell cache."""
+import pandas as pd
+import pytest
+
+from backtest import STAT_COLUMNS, SIGNALS, backtest_universe
+from conftest import make_walk
+import sweep as sweep_module
+from sweep import PARAM_COLUMNS, SweepCache, sweep
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return {"A": make_walk(n=250, seed=1), "B": make_walk(n=250, seed=2)}
+
+
+def test_default_cell_matches_backtest(frames):
+    results, errors = sweep(frames, max_workers=1, cache=SweepCache())
+    assert errors == {}
+    expected, _ = backtest_universe(frames)
+    gpz = results[results["Signal"].isin(list(SIGNALS))].set_index("Signal")
+    gpz.index = gpz.index.astype(str)
+    pd.testing.assert_frame_equal(gpz[list(STAT_COLUMNS)].loc[list(SIGNALS)], expected[list(STAT_COLUMNS)])
+
+
+def test_pool_matches_serial(frames):
+    grid = {"tolerance_pcts": (0.001, 0.004), "multipliers": (1.0, 1.1), "unchanged_thresholds": (0.05,)}
+    serial, _ = sweep(frames, max_workers=1, cache=SweepCache(), **grid)
+    pooled, _ = sweep(frames, max_workers=2, cache=SweepCache(), **grid)
+    pd.testing.assert_frame_equal(serial, pooled)
+    assert len(serial.drop_duplicates(list(PARAM_COLUMNS))) == 4
+
+
+def test_cache_computes_only_new_cells(frames, tmp_path, monkeypatch):
+    cache = SweepCache(cache_dir=str(tmp_path))
+    first, _ = sweep(frames, tolerance_pcts=(0.001,), max_workers=1, cache=cache)
+
+    computed = []
+    run_tasks = sweep_module._run_tasks
+
+    def recording_run_tasks(prices, lengths, tasks, max_workers):
+        computed.extend(tasks)
+        return run_tasks(prices, lengths, tasks, max_workers)
+
+    monkeypatch.setattr(sweep_module, "_run_tasks", recording_run_tasks)
+    wider, _ = sweep(frames, tolerance_pcts=(0.001, 0.002), max_workers=1, cache=cache)
+    assert [cells for _, cells in computed] == [[(0.002, 0.05)]]
+    pd.testing.assert_frame_equal(wider[wider["TolerancePct"] == 0.001].reset_index(drop=True), first)
+
+    # A new cache over the same directory reads the Parquet file instead
+    computed.clear()
+    sweep(frames, tolerance_pcts=(0.001, 0.002), max_workers=1, cache=SweepCache(cache_dir=str(tmp_path)))
+    assert computed == []
+
+
+def test_memory_cache_is_bounded():
+    cache = SweepCache(max_entries=2)
+    for digest in ("a", "b", "c"):
+        cache.put(digest, pd.DataFrame({"x": [1]}))
+    assert cache.get("a") is None and cache.get("c") is not None
+    cache.get("b")
+    cache.put("d", pd.DataFrame({"x": [1]}))
+    assert cache.get("b") is not None and cache.get("c") is None
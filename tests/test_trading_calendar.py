@@ -0,0 +1,58 @@
+"""Trading calendars: next sessions across weekends and a holiday file,
+for every frequency, and the always-open Bitcoin calendar."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trading_calendar import get_calendar, market_calendar, read_holidays
+
+
+@pytest.fixture
+def calendar_dir(tmp_path):
+    (tmp_path / "XTST.csv").write_text("date,name\n# comment\n2025-10-21,Diwali\n2025-12-25\n2026-01-01,New Year\n")
+    return str(tmp_path)
+
+
+def test_read_holidays_skips_headers_and_comments(calendar_dir):
+    days = read_holidays(os.path.join(calendar_dir, "XTST.csv"))
+    assert list(days.astype(str)) == ["2025-10-21", "2025-12-25", "2026-01-01"]
+
+
+@pytest.mark.parametrize("date, data_freq, expected", [
+    ("2025-10-17", "Daily", "2025-10-20"),     # Friday -> Monday
+    ("2025-10-20", "Daily", "2025-10-22"),     # Diwali skipped
+    ("2025-10-17", "Weekly", "2025-10-20"),
+    ("2025-10-13", "Weekly", "2025-10-20"),
+    ("2025-11-15", "Monthly", "2025-12-01"),
+    ("2025-12-24", "Daily", "2025-12-26"),
+    ("2025-12-31", "Yearly", "2026-01-02"),    # 1 January is a holiday
+])
+def test_next_session_across_holidays(calendar_dir, date, data_freq, expected):
+    calendar = get_calendar("XTST", calendar_dir)
+    assert calendar.next_session(date, data_freq) == pd.Timestamp(expected)
+
+
+def test_next_sessions_is_vectorized(calendar_dir):
+    calendar = get_calendar("XTST", calendar_dir)
+    dates = pd.to_datetime(["2025-10-17", "2025-10-20", "2025-12-24"]).to_numpy()
+    sessions = calendar.next_sessions(dates)
+    assert sessions.dtype == "datetime64[ns]"
+    assert list(pd.DatetimeIndex(sessions).strftime("%Y-%m-%d")) == ["2025-10-20", "2025-10-22", "2025-12-26"]
+    assert not calendar.is_session(np.array(["2025-10-21"], dtype="datetime64[D]"))[0]
+
+
+def test_calendar_is_rebuilt_when_the_file_changes(calendar_dir):
+    path = os.path.join(calendar_dir, "XTST.csv")
+    assert get_calendar("XTST", calendar_dir).next_session("2025-10-23") == pd.Timestamp("2025-10-24")
+    with open(path, "a") as f:
+        f.write("2025-10-24,Extra\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert get_calendar("XTST", calendar_dir).next_session("2025-10-23") == pd.Timestamp("2025-10-27")
+
+
+def test_unknown_exchange_trades_weekdays_and_bitcoin_never_closes(tmp_path):
+    assert get_calendar("NONE", str(tmp_path)).next_session("2025-10-17") == pd.Timestamp("2025-10-20")
+    assert market_calendar("Bitcoin").next_session("2025-10-17") == pd.Timestamp("2025-10-18")
@@ -0,0 +1,62 @@
+"""Width statistics: the streaming tracker against the rolling pandas
+kernels, a brute-force percentile rank and the NaN handling."""
+import numpy as np
+import pytest
+
+from level_engine import compute_levels
+from width_stats import RollingWidthStats, WidthTracker, rolling_width_stats, width_pct, width_stats
+
+
+def test_width_pct_formulas(walk_ohlc):
+    levels = compute_levels(walk_ohlc["High"], walk_ohlc["Low"], walk_ohlc["Close"])
+    widths = width_pct(levels, walk_ohlc["Close"])
+    close = walk_ohlc["Close"].to_numpy()
+    np.testing.assert_allclose(widths["CPR"], (levels["TC"] - levels["BC"]) / close * 100)
+    np.testing.assert_allclose(widths["Cam"], (walk_ohlc["High"] - walk_ohlc["Low"]) * 1.1 / 2 / close * 100)
+
+
+def test_rank_matches_brute_force():
+    rng = np.random.default_rng(5)
+    values = np.round(rng.gamma(2.0, 0.1, 300), 2)        # rounded, so ties occur
+    window, min_periods = 20, 5
+    mean, z, rank = rolling_width_stats(values, window, min_periods)
+    for i in range(len(values)):
+        trailing = values[max(0, i - window + 1):i + 1]
+        if len(trailing) < min_periods:
+            assert np.isnan(mean[i]) and np.isnan(rank[i])
+            continue
+        assert mean[i] == pytest.approx(trailing.mean())
+        assert rank[i] == pytest.approx((trailing <= values[i]).mean() * 100)
+        assert z[i] == pytest.approx((values[i] - trailing.mean()) / trailing.std(ddof=1))
+
+
+@pytest.mark.parametrize("window", [1, 2, 20])
+def test_streaming_matches_rolling(walk_ohlc, window):
+    high, low, close = (walk_ohlc[col].to_numpy() for col in ("High", "Low", "Close"))
+    expected = width_stats(compute_levels(high, low, close), close, window=window, min_periods=5)
+    tracker = WidthTracker(window, min_periods=5)
+    for i in range(len(close)):
+        row = tracker.stats(high[i], low[i], close[i])
+        for col, value in row.items():
+            assert value == pytest.approx(expected[col].iloc[i], rel=1e-9, abs=1e-9, nan_ok=True), (i, col)
+        tracker.push(high[i], low[i], close[i])
+
+
+def test_tracker_round_trips_through_its_state(walk_ohlc):
+    high, low, close = (walk_ohlc[col].to_numpy() for col in ("High", "Low", "Close"))
+    seeded = WidthTracker.from_periods(high[:-1], low[:-1], close[:-1])
+    restored = WidthTracker(history=seeded.to_dict())
+    assert restored.stats(high[-1], low[-1], close[-1]) == seeded.stats(high[-1], low[-1], close[-1])
+    expected = width_stats(compute_levels(high, low, close), close).iloc[-1]
+    assert seeded.stats(high[-1], low[-1], close[-1])["CPR_WidthPctRank"] == expected["CPR_WidthPctRank"]
+
+
+def test_nan_widths_keep_their_window_slot():
+    values = [1.0, np.nan, 3.0, 2.0, 5.0, np.nan, 4.0]
+    stats = RollingWidthStats(window=4, min_periods=2)
+    mean, z, rank = rolling_width_stats(values, 4, 2)
+    for i, value in enumerate(values):
+        got = stats.stats(value)
+        assert got == pytest.approx((mean[i], z[i], rank[i]), nan_ok=True), i
+        stats.push(value)
+    assert len(stats.values()) == 3
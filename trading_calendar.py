@@ -0,0 +1,98 @@
+"""Exchange trading calendars for next-session dates.
+
+A calendar is a NumPy business-day calendar: a weekmask plus the exchange's
+holidays, sorted once into a busdaycalendar. Mapping a whole array of
+period dates to the session that opens the following period is then one
+vectorized np.busday_offset call, for every frequency: the next day, the
+next Monday, the 1st of the next month or 1 January, each rolled forward
+past weekends and holidays.
+
+Holiday lists are local files, one per exchange, in CALENDAR_DIR (env
+CPR_CALENDAR_DIR, default ``calendars`` next to this module)::
+
+    calendars/XNSE.csv      one holiday per line: 2025-10-21[,Diwali]
+
+Lines whose first field is not a YYYY-MM-DD date (headers, comments) are
+skipped. An exchange without a file trades Monday to Friday; Bitcoin
+trades every day. Calendars are cached per exchange and file modification
+time, so they are built once per process and rebuilt only when a holiday
+file changes.
+"""
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+from ingest import next_period_days
+
+CALENDAR_DIR = os.environ.get("CPR_CALENDAR_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  "calendars")
+CALENDAR_EXTENSIONS = (".csv", ".txt")
+DEFAULT_EXCHANGE = os.environ.get("CPR_EXCHANGE", "XNSE")
+ALWAYS_OPEN = "24x7"
+
+WEEKDAYS = "1111100"
+EVERY_DAY = "1111111"
+
+
+class TradingCalendar:
+    """Sessions of one exchange: trading weekdays minus holidays."""
+
+    def __init__(self, name, holidays=(), weekmask=WEEKDAYS):
+        self.name = name
+        self.busdaycal = np.busdaycalendar(weekmask=weekmask, holidays=np.asarray(holidays, dtype="datetime64[D]"))
+
+    @property
+    def holidays(self):
+        return self.busdaycal.holidays
+
+    def is_session(self, dates):
+        return np.is_busday(np.asarray(dates).astype("datetime64[D]"), busdaycal=self.busdaycal)
+
+    def next_sessions(self, dates, data_freq="Daily"):
+        """Session opening the period after each of ``dates``, as datetime64[ns]."""
+        starts = next_period_days(dates, data_freq)
+        return np.busday_offset(starts, 0, roll="forward", busdaycal=self.busdaycal).astype("datetime64[ns]")
+
+    def next_session(self, date, data_freq="Daily"):
+        """next_sessions for one date, as a Timestamp."""
+        return pd.Timestamp(self.next_sessions(np.array([pd.Timestamp(date).to_datetime64()]), data_freq)[0])
+
+
+def read_holidays(path):
+    """Holiday dates (datetime64[D]) from a one-date-per-line file."""
+    with open(path, encoding="utf-8") as f:
+        fields = [line.split(",", 1)[0].strip() for line in f]
+    days = pd.to_datetime(pd.Series(fields, dtype=object), format="%Y-%m-%d", errors="coerce").dropna()
+    return np.unique(days.to_numpy().astype("datetime64[D]"))
+
+
+def holiday_file(exchange, calendar_dir=None):
+    calendar_dir = CALENDAR_DIR if calendar_dir is None else calendar_dir
+    for ext in CALENDAR_EXTENSIONS:
+        path = os.path.join(calendar_dir, exchange + ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+@functools.lru_cache(maxsize=32)
+def _build_calendar(exchange, path, mtime):
+    if exchange == ALWAYS_OPEN:
+        return TradingCalendar(exchange, weekmask=EVERY_DAY)
+    return TradingCalendar(exchange, read_holidays(path) if path else ())
+
+
+def get_calendar(exchange=DEFAULT_EXCHANGE, calendar_dir=None):
+    """Cached calendar for ``exchange`` (its holiday file, or weekdays only)."""
+    path = None if exchange == ALWAYS_OPEN else holiday_file(exchange, calendar_dir)
+    return _build_calendar(exchange, path, os.path.getmtime(path) if path else None)
+
+
+def market_calendar(market_type, exchange=None):
+    """Calendar for the app's market types: Bitcoin never closes, stocks
+    trade on ``exchange`` (DEFAULT_EXCHANGE when not given)."""
+    if market_type == "Bitcoin":
+        return get_calendar(ALWAYS_OPEN)
+    return get_calendar(exchange or DEFAULT_EXCHANGE)
@@ -0,0 +1,171 @@
+"""Rolling CPR-width and Camarilla-width statistics.
+
+The CPR width (TC - BC, which is twice both TC - Pivot and Pivot - BC) and
+the Camarilla width (R3 - S3) of every engine row are expressed as a % of
+that period's close, so decades of history compare fairly. Over a trailing
+window of periods (the current one included) each width gets:
+
+    Mean     rolling mean
+    Z        (width - mean) / rolling standard deviation (ddof=1)
+    PctRank  % of the window's widths that are <= this one
+
+A narrow CPR -- PctRank at or below NARROW_PERCENTILE -- flags a likely
+trending session. Whole histories use pandas' compiled rolling kernels
+(running sums for mean/std, a skiplist for the rank: O(n) and O(n log w),
+no Python callbacks). New periods go through RollingWidthStats instead,
+which keeps the window sorted with bisect plus running sums, so each
+update costs O(log w) comparisons and the state is a short list that
+fits in incremental.SymbolState.
+"""
+import bisect
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from level_engine import compute_levels
+
+WIDTH_WINDOW = 50
+WIDTH_MIN_PERIODS = 10
+NARROW_PERCENTILE = 20.0
+WIDTH_KINDS = ("CPR", "Cam")
+
+
+def width_pct(levels, close):
+    """{"CPR": TC - BC, "Cam": Cam_R3 - Cam_S3} per engine row, as % of close."""
+    close = np.asarray(close, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {"CPR": (levels["TC"] - levels["BC"]) / close * 100,
+                "Cam": (levels["Cam_R3"] - levels["Cam_S3"]) / close * 100}
+
+
+def rolling_width_stats(values, window=WIDTH_WINDOW, min_periods=WIDTH_MIN_PERIODS):
+    """(mean, z, pct_rank) arrays for a width series over a trailing window."""
+    rolling = pd.Series(np.asarray(values, dtype=np.float64)).rolling(window, min_periods=min(min_periods, window))
+    mean = rolling.mean().to_numpy()
+    std = rolling.std().to_numpy()
+    rank = rolling.rank(method="max", pct=True).to_numpy() * 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(std > 0, (np.asarray(values, dtype=np.float64) - mean) / std, np.nan)
+    return mean, z, rank
+
+
+def width_stats(levels, close, window=WIDTH_WINDOW, min_periods=WIDTH_MIN_PERIODS, index=None):
+    """CPR and Camarilla width statistics for every engine row, plus NarrowCPR."""
+    cols = {}
+    for kind, values in width_pct(levels, close).items():
+        mean, z, rank = rolling_width_stats(values, window, min_periods)
+        cols[f"{kind}_WidthPct"] = values
+        cols[f"{kind}_WidthMean"] = mean
+        cols[f"{kind}_WidthZ"] = z
+        cols[f"{kind}_WidthPctRank"] = rank
+    cols["NarrowCPR"] = cols["CPR_WidthPctRank"] <= NARROW_PERCENTILE
+    return pd.DataFrame(cols, index=index)
+
+
+# ==========================================================
+# --- Streaming updates ---
+class RollingWidthStats:
+    """Trailing window of one width series, updated one closed period at a time.
+
+    Holds the last ``window - 1`` closed periods; stats() scores a new
+    value as the newest member of the window without storing it, which
+    matches rolling_width_stats on the full series.
+    """
+
+    def __init__(self, window=WIDTH_WINDOW, min_periods=WIDTH_MIN_PERIODS, values=()):
+        self.window = window
+        self.min_periods = min(min_periods, window)
+        self._values = deque()          # closed periods, oldest first (NaN kept for the window length)
+        self._sorted = []               # the non-NaN ones, sorted
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._pushes = 0
+        for value in values:
+            self.push(value)
+
+    def _resync(self):
+        # Running sums drift with every add/remove; recomputing once per window keeps it bounded
+        self._sum = math.fsum(self._sorted)
+        self._sumsq = math.fsum(v * v for v in self._sorted)
+
+    def push(self, value):
+        value = float(value)
+        if self._values and len(self._values) >= self.window - 1:
+            old = self._values.popleft()
+            if not math.isnan(old):
+                del self._sorted[bisect.bisect_left(self._sorted, old)]
+                self._sum -= old
+                self._sumsq -= old * old
+        if self.window > 1:
+            self._values.append(value)
+            if not math.isnan(value):
+                bisect.insort(self._sorted, value)
+                self._sum += value
+                self._sumsq += value * value
+        self._pushes += 1
+        if self._pushes % self.window == 0:
+            self._resync()
+
+    def stats(self, value):
+        """(mean, z, pct_rank) of ``value`` as the newest period of the window."""
+        value = float(value)
+        if math.isnan(value):
+            n, total, total_sq = len(self._sorted), self._sum, self._sumsq
+        else:
+            n, total, total_sq = len(self._sorted) + 1, self._sum + value, self._sumsq + value * value
+        if n < self.min_periods or n == 0:
+            return math.nan, math.nan, math.nan
+        mean = total / n
+        if math.isnan(value):
+            return mean, math.nan, math.nan
+        var = (total_sq - total * mean) / (n - 1) if n > 1 else math.nan
+        std = math.sqrt(var) if var > 1e-12 * max(1.0, mean * mean) else math.nan
+        z = (value - mean) / std if std == std else math.nan
+        rank = (bisect.bisect_right(self._sorted, value) + 1) / n * 100
+        return mean, z, rank
+
+    def values(self):
+        return list(self._values)
+
+
+class WidthTracker:
+    """RollingWidthStats for the CPR and Camarilla widths of one symbol and frequency."""
+
+    def __init__(self, window=WIDTH_WINDOW, min_periods=WIDTH_MIN_PERIODS, history=None):
+        history = history or {}
+        self.stats_by_kind = {kind: RollingWidthStats(window, min_periods, history.get(kind, ()))
+                              for kind in WIDTH_KINDS}
+
+    @classmethod
+    def from_periods(cls, high, low, close, window=WIDTH_WINDOW, min_periods=WIDTH_MIN_PERIODS):
+        """Seeded with the widths of closed periods (oldest first)."""
+        widths = period_widths(high, low, close)
+        return cls(window, min_periods, {kind: values[-(window - 1):] if window > 1 else ()
+                                         for kind, values in widths.items()})
+
+    def push(self, high, low, close):
+        for kind, values in period_widths([high], [low], [close]).items():
+            self.stats_by_kind[kind].push(values[0])
+
+    def stats(self, high, low, close):
+        """Width statistics of a (possibly still running) period, as width_stats columns."""
+        out = {}
+        for kind, values in period_widths([high], [low], [close]).items():
+            mean, z, rank = self.stats_by_kind[kind].stats(values[0])
+            out[f"{kind}_WidthPct"] = float(values[0])
+            out[f"{kind}_WidthMean"] = mean
+            out[f"{kind}_WidthZ"] = z
+            out[f"{kind}_WidthPctRank"] = rank
+        out["NarrowCPR"] = bool(out["CPR_WidthPctRank"] <= NARROW_PERCENTILE)
+        return out
+
+    def to_dict(self):
+        return {kind: stats.values() for kind, stats in self.stats_by_kind.items()}
+
+
+def period_widths(high, low, close):
+    """width_pct for raw period High/Low/Close arrays."""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    return width_pct(compute_levels(high, low, close), close)